@@ -1,7 +1,10 @@
+from datetime import datetime
+
 import streamlit as st
 
 from src.database.connection import get_session, init_db
 from src.services import auth_service, caixa_service
+from src.ui.components import render_alertas, situacao_do_caixa
 from utils import load_static_files
 
 st.set_page_config(page_title="Gerenciador de Barbearia", page_icon="💈", layout="wide")
@@ -53,9 +56,11 @@ with st.sidebar:
 
 # Lembrete inteligente do caixa: acompanha o admin em todas as páginas até o
 # fechamento do dia ser feito (e cobra dias anteriores esquecidos em aberto).
+# A situação do caixa fica guardada na sessão (situacao_do_caixa): navegar entre as
+# páginas não consulta o banco; só os textos, que dependem da hora, são refeitos.
 if logged_in and st.session_state.get("role") == "admin":
-    with get_session() as session:
-        alertas_caixa = caixa_service.pendencias(session)
+    agora = datetime.now()
+    alertas_caixa = caixa_service.alertas(situacao_do_caixa(agora.date()), agora)
     if alertas_caixa:
         if not st.session_state.get("lembrete_caixa_exibido"):
             for alerta in alertas_caixa:
@@ -63,13 +68,7 @@ if logged_in and st.session_state.get("role") == "admin":
             st.session_state["lembrete_caixa_exibido"] = True
         with st.sidebar:
             st.markdown("#### 🔔 Lembretes do caixa")
-            for alerta in alertas_caixa:
-                if alerta["nivel"] == "erro":
-                    st.error(alerta["mensagem"])
-                elif alerta["nivel"] == "aviso":
-                    st.warning(alerta["mensagem"])
-                else:
-                    st.info(alerta["mensagem"])
+            render_alertas(alertas_caixa)
 
 # A Agenda é pública (clientes agendam sem login); as demais páginas são da equipe.
 paginas = [st.Page("pages/3_Agenda.py", title="Agenda", icon="📅", default=True)]
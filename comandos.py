@@ -0,0 +1,67 @@
+"""Comandos de manutenção do banco, fora do Streamlit.
+
+Uso:
+    python comandos.py verificar-receita     # compara o rollup receita_diaria com agendamentos
+    python comandos.py reconstruir-receita   # refaz o rollup a partir de agendamentos
+    python comandos.py exportar-parquet [destino] [--completo]
+                                             # agendamentos em Parquet por ano/mês (só os meses alterados)
+"""
+import argparse
+import sys
+
+from src.database.connection import get_session, init_db
+from src.config import BASE_DIR
+from src.repositories import receita_diaria_repository
+from src.services import exportacao_parquet
+
+
+def verificar_receita(_args) -> int:
+    with get_session() as session:
+        divergencias = receita_diaria_repository.verificar(session)
+    if not divergencias:
+        print("✅ Rollup receita_diaria consistente com agendamentos.")
+        return 0
+    print(f"⚠️ {len(divergencias)} divergência(s) entre receita_diaria e agendamentos:")
+    for item in divergencias:
+        print(f"  {item['chave']}: esperado {item['esperado']}, gravado {item['atual']}")
+    print("Rode `python comandos.py reconstruir-receita` para corrigir.")
+    return 1
+
+
+def reconstruir_receita(_args) -> int:
+    with get_session() as session:
+        receita_diaria_repository.reconstruir(session)
+    print("✅ Rollup receita_diaria reconstruído.")
+    return 0
+
+
+def exportar_parquet(args) -> int:
+    with get_session(readonly=True) as session:
+        resultado = exportacao_parquet.exportar_agendamentos(session, args.destino, completo=args.completo)
+    print(
+        f"✅ Parquet em {args.destino}: {len(resultado['escritos'])} mês(es) gravado(s), "
+        f"{resultado['inalterados']} inalterado(s), {len(resultado['removidos'])} removido(s)."
+    )
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Manutenção do banco da barbearia.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    subcomandos.add_parser("verificar-receita", help="confere o rollup receita_diaria").set_defaults(
+        funcao=verificar_receita
+    )
+    subcomandos.add_parser("reconstruir-receita", help="refaz o rollup receita_diaria").set_defaults(
+        funcao=reconstruir_receita
+    )
+    exportar = subcomandos.add_parser("exportar-parquet", help="exporta agendamentos em Parquet por ano/mês")
+    exportar.add_argument("destino", nargs="?", default=str(BASE_DIR / "exportacoes" / "agendamentos"))
+    exportar.add_argument("--completo", action="store_true", help="reescreve todos os meses")
+    exportar.set_defaults(funcao=exportar_parquet)
+    args = parser.parse_args(argv)
+    init_db()
+    return args.funcao(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,11 @@
 from datetime import date, timedelta
-from io import BytesIO
 
 import pandas as pd
 import streamlit as st
 
 from src.database.connection import get_session
 from src.repositories import adiantamento_repository, funcionario_repository, pagamento_repository
-from src.services import pagamento_service
+from src.services import exportacao, pagamento_service
 from src.services.pagamento_service import PagamentoError
 from src.ui.components import moeda, render_styled_table
 from utils import load_static_files
@@ -152,15 +151,12 @@ if not df_pag.empty:
     total_pago = df_pag["Valor Pago"].sum()
     st.caption(f"Total pago no período filtrado: **{moeda(total_pago)}**")
 
-    def _gerar_excel(dataframe: pd.DataFrame) -> bytes:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            dataframe.to_excel(writer, index=False, sheet_name="Pagamentos")
-        return output.getvalue()
-
+    colunas_excel = [
+        (c, c, "moeda" if c in ("Comissão", "Vales Abatidos", "Valor Pago") else None) for c in df_pag.columns
+    ]
     st.download_button(
         "📥 Baixar Pagamentos em Excel",
-        data=_gerar_excel(df_pag),
+        data=exportacao.gerar_excel(exportacao.em_lotes(df_pag), colunas_excel, "Pagamentos"),
         file_name="pagamentos_funcionarios.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
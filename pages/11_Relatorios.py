@@ -5,7 +5,7 @@ import plotly.express as px
 import streamlit as st
 
 from src.database.connection import get_session
-from src.services import faturamento_service, relatorio_service
+from src.services import relatorio_service
 from src.ui.components import moeda, render_styled_table
 from src.ui.theme import registrar_tema
 from utils import load_static_files
@@ -44,15 +44,17 @@ else:
     inicio, fim = PRESETS[preset]
     st.caption(f"📆 {inicio.strftime('%d/%m/%Y')} até {fim.strftime('%d/%m/%Y')}")
 
-with get_session() as session:
-    dados = relatorio_service.comparativo(session, inicio, fim)
-    serie_receita = relatorio_service.receita_por_dia(session, inicio, fim)
-    por_dia_semana = relatorio_service.atendimentos_por_dia_semana(session, inicio, fim)
-    por_horario = relatorio_service.atendimentos_por_horario(session, inicio, fim)
-    servicos = relatorio_service.top_servicos(session, inicio, fim)
-    desempenho = relatorio_service.desempenho_funcionarios(session, inicio, fim)
-    por_forma = faturamento_service.receita_por_forma_pagamento(session, inicio, fim)
+# Uma consulta traz o período e o anterior; todo o resto sai do retrato em memória.
+with get_session(readonly=True) as session:
+    retrato = relatorio_service.RetratoDoPeriodo.carregar(session, inicio, fim)
+    dados = retrato.comparativo()
     metas = relatorio_service.progresso_metas(session, dados["atual"])
+serie_receita = retrato.receita_por_dia()
+por_dia_semana = retrato.atendimentos_por_dia_semana()
+por_horario = retrato.atendimentos_por_horario()
+servicos = retrato.top_servicos()
+desempenho = retrato.desempenho_funcionarios()
+por_forma = retrato.receita_por_forma_pagamento()
 
 atual, anterior = dados["atual"], dados["anterior"]
 ant_inicio, ant_fim = dados["periodo_anterior"]
@@ -125,7 +127,7 @@ for meta in metas:
 
 with st.expander("⚙️ Ajustar metas"):
     with st.form("metas_form"):
-        with get_session() as session:
+        with get_session(readonly=True) as session:
             metas_atuais = relatorio_service.obter_metas(session)
         novos_valores = {}
         col1, col2 = st.columns(2)
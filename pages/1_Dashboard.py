@@ -7,8 +7,8 @@ from st_aggrid import AgGrid, GridOptionsBuilder
 
 from src.database.connection import get_session
 from src.database.models import STATUS_CONCLUIDO
-from src.repositories import cliente_repository
-from src.services import dashboard_service
+from src.repositories import agendamento_repository, cliente_repository, funcionario_repository
+from src.services import dashboard_service, exportacao
 from src.services.agendamento_service import STATUS_LABELS
 from src.ui.components import moeda, percentual
 from src.ui.theme import registrar_tema
@@ -23,26 +23,12 @@ if "usuario_logado" not in st.session_state:
 
 st.title("📊 Dashboard")
 
-with get_session() as session:
-    linhas = dashboard_service.listar_agendamentos_detalhado(session)
+with get_session(readonly=True) as session:
+    tem_agendamentos = agendamento_repository.existe_algum(session)
     total_clientes = cliente_repository.contar(session)
+    funcionarios = {f.nome: f.id for f in funcionario_repository.listar(session)}
 
-df = pd.DataFrame(
-    [
-        {
-            "Cliente": r.cliente,
-            "Funcionario": r.funcionario,
-            "Servico": r.servico,
-            "Preco": r.preco,
-            "Data": r.data,
-            "Hora": r.hora,
-            "Status": r.status,
-        }
-        for r in linhas
-    ]
-)
-
-if df.empty:
+if not tem_agendamentos:
     st.info("Nenhum agendamento cadastrado ainda. Comece pela página Agenda. 💈")
     st.stop()
 
@@ -61,7 +47,7 @@ col_periodo, col_func, col_custom = st.columns([1.1, 1, 1.6])
 with col_periodo:
     periodo = st.selectbox("📆 Período", options=list(PRESETS.keys()), index=2)
 with col_func:
-    funcionario_sel = st.selectbox("🧑‍🔧 Funcionário", ["Todos"] + sorted(df["Funcionario"].unique()))
+    funcionario_sel = st.selectbox("🧑‍🔧 Funcionário", ["Todos"] + sorted(funcionarios))
 
 if periodo == "Personalizado":
     with col_custom:
@@ -75,26 +61,19 @@ if periodo == "Personalizado":
 else:
     inicio, fim = PRESETS[periodo]
 
+funcionario_id = funcionarios.get(funcionario_sel)
 
-def _filtrar(base: pd.DataFrame, data_inicio, data_fim, funcionario: str) -> pd.DataFrame:
-    filtrado = base
-    if funcionario != "Todos":
-        filtrado = filtrado[filtrado["Funcionario"] == funcionario]
-    if data_inicio is not None:
-        filtrado = filtrado[(filtrado["Data"] >= data_inicio) & (filtrado["Data"] <= data_fim)]
-    return filtrado
-
-
-df_atual = _filtrar(df, inicio, fim, funcionario_sel)
-metricas = dashboard_service.calcular_metricas(df_atual)
+# Filtros vão para o SQL: uma consulta agrupada traz o período e o anterior.
+with get_session(readonly=True) as session:
+    painel = dashboard_service.carregar_painel(session, inicio, fim, funcionario_id)
+df_atual = painel["agregado"]
+metricas = painel["metricas"]
 
 # Comparativo com o período imediatamente anterior de mesma duração.
 deltas: dict = {}
-if inicio is not None:
-    duracao = fim - inicio
-    anterior_fim = inicio - timedelta(days=1)
-    anterior_inicio = anterior_fim - duracao
-    metricas_ant = dashboard_service.calcular_metricas(_filtrar(df, anterior_inicio, anterior_fim, funcionario_sel))
+if painel["periodo_anterior"] is not None:
+    anterior_inicio, anterior_fim = painel["periodo_anterior"]
+    metricas_ant = painel["metricas_anterior"]
 
     def _variacao(atual: float, anterior: float):
         if not anterior:
@@ -164,7 +143,7 @@ with g1:
 
 with g2:
     st.write("#### 📅 Atendimentos por Dia")
-    atendimentos_dia = df_atual.groupby("Data").size().reset_index(name="Atendimentos")
+    atendimentos_dia = df_atual.groupby("Data")["Quantidade"].sum().reset_index(name="Atendimentos")
     fig = px.bar(atendimentos_dia, x="Data", y="Atendimentos")
     fig.update_layout(height=300)
     st.plotly_chart(fig, use_container_width=True)
@@ -175,8 +154,7 @@ with g3:
     if concluidos.empty:
         st.info("Sem atendimentos concluídos no período.")
     else:
-        servicos_populares = concluidos["Servico"].value_counts().reset_index()
-        servicos_populares.columns = ["Servico", "Quantidade"]
+        servicos_populares = concluidos.groupby("Servico", observed=True)["Quantidade"].sum().reset_index()
         fig = px.bar(
             servicos_populares.sort_values("Quantidade"),
             x="Quantidade",
@@ -192,26 +170,60 @@ with g4:
     if concluidos.empty:
         st.info("Sem atendimentos concluídos no período.")
     else:
-        faturamento_func = concluidos.groupby("Funcionario")["Preco"].sum().reset_index()
-        fig = px.bar(faturamento_func, x="Funcionario", y="Preco", labels={"Preco": "Faturamento (R$)", "Funcionario": ""})
+        faturamento_func = concluidos.groupby("Funcionario", observed=True)["Preco"].sum().reset_index()
+        fig = px.bar(
+            faturamento_func, x="Funcionario", y="Preco", labels={"Preco": "Faturamento (R$)", "Funcionario": ""}
+        )
         fig.update_layout(height=300)
         st.plotly_chart(fig, use_container_width=True)
 
 # ---------------------------------------------------------------- detalhes
-with st.expander("🗓️ Agenda detalhada do período"):
-    colunas_grid = ["Cliente", "Funcionario", "Servico", "Data", "Hora", "Status"]
-    df_grid = df_atual[colunas_grid].assign(
-        Data=df_atual["Data"].map(lambda d: d.strftime("%d/%m/%Y")),
-        Status=df_atual["Status"].map(lambda s: STATUS_LABELS.get(s, s)),
+COLUNAS_CSV_AGENDA = [(c, c, None) for c in ("Cliente", "Funcionario", "Servico", "Data", "Hora", "Status")]
+
+
+def _formatar_agenda(agenda: pd.DataFrame) -> pd.DataFrame:
+    return agenda[["Cliente", "Funcionario", "Servico", "Data", "Hora", "Status"]].assign(
+        Data=agenda["Data"].dt.strftime("%d/%m/%Y"),
+        Status=agenda["Status"].cat.rename_categories(lambda s: STATUS_LABELS.get(s, s)),
     )
+
+
+# A grade recebe uma página por vez (paginação por chave no banco); a pilha de
+# cursores permite voltar. Mudar o filtro recomeça da primeira página.
+with st.expander("🗓️ Agenda detalhada do período"):
+    filtro = (inicio, fim, funcionario_id)
+    if st.session_state.get("dashboard_agenda_filtro") != filtro:
+        st.session_state["dashboard_agenda_filtro"] = filtro
+        st.session_state["dashboard_agenda_cursores"] = [None]
+    cursores = st.session_state["dashboard_agenda_cursores"]
+
+    with get_session(readonly=True) as session:
+        pagina, proximo = dashboard_service.pagina_da_agenda(
+            session, inicio, fim, funcionario_id, apos=cursores[-1]
+        )
+    df_grid = _formatar_agenda(pagina)
     gb = GridOptionsBuilder.from_dataframe(df_grid)
-    gb.configure_pagination(paginationAutoPageSize=True)
     gb.configure_side_bar()
     gb.configure_default_column(resizable=True, sortable=True, filterable=True)
     AgGrid(df_grid, gridOptions=gb.build(), height=400, fit_columns_on_grid_load=True)
-    st.download_button(
-        "📥 Exportar CSV",
-        data=df_grid.to_csv(index=False).encode("utf-8-sig"),
-        file_name="agendamentos_periodo.csv",
-        mime="text/csv",
-    )
+
+    nav_ant, nav_info, nav_prox = st.columns([1, 2, 1])
+    if nav_ant.button("◀ Anterior", disabled=len(cursores) == 1):
+        cursores.pop()
+        st.rerun()
+    nav_info.caption(f"Página {len(cursores)} · até {dashboard_service.TAMANHO_PAGINA_AGENDA} agendamentos por página")
+    if nav_prox.button("Próxima ▶", disabled=proximo is None):
+        cursores.append(proximo)
+        st.rerun()
+
+    # O CSV do período inteiro só é montado quando pedido, lote a lote a partir do cursor.
+    if st.button("📥 Preparar CSV do período"):
+        with get_session(readonly=True) as session:
+            lotes = dashboard_service.lotes_da_agenda(session, inicio, fim, funcionario_id)
+            dados_csv = b"".join(exportacao.gerar_csv(map(_formatar_agenda, lotes), COLUNAS_CSV_AGENDA))
+        st.download_button(
+            "📥 Exportar CSV",
+            data=dados_csv,
+            file_name="agendamentos_periodo.csv",
+            mime="text/csv",
+        )
@@ -37,9 +37,8 @@ with st.form("cliente_form"):
 st.write("### 📋 Lista de Clientes")
 with get_session() as session:
     clientes = cliente_repository.listar(session)
-    faltas_por_cliente = {
-        c.id: agendamento_repository.contar_faltas_do_cliente(session, c.id) for c in clientes
-    }
+    # Uma contagem agrupada para a lista toda (antes: uma consulta por cliente).
+    faltas_por_cliente = agendamento_repository.faltas_por_cliente(session)
     df_clientes = pd.DataFrame(
         [
             {
@@ -47,7 +46,7 @@ with get_session() as session:
                 "Nome": c.nome,
                 "Telefone": c.telefone,
                 "Email": c.email,
-                "Faltas/Cancel.": faltas_por_cliente[c.id],
+                "Faltas/Cancel.": faltas_por_cliente.get(c.id, 0),
                 "Situação": "🚫 Bloqueado" if c.bloqueado else "✅ Liberado",
             }
             for c in clientes
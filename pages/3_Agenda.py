@@ -6,7 +6,7 @@ import streamlit as st
 from src.database.connection import get_session
 from src.database.models import FORMAS_PAGAMENTO, STATUS_AGENDADO, STATUS_CONCLUIDO
 from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
-from src.services import agendamento_service
+from src.services import agendamento_service, quadro_service
 from src.services.agendamento_service import (
     MENSAGEM_COMPROMISSO,
     STATUS_LABELS,
@@ -15,7 +15,7 @@ from src.services.agendamento_service import (
     ConclusaoAntecipadaError,
     ConflitoDeHorarioError,
 )
-from src.ui.components import render_styled_table
+from src.ui.components import render_quadro_da_semana, render_styled_table
 from utils import load_static_files
 
 load_static_files()
@@ -48,18 +48,45 @@ data = st.date_input(
 )
 st.caption("ℹ️ Agendamentos são feitos com pelo menos 1 dia de antecedência.")
 
+if servico:
+    # Uma chamada varre todos os funcionários (ou o escolhido) nas próximas duas semanas.
+    with st.expander("🔎 Próximos horários livres para este serviço", expanded=not (data and funcionario)):
+        with get_session() as session:
+            proximos = agendamento_service.proximos_horarios(
+                session,
+                servicos_dict[servico],
+                agendamento_service.data_minima_agendamento(),
+                funcionario_id=funcionarios_dict.get(funcionario),
+            )
+        render_styled_table(
+            pd.DataFrame(
+                [
+                    {"Data": p["data"].strftime("%d/%m/%Y"), "Horário": p["hora"], "Funcionário": p["funcionario"]}
+                    for p in proximos
+                ]
+            )
+        )
+
 hora = None
-if data and funcionario:
+if data and funcionario and servico:
+    # Agenda de todos os funcionários do dia numa consulta: se o escolhido não tiver
+    # horário para a duração do serviço, já dá para sugerir quem tem.
     with get_session() as session:
-        horarios = agendamento_service.horarios_disponiveis(session, funcionarios_dict[funcionario], data)
+        livres = agendamento_service.horarios_disponiveis_por_funcionario(
+            session, list(funcionarios_dict.values()), data, servicos_dict[servico]
+        )
+    horarios = livres[funcionarios_dict[funcionario]]
     if horarios:
         hora = st.selectbox(
             "Horário", options=horarios, index=None, placeholder="Selecione um horário disponível"
         )
     else:
-        st.warning("⚠️ Não há mais horários disponíveis para este funcionário nesta data.")
-elif data and not funcionario:
-    st.info("Selecione um funcionário para ver os horários disponíveis.")
+        st.warning("⚠️ Não há mais horários disponíveis para este serviço com este funcionário nesta data.")
+        outros = [f"{nome} ({len(livres[id_])})" for nome, id_ in funcionarios_dict.items() if livres[id_]]
+        if outros:
+            st.caption("Com horário livre nesta data: " + ", ".join(outros))
+elif data:
+    st.info("Selecione funcionário e serviço para ver os horários disponíveis.")
 
 if st.button("Agendar", type="primary"):
     if cliente and funcionario and servico and data and hora:
@@ -163,11 +190,26 @@ with get_session() as session:
     proximos = agendamento_repository.listar_detalhado(session, a_partir_de=hoje)
     historico = agendamento_repository.listar_detalhado(session, ate=hoje - timedelta(days=1))
 
-tab_proximos, tab_historico = st.tabs(["📋 Próximos Agendamentos", "🕓 Histórico"])
+tab_proximos, tab_semana, tab_historico = st.tabs(
+    ["📋 Próximos Agendamentos", "🗓️ Semana da Equipe", "🕓 Histórico"]
+)
 
 with tab_proximos:
     render_styled_table(_montar_df(proximos))
 
+with tab_semana:
+    inicio_semana = st.date_input(
+        "Semana a partir de", value=hoje - timedelta(days=hoje.weekday()), format="DD/MM/YYYY"
+    )
+    with get_session(readonly=True) as session:
+        quadro = quadro_service.quadro_da_semana(session, inicio_semana)
+    render_quadro_da_semana(quadro)
+    resumo = quadro_service.resumo(quadro)
+    cols = st.columns(len(resumo))
+    for col, (rotulo, slots) in zip(cols, resumo.items()):
+        col.metric(rotulo, slots)
+    st.caption("Cada coluna é um horário da grade; as contagens acima são em horários (slots).")
+
 with tab_historico:
     pendentes = [r for r in historico if r.status == STATUS_AGENDADO]
     if pendentes:
@@ -3,6 +3,8 @@ import streamlit as st
 
 from src.database.connection import get_session
 from src.repositories import funcionario_repository
+from src.services import expediente_service
+from src.services.relatorio_service import DIAS_SEMANA
 from src.ui.components import percentual, render_styled_table
 from utils import load_static_files
 
@@ -97,3 +99,58 @@ if not df_funcionarios.empty:
             funcionario_repository.excluir(session, funcionario_id)
         st.warning("Funcionário excluído com sucesso!")
         st.rerun()
+
+    st.write("### 🗓️ Expediente")
+    st.caption(
+        "Horário de trabalho por dia da semana. Sem cadastro, vale o horário da barbearia; "
+        "a agenda só oferece horários dentro do expediente."
+    )
+    with get_session() as session:
+        semana = expediente_service.semana_do_funcionario(session, funcionario_id)
+    render_styled_table(
+        pd.DataFrame(
+            [
+                {
+                    "Dia": DIAS_SEMANA[d["dia_semana"]],
+                    "Expediente": "Folga" if d["folga"] else f"{d['inicio']} às {d['fim']}",
+                    "Intervalo": (
+                        f"{d['intervalo_inicio']} às {d['intervalo_fim']}" if d["intervalo_inicio"] else "—"
+                    ),
+                    "Origem": "Horário da barbearia" if d["padrao"] else "Cadastrado",
+                }
+                for d in semana
+            ]
+        )
+    )
+
+    with st.form("expediente_form"):
+        dia_semana = st.selectbox("Dia da semana", range(7), format_func=lambda d: DIAS_SEMANA[d])
+        tipo = st.radio("Neste dia", ["Expediente", "Folga", "Horário da barbearia"], horizontal=True)
+        col1, col2, col3, col4 = st.columns(4)
+        inicio = col1.text_input("Início", value="09:00")
+        fim = col2.text_input("Fim", value="18:00")
+        intervalo_inicio = col3.text_input("Intervalo de", value="")
+        intervalo_fim = col4.text_input("Intervalo até", value="")
+        salvar_expediente = st.form_submit_button("Salvar expediente")
+
+    if salvar_expediente:
+        try:
+            with get_session() as session:
+                if tipo == "Folga":
+                    expediente_service.definir_folga(session, funcionario_id, dia_semana)
+                elif tipo == "Horário da barbearia":
+                    expediente_service.usar_horario_da_barbearia(session, funcionario_id, dia_semana)
+                else:
+                    expediente_service.definir_expediente(
+                        session,
+                        funcionario_id,
+                        dia_semana,
+                        inicio.strip(),
+                        fim.strip(),
+                        intervalo_inicio.strip() or None,
+                        intervalo_fim.strip() or None,
+                    )
+            st.success("Expediente atualizado!")
+            st.rerun()
+        except ValueError as exc:
+            st.error(str(exc))
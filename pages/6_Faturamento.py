@@ -1,5 +1,4 @@
 from datetime import date
-from io import BytesIO
 
 import pandas as pd
 import plotly.express as px
@@ -7,7 +6,8 @@ import streamlit as st
 
 from src.database.connection import get_session
 from src.repositories import funcionario_repository
-from src.services import faturamento_service
+from src.services import exportacao, faturamento_service
+from src.services.tabela import montar_dataframe
 from src.ui.components import moeda, percentual, render_styled_table
 from src.ui.theme import registrar_tema
 from utils import load_static_files
@@ -25,11 +25,27 @@ if st.session_state.get("role") != "admin":
 st.title("💵 Faturamento e Pagamentos")
 
 
-def _gerar_excel(dataframe: pd.DataFrame, aba: str) -> bytes:
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        dataframe.to_excel(writer, index=False, sheet_name=aba)
-    return output.getvalue()
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+COLUNAS_EXCEL_PAGAMENTOS = [
+    ("funcionario", "Funcionário", None),
+    ("atendimentos", "Atendimentos", None),
+    ("receita_bruta", "Receita Bruta", "moeda"),
+    ("percentual", "% Comissão", "percentual"),
+    ("comissao", "Comissão", "moeda"),
+    ("descontos", "Descontos (vales)", "moeda"),
+    ("pago", "Já Pago", "moeda"),
+    ("liquido", "Líquido a Pagar", "moeda"),
+]
+COLUNAS_EXCEL_REPASSE = [
+    ("funcionario", "Funcionário", None),
+    ("servico", "Serviço", None),
+    ("preco_servico", "Preço", "moeda"),
+    ("data", "Data", "data"),
+    ("percentual", "% Comissão", "percentual"),
+    ("repasse_funcionario", "Repasse Funcionário", "moeda"),
+    ("repasse_loja", "Repasse Loja", "moeda"),
+]
 
 
 st.write("### 📆 Período de análise")
@@ -39,7 +55,7 @@ with col1:
 with col2:
     data_fim = st.date_input("Data Final", value=date.today(), format="DD/MM/YYYY")
 
-with get_session() as session:
+with get_session(readonly=True) as session:
     resumo = faturamento_service.resumo_financeiro(session, data_inicio, data_fim)
     pagamentos = faturamento_service.relatorio_pagamentos(session, data_inicio, data_fim)
     por_forma = faturamento_service.receita_por_forma_pagamento(session, data_inicio, data_fim)
@@ -115,9 +131,9 @@ if not df_pagamentos.empty:
     )
     st.download_button(
         "📥 Baixar Relatório de Pagamentos em Excel",
-        data=_gerar_excel(df_exibicao, "Pagamentos"),
+        data=exportacao.gerar_excel(exportacao.em_lotes(df_pagamentos), COLUNAS_EXCEL_PAGAMENTOS, "Pagamentos"),
         file_name="relatorio_pagamentos.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        mime=XLSX,
     )
 else:
     st.info("Nenhum atendimento concluído ou vale lançado no período selecionado.")
@@ -128,13 +144,12 @@ st.write("### 💳 Detalhamento de Repasse por Atendimento")
 nomes_funcionarios = ["Todos"] + [f.nome for f in funcionarios]
 funcionario_filtro = st.selectbox("Funcionário", nomes_funcionarios)
 
-with get_session() as session:
-    linhas = faturamento_service.faturamento_por_periodo(
+with get_session(readonly=True) as session:
+    quadro = faturamento_service.quadro_de_faturamento(
         session, data_inicio, data_fim, None if funcionario_filtro == "Todos" else funcionario_filtro
     )
 
-repasse = faturamento_service.calcular_repasse(linhas, percentuais=percentuais)
-df_repasse = pd.DataFrame(repasse)
+df_repasse = faturamento_service.calcular_repasse_vetorizado(quadro, percentuais=percentuais)
 
 if not df_repasse.empty:
     df_detalhe = df_repasse.rename(
@@ -152,18 +167,30 @@ if not df_repasse.empty:
     render_styled_table(
         df_detalhe,
         format_map={
+            "Data": lambda d: d.strftime("%d/%m/%Y"),
             "Preço": moeda,
             "% Comissão": percentual,
             "Repasse Funcionário": moeda,
             "Repasse Loja": moeda,
         },
     )
-    st.download_button(
-        "📥 Baixar Detalhamento em Excel",
-        data=_gerar_excel(df_detalhe, "Repasse"),
-        file_name="relatorio_repasse.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    # A planilha é gerada só quando pedida, lendo o período em lotes direto do banco.
+    if st.button("📥 Preparar Detalhamento em Excel"):
+        with get_session(readonly=True) as session:
+            planilha = exportacao.gerar_excel(
+                faturamento_service.lotes_de_repasse(
+                    session,
+                    data_inicio,
+                    data_fim,
+                    None if funcionario_filtro == "Todos" else funcionario_filtro,
+                    percentuais=percentuais,
+                ),
+                COLUNAS_EXCEL_REPASSE,
+                "Repasse",
+            )
+        st.download_button(
+            "📥 Baixar Detalhamento em Excel", data=planilha, file_name="relatorio_repasse.xlsx", mime=XLSX
+        )
 else:
     st.info("Nenhum registro encontrado para o filtro selecionado.")
 
@@ -172,12 +199,9 @@ st.write("### 📈 Histórico Geral")
 st.metric("💰 Faturamento acumulado da Loja (Concluídos)", moeda(total_geral))
 
 st.write("#### 👤 Desempenho por Funcionário")
-df_func = pd.DataFrame(
-    [
-        {"Funcionário": r.funcionario, "Faturamento": r.faturamento, "Atendimentos": r.atendimentos}
-        for r in por_funcionario
-    ]
-)
+df_func = montar_dataframe(
+    por_funcionario, ["funcionario_id", "Funcionário", "Faturamento", "Atendimentos"]
+).drop(columns=["funcionario_id"])
 render_styled_table(df_func, format_map={"Faturamento": moeda})
 if not df_func.empty:
     st.plotly_chart(
@@ -186,10 +210,11 @@ if not df_func.empty:
     )
 
 st.write("#### 📅 Faturamento por Mês")
-df_mes = pd.DataFrame([{"Mês": r.mes, "Faturamento": r.faturamento} for r in por_mes])
+df_mes = pd.DataFrame([{"Mês": f"{r.mes:02d}-{r.ano}", "Faturamento": r.faturamento} for r in por_mes])
 render_styled_table(df_mes, format_map={"Faturamento": moeda})
 if not df_mes.empty:
-    st.plotly_chart(px.bar(df_mes.sort_values("Mês"), x="Mês", y="Faturamento"), use_container_width=True)
+    # O serviço já devolve do mais recente para o mais antigo; o gráfico lê da esquerda para a direita.
+    st.plotly_chart(px.bar(df_mes.iloc[::-1], x="Mês", y="Faturamento"), use_container_width=True)
 
 st.write("#### 🗓️ Faturamento Anual")
 df_ano = pd.DataFrame([{"Ano": r.ano, "Faturamento": r.faturamento} for r in por_ano])
@@ -1,4 +1,4 @@
-from datetime import date, timedelta
+from datetime import datetime, timedelta
 
 import pandas as pd
 import streamlit as st
@@ -8,7 +8,7 @@ from src.database.models import TIPO_ENTRADA, TIPO_SAIDA
 from src.repositories import adiantamento_repository, caixa_repository, funcionario_repository
 from src.services import caixa_service, faturamento_service
 from src.services.caixa_service import CaixaError
-from src.ui.components import moeda, render_styled_table
+from src.ui.components import moeda, render_alertas, render_styled_table, situacao_do_caixa
 from utils import load_static_files
 
 load_static_files()
@@ -25,29 +25,16 @@ st.title("💵 Caixa Diário")
 if mensagem := st.session_state.pop("flash_caixa", None):
     st.success(mensagem)
 
-hoje = date.today()
+agora = datetime.now()
+hoje = agora.date()
 
-with get_session() as session:
-    pendencias = caixa_service.pendencias(session)
-    status_hoje = caixa_service.status_do_dia(session, hoje)
-
-for alerta in pendencias:
-    if alerta["nivel"] == "erro":
-        st.error(alerta["mensagem"])
-    elif alerta["nivel"] == "aviso":
-        st.warning(alerta["mensagem"])
-    else:
-        st.info(alerta["mensagem"])
+# A mesma situação que o app já carregou para a barra lateral (guardada na sessão).
+situacao = situacao_do_caixa(hoje)
+status_hoje = situacao["status_hoje"]
+render_alertas(caixa_service.alertas(situacao, agora))
 
 # --- Dias anteriores pendentes de fechamento ---
-with get_session() as session:
-    aberturas_passadas = caixa_repository.listar_aberturas(
-        session, hoje - timedelta(days=caixa_service.JANELA_PENDENCIAS_DIAS), hoje - timedelta(days=1)
-    )
-    dias_pendentes = [
-        a.data for a in aberturas_passadas
-        if caixa_repository.obter_fechamento(session, a.data) is None
-    ]
+dias_pendentes = situacao["dias_pendentes"]
 
 if dias_pendentes:
     with st.expander("🔴 Fechar caixas de dias anteriores", expanded=True):
@@ -9,9 +9,41 @@ load_dotenv(BASE_DIR / ".env")
 
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{BASE_DIR / 'barbearia.db'}")
 
+# Leituras analíticas (Relatórios, Faturamento, Dashboard) podem ir para uma réplica.
+# Sem ela, o SQLite abre o mesmo arquivo em modo somente leitura (mode=ro).
+DATABASE_READONLY_URL = os.getenv("DATABASE_READONLY_URL")
+
+# Pool de conexões para bancos servidor (PostgreSQL etc.); o SQLite usa o pool padrão.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos
+
+# Memória máxima do cache de leituras dos relatórios (src/services/cache.py).
+CACHE_LEITURAS_MAX_MB = float(os.getenv("CACHE_LEITURAS_MAX_MB", "64"))
+
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
 
+# Por quanto tempo cada sessão do app reaproveita a situação do caixa (lembretes da
+# barra lateral) antes de consultar de novo; abrir/fechar caixa invalida na hora.
+CAIXA_SITUACAO_TTL_SEGUNDOS = int(os.getenv("CAIXA_SITUACAO_TTL_SEGUNDOS", "300"))
+
 HORARIO_ABERTURA = "08:00"
 HORARIO_FECHAMENTO = "19:00"
 DURACAO_SLOT_MINUTOS = 30
+
+# Perfil de desempenho do SQLite, aplicado a cada conexão aberta pelo engine.
+# WAL deixa leitores e o escritor trabalharem ao mesmo tempo; busy_timeout faz
+# a escrita esperar o lock em vez de falhar com "database is locked".
+# foreign_keys fica desligado como no SQLite padrão: excluir um funcionário com
+# vales ou pagamentos registrados continua permitido (o histórico fica).
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE_KIB", "20000")) * -1,  # negativo = tamanho em KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "foreign_keys": os.getenv("SQLITE_FOREIGN_KEYS", "OFF"),
+}
@@ -1,15 +1,104 @@
+import itertools
+import threading
 from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
 
 import bcrypt
-from sqlalchemy import create_engine, inspect, text
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import Date, and_, column, create_engine, event, func, inspect, select, table, text, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session, aliased, sessionmaker
 
-from src.config import ADMIN_PASSWORD, ADMIN_USERNAME, DATABASE_URL
-from src.database.models import Base
+from src.config import (
+    ADMIN_PASSWORD,
+    ADMIN_USERNAME,
+    DATABASE_READONLY_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    SQLITE_PRAGMAS,
+)
+from src.database import datas
+from src.database.models import (
+    STATUS_AGENDADO,
+    Agendamento,
+    Base,
+    ExpedienteFuncionario,
+    FechamentoCaixa,
+    ReceitaDiaria,
+    VersaoSchema,
+)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+def configurar_sqlite(engine: Engine, pragmas: Optional[dict] = None) -> None:
+    """Aplica o perfil de PRAGMAs (padrão: SQLITE_PRAGMAS) a cada conexão nova do engine."""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome} = {valor}")
+        cursor.close()
+
+
+def opcoes_do_engine(url: str) -> dict:
+    """Argumentos de create_engine adequados ao dialeto da URL."""
+    if make_url(url).get_backend_name() == "sqlite":
+        # As sessões do Streamlit rodam em threads diferentes da que abriu a conexão.
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+def criar_engine(url: str = DATABASE_URL, somente_leitura: bool = False, **opcoes) -> Engine:
+    """Cria o engine para qualquer DATABASE_URL; `opcoes` sobrescreve os padrões do dialeto."""
+    engine = create_engine(url, **{**opcoes_do_engine(url), **opcoes})
+    if engine.dialect.name == "sqlite":
+        if somente_leitura:
+            # journal_mode/synchronous são do escritor; query_only barra qualquer escrita por engano.
+            pragmas = {k: v for k, v in SQLITE_PRAGMAS.items() if k not in ("journal_mode", "synchronous")}
+            configurar_sqlite(engine, {**pragmas, "query_only": "ON"})
+        else:
+            configurar_sqlite(engine)
+    return engine
+
+
+def url_somente_leitura(url: str) -> Optional[str]:
+    """URL do mesmo arquivo SQLite aberto com mode=ro; None se não houver arquivo (memória, outro dialeto)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    return f"sqlite:///file:{Path(parsed.database).resolve().as_posix()}?mode=ro&uri=true"
+
+
+engine = criar_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
+# Engine das leituras pesadas, criado na primeira get_session(readonly=True). O lock evita
+# que duas threads do Streamlit criem cada uma o seu (e o pool de uma delas fique perdido).
+_engine_leitura: Optional[Engine] = None
+_engine_leitura_lock = threading.Lock()
+SessionLeitura = sessionmaker(expire_on_commit=False)
+
+
+def engine_leitura() -> Engine:
+    global _engine_leitura
+    if _engine_leitura is None:
+        with _engine_leitura_lock:
+            if _engine_leitura is None:
+                url = DATABASE_READONLY_URL or url_somente_leitura(DATABASE_URL)
+                _engine_leitura = criar_engine(url, somente_leitura=True) if url else engine
+    return _engine_leitura
+
 
 def _add_column_if_missing(conn, table, column, ddl):
     existing = {col["name"] for col in inspect(conn).get_columns(table)}
@@ -45,6 +134,18 @@ def _rebuild_usuarios_legado(conn):
     conn.execute(text("DROP TABLE usuarios_legado"))
 
 
+def _create_indexes_if_missing(conn, table):
+    """Bancos existentes não ganham índices novos via create_all (a tabela já existe).
+
+    Índices sobre colunas que uma migração posterior ainda vai criar ficam para ela.
+    """
+    colunas = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    for index in table.indexes:
+        # Índices únicos só depois de acertar os dados que os violariam: ficam para a migração deles.
+        if not index.unique and {col.name for col in index.columns} <= colunas:
+            index.create(conn, checkfirst=True)
+
+
 def _migrate_legacy_schema(conn):
     """Traz bancos criados pela versão antiga (sqlite3 cru) para o schema atual. Idempotente."""
     tables = inspect(conn).get_table_names()
@@ -87,17 +188,204 @@ def _seed_admin(conn):
         )
 
 
-def init_db():
-    with engine.begin() as conn:
-        _migrate_legacy_schema(conn)
-    Base.metadata.create_all(bind=engine)
-    with engine.begin() as conn:
-        _seed_admin(conn)
+def _criar_indices_agendamentos(conn):
+    _create_indexes_if_missing(conn, Agendamento.__table__)
+
+
+def _snapshot_de_precos(conn):
+    """Preço cobrado e comissão gravados no agendamento; o histórico herda os valores atuais do cadastro."""
+    _add_column_if_missing(conn, "agendamentos", "preco_cobrado", "preco_cobrado FLOAT")
+    _add_column_if_missing(conn, "agendamentos", "percentual_comissao", "percentual_comissao FLOAT")
+    conn.execute(
+        text(
+            "UPDATE agendamentos SET preco_cobrado = "
+            "(SELECT servicos.preco FROM servicos WHERE servicos.id = agendamentos.servico_id) "
+            "WHERE preco_cobrado IS NULL"
+        )
+    )
+    conn.execute(
+        text(
+            "UPDATE agendamentos SET percentual_comissao = "
+            "(SELECT funcionarios.percentual_comissao FROM funcionarios "
+            "WHERE funcionarios.id = agendamentos.funcionario_id) "
+            "WHERE percentual_comissao IS NULL"
+        )
+    )
+    # O índice de receita ganhou as colunas novas (fica cobridor para as somas).
+    conn.execute(text("DROP INDEX IF EXISTS ix_agendamentos_status_data"))
+    _create_indexes_if_missing(conn, Agendamento.__table__)
+
+
+def _popular_receita_diaria(conn):
+    from src.repositories import receita_diaria_repository
+
+    receita_diaria_repository._reconstruir(conn)
+
+
+def _marcar_alteracoes_de_agendamentos(conn):
+    """Coluna atualizado_em; as linhas antigas ficam NULL até a próxima escrita nelas."""
+    _add_column_if_missing(conn, "agendamentos", "atualizado_em", "atualizado_em DATETIME")
+
+
+def _baldes_de_ano_e_mes(conn):
+    """Colunas ano/mes em agendamentos e receita_diaria, preenchidas a partir de data, e os índices."""
+    for tabela, modelo in (("agendamentos", Agendamento), ("receita_diaria", ReceitaDiaria)):
+        _add_column_if_missing(conn, tabela, "ano", "ano INTEGER")
+        _add_column_if_missing(conn, tabela, "mes", "mes INTEGER")
+        # Tabela "solta" (não o modelo): o backfill não deve disparar o onupdate de atualizado_em.
+        alvo = table(tabela, column("data", Date), column("ano"), column("mes"))
+        conn.execute(
+            update(alvo).where(alvo.c.ano.is_(None)).values(ano=datas.ano(alvo.c.data), mes=datas.mes(alvo.c.data))
+        )
+        _create_indexes_if_missing(conn, modelo.__table__)
+
+
+def _congelar_dias_fechados(conn):
+    """Flag totais_congelados nos fechamentos e os totais de todos os dias já fechados."""
+    from src.repositories import dia_fechado_repository
+
+    _add_column_if_missing(
+        conn, "fechamentos_caixa", "totais_congelados", "totais_congelados BOOLEAN NOT NULL DEFAULT 0"
+    )
+    dia_fechado_repository._congelar(conn, select(FechamentoCaixa.data))
+
+
+class MigracaoBloqueadaError(RuntimeError):
+    """Dados que uma migração não corrige sozinha: o gestor resolve e reinicia o app."""
+
+
+def _indices_unicos_da_agenda(conn):
+    """Coluna reserva_do_cliente e os índices únicos parciais da agenda.
+
+    Horários já agendados em dobro (a corrida que os índices passam a impedir) não
+    são alterados aqui: a migração para com a lista dos ids e nada é gravado até o
+    gestor cancelar ou remarcar um de cada grupo. A reserva vigente de cada cliente
+    é o agendamento futuro mais próximo dele (data e hora).
+    """
+    _add_column_if_missing(
+        conn, "agendamentos", "reserva_do_cliente", "reserva_do_cliente BOOLEAN NOT NULL DEFAULT 0"
+    )
+    agendados = Agendamento.status == STATUS_AGENDADO
+    horario = (Agendamento.funcionario_id, Agendamento.data, Agendamento.hora)
+    em_dobro = select(*horario).where(agendados).group_by(*horario).having(func.count() > 1).subquery()
+    linhas = conn.execute(
+        select(Agendamento.id, *horario)
+        .join(
+            em_dobro,
+            and_(
+                Agendamento.funcionario_id == em_dobro.c.funcionario_id,
+                Agendamento.data == em_dobro.c.data,
+                Agendamento.hora == em_dobro.c.hora,
+            ),
+        )
+        .where(agendados)
+        .order_by(Agendamento.data, Agendamento.hora, Agendamento.funcionario_id, Agendamento.id)
+    ).all()
+    if linhas:
+        grupos = "; ".join(
+            f"ids {', '.join(str(linha.id) for linha in grupo)} (funcionário {funcionario_id}, {dia:%d/%m/%Y} {hora})"
+            for (funcionario_id, dia, hora), grupo in itertools.groupby(linhas, key=lambda linha: tuple(linha[1:]))
+        )
+        raise MigracaoBloqueadaError(
+            f"Horários agendados em dobro impedem o índice único da agenda: {grupos}. "
+            "Cancele ou remarque um agendamento de cada grupo e reinicie o app."
+        )
+
+    # Tabela "solta": marcar a reserva não é alteração do agendamento (não mexe em atualizado_em).
+    alvo = table("agendamentos", column("id"), column("cliente_id"), column("reserva_do_cliente"))
+    outro = aliased(Agendamento)
+    primeiro = (
+        select(outro.id)
+        .where(outro.cliente_id == alvo.c.cliente_id, outro.status == STATUS_AGENDADO, outro.data >= date.today())
+        .order_by(outro.data, outro.hora, outro.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    conn.execute(update(alvo).where(alvo.c.id == primeiro).values(reserva_do_cliente=True))
+    for index in Agendamento.__table__.indexes:
+        if index.unique:
+            index.create(conn, checkfirst=True)
+
+
+def _expedientes_dos_funcionarios(conn):
+    """Tabela de expedientes por funcionário e dia da semana. Começa vazia: todos
+    seguem o horário da barbearia até o gestor cadastrar outro."""
+    ExpedienteFuncionario.__table__.create(conn, checkfirst=True)
+
+
+# Migrações numeradas, aplicadas uma única vez por banco e registradas em
+# schema_version. Nunca renumere nem remova uma entrada: acrescente no fim.
+MIGRACOES = [
+    (1, "Schema legado (sqlite3 cru) para o schema atual", _migrate_legacy_schema),
+    (2, "Índices compostos de agendamentos", _criar_indices_agendamentos),
+    (3, "Preço cobrado e comissão gravados no agendamento", _snapshot_de_precos),
+    (4, "Rollup receita_diaria a partir dos agendamentos", _popular_receita_diaria),
+    (5, "Momento da última alteração de cada agendamento", _marcar_alteracoes_de_agendamentos),
+    (6, "Colunas ano/mes em agendamentos e receita_diaria (totais mensais por índice)", _baldes_de_ano_e_mes),
+    (7, "Totais congelados dos dias com caixa fechado", _congelar_dias_fechados),
+    (8, "Índices únicos parciais da agenda (horário e reserva do cliente)", _indices_unicos_da_agenda),
+    (9, "Expedientes por funcionário e dia da semana", _expedientes_dos_funcionarios),
+]
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+# Engines cujo banco já foi conferido neste processo: os reruns do Streamlit
+# chamam init_db() a cada página e não precisam nem da leitura da versão.
+_engines_atualizados: set[Engine] = set()
+
+
+def _versao_do_banco(conn) -> int:
+    return conn.scalar(select(func.max(VersaoSchema.versao))) or 0
+
+
+def _trancar_para_migrar(conn) -> None:
+    """Tranca o banco para escrita no início da transação: dois processos subindo juntos migram um de cada vez."""
+    if conn.dialect.name == "sqlite":
+        # pysqlite só abre a transação no primeiro DML (e DDL fora dela confirma sozinho);
+        # BEGIN IMMEDIATE pega a trava de escrita já aqui, esperando até o busy_timeout.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_version'))"))
+
+
+def _aplicar_migracoes(conn) -> None:
+    # Roda com o banco já trancado: a versão é relida aqui, e quem esperou a trava
+    # encontra as migrações do outro processo já registradas.
+    versao = _versao_do_banco(conn) if inspect(conn).has_table(VersaoSchema.__tablename__) else 0
+    aplicadas = []
+    for numero, descricao, migracao in MIGRACOES:
+        if numero > versao:
+            migracao(conn)
+            aplicadas.append({"versao": numero, "descricao": descricao, "aplicada_em": datetime.now()})
+        if numero == 1:
+            # create_all depois do legado, como sempre foi: só cria o que falta (inclusive
+            # schema_version) e não mexe em tabelas existentes — as migrações cuidam delas.
+            Base.metadata.create_all(bind=conn)
+    if aplicadas:
+        conn.execute(VersaoSchema.__table__.insert(), aplicadas)
+    _seed_admin(conn)
+
+
+def init_db(bind: Optional[Engine] = None) -> None:
+    """Garante o schema atual. Custa uma leitura indexada na primeira chamada do processo e nada depois."""
+    bind = bind or engine
+    if bind in _engines_atualizados:
+        return
+    try:
+        with bind.connect() as conn:
+            versao = _versao_do_banco(conn)
+    except (OperationalError, ProgrammingError):
+        versao = 0  # banco novo ou anterior ao controle de versão
+    if versao < VERSAO_ATUAL:
+        with bind.begin() as conn:
+            _trancar_para_migrar(conn)
+            _aplicar_migracoes(conn)
+    _engines_atualizados.add(bind)
 
 
 @contextmanager
-def get_session() -> Session:
-    session = SessionLocal()
+def get_session(readonly: bool = False) -> Session:
+    """Sessão de trabalho. `readonly=True` usa o engine de leitura: relatórios não disputam o escritor."""
+    session = SessionLeitura(bind=engine_leitura()) if readonly else SessionLocal()
     try:
         yield session
     finally:
@@ -0,0 +1,15 @@
+"""Expressões de data portáveis entre dialetos (SQLite, PostgreSQL...).
+
+`extract` vira STRFTIME no SQLite e EXTRACT nos bancos servidor; o CAST garante
+inteiro nos dois (o PostgreSQL devolve numeric).
+"""
+
+from sqlalchemy import Integer, cast, extract
+
+
+def ano(coluna):
+    return cast(extract("year", coluna), Integer)
+
+
+def mes(coluna):
+    return cast(extract("month", coluna), Integer)
@@ -1,8 +1,8 @@
-from datetime import date
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import Date, ForeignKey, String
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy import Date, DateTime, ForeignKey, Index, String, func, text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, validates
 
 
 STATUS_AGENDADO = "agendado"
@@ -43,6 +43,20 @@ class Cliente(Base):
 PERCENTUAL_COMISSAO_PADRAO = 0.5
 
 
+def percentual_da_comissao(gravado, do_funcionario):
+    """% de comissão de um atendimento: a gravada nele ou, sem ela, a atual do funcionário
+    (PERCENTUAL_COMISSAO_PADRAO se nem essa existir).
+
+    Recebe valores (None = não informado) ou colunas; com colunas devolve o COALESCE
+    equivalente, para as somas feitas no banco seguirem a mesma regra.
+    """
+    if hasattr(gravado, "__clause_element__") or hasattr(do_funcionario, "__clause_element__"):
+        return func.coalesce(gravado, do_funcionario, PERCENTUAL_COMISSAO_PADRAO)
+    if gravado is not None:
+        return gravado
+    return do_funcionario if do_funcionario is not None else PERCENTUAL_COMISSAO_PADRAO
+
+
 class Funcionario(Base):
     __tablename__ = "funcionarios"
 
@@ -55,6 +69,28 @@ class Funcionario(Base):
     )
 
     agendamentos: Mapped[list["Agendamento"]] = relationship(back_populates="funcionario")
+    expedientes: Mapped[list["ExpedienteFuncionario"]] = relationship(cascade="all, delete-orphan")
+
+
+class ExpedienteFuncionario(Base):
+    """Horário de trabalho de um funcionário num dia da semana.
+
+    Sem linha para o dia, vale o horário da barbearia (HORARIO_ABERTURA a
+    HORARIO_FECHAMENTO). Com folga ligada o funcionário não atende nesse dia; o
+    intervalo (almoço) é opcional e fica dentro de inicio..fim.
+    """
+
+    __tablename__ = "expedientes_funcionarios"
+    __table_args__ = (Index("uq_expedientes_funcionario_dia", "funcionario_id", "dia_semana", unique=True),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    funcionario_id: Mapped[int] = mapped_column(ForeignKey("funcionarios.id"), nullable=False)
+    dia_semana: Mapped[int] = mapped_column(nullable=False)  # date.weekday(): 0 = segunda ... 6 = domingo
+    folga: Mapped[bool] = mapped_column(nullable=False, default=False)
+    inicio: Mapped[Optional[str]] = mapped_column(String)  # 'HH:MM'
+    fim: Mapped[Optional[str]] = mapped_column(String)
+    intervalo_inicio: Mapped[Optional[str]] = mapped_column(String)
+    intervalo_fim: Mapped[Optional[str]] = mapped_column(String)
 
 
 class Servico(Base):
@@ -70,6 +106,50 @@ class Servico(Base):
 
 class Agendamento(Base):
     __tablename__ = "agendamentos"
+    # Índices compostos no formato das consultas quentes; as colunas extras no
+    # fim tornam o índice "cobridor" (a consulta nem precisa visitar a tabela).
+    __table_args__ = (
+        # Grade de horários: listar_horarios_ocupados (funcionário + dia, exceto cancelados).
+        Index("ix_agendamentos_funcionario_data_status", "funcionario_id", "data", "status", "hora"),
+        # Agendamentos ativos e faltas do cliente (listar_ativos_do_cliente / faltas_por_cliente).
+        Index("ix_agendamentos_cliente_status_data", "cliente_id", "status", "data", "hora"),
+        # Receita: todas as somas filtram status concluído num intervalo de datas e
+        # somam o preço/comissão gravados na própria linha.
+        Index(
+            "ix_agendamentos_status_data",
+            "status",
+            "data",
+            "servico_id",
+            "funcionario_id",
+            "forma_pagamento",
+            "preco_cobrado",
+            "percentual_comissao",
+        ),
+        # Listagens da agenda por período, já na ordem de exibição.
+        Index("ix_agendamentos_data_hora", "data", "hora"),
+        # Totais por mês/ano sobre as linhas: varredura do índice já na ordem do GROUP BY.
+        Index("ix_agendamentos_status_ano_mes", "status", "ano", "mes", "preco_cobrado"),
+        # Invariantes da agenda garantidos pelo banco (índices únicos parciais): duas
+        # sessões que agendam ao mesmo tempo não passam as duas. Só os agendados
+        # contam — concluídos e faltas são histórico, e o encaixe (concluído na hora)
+        # pode começar no mesmo minuto de um agendamento.
+        Index(
+            "uq_agendamentos_horario_agendado",
+            "funcionario_id",
+            "data",
+            "hora",
+            unique=True,
+            sqlite_where=text("status = 'agendado'"),
+            postgresql_where=text("status = 'agendado'"),
+        ),
+        Index(
+            "uq_agendamentos_reserva_do_cliente",
+            "cliente_id",
+            unique=True,
+            sqlite_where=text("reserva_do_cliente"),
+            postgresql_where=text("reserva_do_cliente"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     cliente_id: Mapped[int] = mapped_column(ForeignKey("clientes.id"), nullable=False)
@@ -80,11 +160,60 @@ class Agendamento(Base):
     status: Mapped[str] = mapped_column(String, nullable=False, default="agendado")
     # Preenchida quando o atendimento é concluído (chave de FORMAS_PAGAMENTO).
     forma_pagamento: Mapped[Optional[str]] = mapped_column(String)
+    # Preço do serviço e fração de comissão do funcionário gravados ao agendar e
+    # atualizados na conclusão: editar o cadastro depois não reescreve a receita histórica.
+    preco_cobrado: Mapped[Optional[float]] = mapped_column()
+    percentual_comissao: Mapped[Optional[float]] = mapped_column()
+    # Última escrita na linha (criação ou alteração, inclusive via UPDATE em lote):
+    # a exportação analítica compara com o manifesto para saber quais meses mudaram.
+    # NULL nas linhas anteriores à coluna.
+    atualizado_em: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, default=datetime.now, onupdate=datetime.now
+    )
+    # Ano e mês de `data`, gravados junto com ela (ver _preencher_baldes): agrupar por
+    # mês vira agrupar por coluna indexada, sem uma chamada de função por linha.
+    ano: Mapped[Optional[int]] = mapped_column()
+    mes: Mapped[Optional[int]] = mapped_column()
+    # O agendamento vigente que o cliente marcou por criar_agendamento (no máximo um por
+    # cliente, pelo índice uq_agendamentos_reserva_do_cliente). Desligado quando o status
+    # deixa de ser agendado ou, se a data passou, no próximo agendamento do cliente.
+    # Default também no banco: cargas em SQL puro (importações, benchmarks) não a informam.
+    reserva_do_cliente: Mapped[bool] = mapped_column(nullable=False, default=False, server_default="0")
 
     cliente: Mapped["Cliente"] = relationship(back_populates="agendamentos")
     funcionario: Mapped["Funcionario"] = relationship(back_populates="agendamentos")
     servico: Mapped["Servico"] = relationship(back_populates="agendamentos")
 
+    @validates("data")
+    def _preencher_baldes(self, _chave, valor):
+        self.ano, self.mes = (valor.year, valor.month) if valor is not None else (None, None)
+        return valor
+
+
+class ReceitaDiaria(Base):
+    """Rollup de agendamentos por dia: quantidade, receita e comissão de cada combinação.
+
+    Mantido pelo agendamento_repository na mesma transação de cada escrita; os
+    relatórios somam dias em vez de agendamentos. forma_pagamento usa '' no lugar
+    de NULL (NULL não casa em chave primária).
+    """
+
+    __tablename__ = "receita_diaria"
+    # Totais por mês/ano do histórico: varredura do índice, sem função por linha.
+    __table_args__ = (Index("ix_receita_diaria_status_ano_mes", "status", "ano", "mes", "receita"),)
+
+    data: Mapped[date] = mapped_column(Date, primary_key=True)
+    status: Mapped[str] = mapped_column(String, primary_key=True)
+    funcionario_id: Mapped[int] = mapped_column(primary_key=True)
+    servico_id: Mapped[int] = mapped_column(primary_key=True)
+    forma_pagamento: Mapped[str] = mapped_column(String, primary_key=True, default="")
+    quantidade: Mapped[int] = mapped_column(nullable=False, default=0)
+    receita: Mapped[float] = mapped_column(nullable=False, default=0.0)
+    comissao: Mapped[float] = mapped_column(nullable=False, default=0.0)
+    # Ano e mês de `data`, gravados pelo repositório junto com a linha.
+    ano: Mapped[Optional[int]] = mapped_column()
+    mes: Mapped[Optional[int]] = mapped_column()
+
 
 TIPO_ENTRADA = "entrada"
 TIPO_SAIDA = "saida"
@@ -176,6 +305,27 @@ class FechamentoCaixa(Base):
     adiantamentos: Mapped[float] = mapped_column(nullable=False)
     saldo: Mapped[float] = mapped_column(nullable=False)
     observacao: Mapped[Optional[str]] = mapped_column(String)
+    # Os totais de agendamentos do dia ficam congelados em totais_dia_fechado no
+    # fechamento. Uma correção posterior num agendamento do dia desliga o flag e o
+    # dia volta a ser somado das linhas até ser recongelado.
+    totais_congelados: Mapped[bool] = mapped_column(nullable=False, default=False)
+
+
+class TotalDiaFechado(Base):
+    """Totais de agendamentos de um dia com caixa fechado, por funcionário e status.
+
+    Gravados no fechamento (dia_fechado_repository.congelar) e lidos pelos relatórios
+    de período enquanto o fechamento do dia estiver com totais_congelados.
+    """
+
+    __tablename__ = "totais_dia_fechado"
+
+    data: Mapped[date] = mapped_column(Date, primary_key=True)
+    funcionario_id: Mapped[int] = mapped_column(primary_key=True)
+    status: Mapped[str] = mapped_column(String, primary_key=True)
+    quantidade: Mapped[int] = mapped_column(nullable=False)
+    receita: Mapped[float] = mapped_column(nullable=False)
+    comissao: Mapped[float] = mapped_column(nullable=False)
 
 
 ROLE_ADMIN = "admin"
@@ -193,3 +343,13 @@ class Usuario(Base):
     nome_usuario: Mapped[str] = mapped_column(String, nullable=False, unique=True)
     senha_hash: Mapped[str] = mapped_column(String, nullable=False)
     role: Mapped[str] = mapped_column(String, nullable=False, default="funcionario")
+
+
+class VersaoSchema(Base):
+    """Migração já aplicada ao banco (ver MIGRACOES em connection.py); uma linha por versão."""
+
+    __tablename__ = "schema_version"
+
+    versao: Mapped[int] = mapped_column(primary_key=True)
+    descricao: Mapped[str] = mapped_column(String, nullable=False)
+    aplicada_em: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -0,0 +1,82 @@
+"""Unidade de trabalho: várias escritas de repositório confirmadas num único commit.
+
+Fora de `transacao(session)`, cada escrita de repositório continua fazendo o
+próprio commit (comportamento de sempre). Dentro dela, `confirmar` só faz
+flush — os ids ficam disponíveis para os passos seguintes — e o commit (ou o
+rollback, se algo falhar) acontece uma vez, ao sair do bloco mais externo.
+
+Cada commit que passa por aqui incrementa `versao_dos_dados()`; o cache de
+leituras (src/services/cache.py) usa esse número para saber que o banco mudou.
+Leituras que só dependem de uma tabela que quase não muda usam a versão de um
+assunto (`versao_do_assunto`), que só avança com commits que o gravaram.
+"""
+
+import itertools
+from contextlib import contextmanager
+
+from sqlalchemy.orm import Session
+
+_PROFUNDIDADE = "transacao_profundidade"
+_ASSUNTOS = "transacao_assuntos"
+
+_contador_de_versoes = itertools.count(1)
+_versao = 0
+# assunto -> versão dos dados do último commit que gravou o assunto.
+_versoes_por_assunto: dict[str, int] = {}
+
+
+def versao_dos_dados() -> int:
+    """Número que muda a cada escrita confirmada neste processo."""
+    return _versao
+
+
+def versao_do_assunto(assunto: str) -> int:
+    """Como `versao_dos_dados`, mas só muda com os commits que gravaram `assunto`."""
+    return _versoes_por_assunto.get(assunto, 0)
+
+
+def versoes_dos_assuntos() -> dict[str, int]:
+    return dict(_versoes_por_assunto)
+
+
+def marcar_assunto(session: Session, assunto: str) -> None:
+    """Anota que a escrita em curso muda `assunto`: o próximo commit da sessão avança a versão dele."""
+    session.info.setdefault(_ASSUNTOS, set()).add(assunto)
+
+
+def _commit(session: Session) -> None:
+    global _versao
+    session.commit()
+    # Só depois do commit: quem ler com a versão nova já enxerga os dados novos.
+    _versao = next(_contador_de_versoes)
+    for assunto in session.info.pop(_ASSUNTOS, ()):
+        _versoes_por_assunto[assunto] = _versao
+
+
+def em_transacao(session: Session) -> bool:
+    return session.info.get(_PROFUNDIDADE, 0) > 0
+
+
+def confirmar(session: Session) -> None:
+    """O `session.commit()` dos repositórios: vira flush dentro de uma unidade de trabalho."""
+    if em_transacao(session):
+        session.flush()
+    else:
+        _commit(session)
+
+
+@contextmanager
+def transacao(session: Session):
+    """Agrupa as escritas do bloco num commit só. Pode ser aninhado: só o bloco externo confirma."""
+    session.info[_PROFUNDIDADE] = session.info.get(_PROFUNDIDADE, 0) + 1
+    try:
+        yield session
+    except BaseException:
+        session.info[_PROFUNDIDADE] -= 1
+        if not em_transacao(session):
+            session.rollback()
+            session.info.pop(_ASSUNTOS, None)
+        raise
+    session.info[_PROFUNDIDADE] -= 1
+    if not em_transacao(session):
+        _commit(session)
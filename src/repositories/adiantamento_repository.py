@@ -5,6 +5,7 @@ from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from src.database.models import Adiantamento, Funcionario
+from src.database.transacao import confirmar
 
 
 def criar(
@@ -12,7 +13,7 @@ def criar(
 ) -> Adiantamento:
     adiantamento = Adiantamento(funcionario_id=funcionario_id, data=dia, valor=valor, descricao=descricao)
     session.add(adiantamento)
-    session.commit()
+    confirmar(session)
     return adiantamento
 
 
@@ -63,7 +64,7 @@ def marcar_abatidos(session: Session, adiantamento_ids: list[int], pagamento_id:
         adiantamento = session.get(Adiantamento, adiantamento_id)
         if adiantamento is not None:
             adiantamento.pagamento_id = pagamento_id
-    session.commit()
+    confirmar(session)
 
 
 def total_do_dia(session: Session, dia: date) -> float:
@@ -84,4 +85,4 @@ def excluir(session: Session, adiantamento_id: int) -> None:
     adiantamento = session.get(Adiantamento, adiantamento_id)
     if adiantamento is not None:
         session.delete(adiantamento)
-        session.commit()
+        confirmar(session)
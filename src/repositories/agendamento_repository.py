@@ -1,21 +1,22 @@
-from datetime import date
-from typing import Optional
+from datetime import date, datetime
+from typing import Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import and_, func, select, tuple_, update
 from sqlalchemy.orm import Session
 
 from src.database.models import Agendamento, Cliente, Funcionario, Servico
+from src.database.transacao import confirmar
+from src.repositories import receita_diaria_repository
 
 
-def listar_detalhado(session: Session, a_partir_de: Optional[date] = None, ate: Optional[date] = None):
-    """Retorna linhas já com nomes de cliente/funcionário/serviço (sem expor objetos ORM presos à sessão)."""
-    stmt = (
+def _select_detalhado():
+    return (
         select(
             Agendamento.id,
             Cliente.nome.label("cliente"),
             Funcionario.nome.label("funcionario"),
             Servico.nome.label("servico"),
-            Servico.preco.label("preco"),
+            Agendamento.preco_cobrado.label("preco"),
             Agendamento.data,
             Agendamento.hora,
             Agendamento.status,
@@ -24,12 +25,136 @@ def listar_detalhado(session: Session, a_partir_de: Optional[date] = None, ate:
         .join(Cliente, Agendamento.cliente_id == Cliente.id)
         .join(Funcionario, Agendamento.funcionario_id == Funcionario.id)
         .join(Servico, Agendamento.servico_id == Servico.id)
-        .order_by(Agendamento.data, Agendamento.hora)
     )
+
+
+def _filtrar_periodo(stmt, a_partir_de: Optional[date], ate: Optional[date], funcionario_id: Optional[int]):
     if a_partir_de is not None:
         stmt = stmt.where(Agendamento.data >= a_partir_de)
     if ate is not None:
         stmt = stmt.where(Agendamento.data <= ate)
+    if funcionario_id is not None:
+        stmt = stmt.where(Agendamento.funcionario_id == funcionario_id)
+    return stmt
+
+
+def listar_detalhado(
+    session: Session,
+    a_partir_de: Optional[date] = None,
+    ate: Optional[date] = None,
+    funcionario_id: Optional[int] = None,
+):
+    """Retorna linhas já com nomes de cliente/funcionário/serviço (sem expor objetos ORM presos à sessão)."""
+    stmt = _select_detalhado().order_by(Agendamento.data, Agendamento.hora)
+    return session.execute(_filtrar_periodo(stmt, a_partir_de, ate, funcionario_id)).all()
+
+
+def iterar_detalhado(
+    session: Session,
+    a_partir_de: Optional[date] = None,
+    ate: Optional[date] = None,
+    funcionario_id: Optional[int] = None,
+    lote: int = 10_000,
+):
+    """Como `listar_detalhado`, mas devolve o Result lido em lotes (yield_per); consuma dentro da sessão."""
+    stmt = _select_detalhado().order_by(Agendamento.data, Agendamento.hora)
+    return session.execute(
+        _filtrar_periodo(stmt, a_partir_de, ate, funcionario_id), execution_options={"yield_per": lote}
+    )
+
+
+def iterar_fato(session: Session, inicio: date, fim: date, lote: int = 10_000):
+    """Tabela fato da exportação analítica: um agendamento por linha, com ids e nomes das
+    dimensões, preço e comissão gravados. Result lido em lotes (yield_per), em ordem de data/hora."""
+    stmt = (
+        select(
+            Agendamento.id,
+            Agendamento.data,
+            Agendamento.hora,
+            Agendamento.status,
+            Agendamento.forma_pagamento,
+            Agendamento.cliente_id,
+            Cliente.nome.label("cliente"),
+            Agendamento.funcionario_id,
+            Funcionario.nome.label("funcionario"),
+            Agendamento.servico_id,
+            Servico.nome.label("servico"),
+            Agendamento.preco_cobrado.label("preco"),
+            Agendamento.percentual_comissao.label("percentual"),
+        )
+        .join(Cliente, Agendamento.cliente_id == Cliente.id)
+        .join(Funcionario, Agendamento.funcionario_id == Funcionario.id)
+        .join(Servico, Agendamento.servico_id == Servico.id)
+        .where(Agendamento.data.between(inicio, fim))
+        .order_by(Agendamento.data, Agendamento.hora, Agendamento.id)
+    )
+    return session.execute(stmt, execution_options={"yield_per": lote})
+
+
+def assinaturas_por_mes(session: Session) -> dict[tuple[int, int], tuple[int, int, Optional[datetime]]]:
+    """(ano, mês) -> (linhas, soma dos ids, última alteração) de cada mês com agendamentos.
+
+    Inserção e exclusão mudam a contagem/soma; alteração avança atualizado_em (que só
+    cresce). Se a assinatura de um mês não mudou, as linhas dele também não mudaram.
+    """
+    stmt = select(
+        Agendamento.ano, Agendamento.mes, func.count(), func.sum(Agendamento.id), func.max(Agendamento.atualizado_em)
+    ).group_by(Agendamento.ano, Agendamento.mes)
+    return {(a, m): (linhas, soma_ids, alterado) for a, m, linhas, soma_ids, alterado in session.execute(stmt)}
+
+
+def listar_pagina(
+    session: Session,
+    a_partir_de: Optional[date] = None,
+    ate: Optional[date] = None,
+    funcionario_id: Optional[int] = None,
+    apos: Optional[tuple[date, str, int]] = None,
+    limite: int = 50,
+):
+    """Até `limite` linhas de `listar_detalhado`, a partir do cursor (data, hora, id) da última linha vista.
+
+    Paginação por chave (keyset) em vez de OFFSET: cada página é uma busca no
+    índice (data, hora), não importa quantas páginas vieram antes.
+    """
+    stmt = _select_detalhado().order_by(Agendamento.data, Agendamento.hora, Agendamento.id).limit(limite)
+    if apos is not None:
+        stmt = stmt.where(tuple_(Agendamento.data, Agendamento.hora, Agendamento.id) > tuple_(*apos))
+    return session.execute(_filtrar_periodo(stmt, a_partir_de, ate, funcionario_id)).all()
+
+
+def existe_algum(session: Session) -> bool:
+    return session.scalar(select(Agendamento.id).limit(1)) is not None
+
+
+def listar_para_relatorio(session: Session, inicio: date, fim: date):
+    """Uma linha por agendamento do período, mais uma linha vazia (id None) por funcionário sem agendamento.
+
+    Parte de funcionarios (LEFT JOIN) para que a mesma consulta traga todos os
+    funcionários cadastrados — a capacidade da grade depende deles.
+    """
+    stmt = (
+        select(
+            Funcionario.id.label("funcionario_id"),
+            Funcionario.nome.label("funcionario"),
+            Funcionario.percentual_comissao.label("percentual_atual"),
+            Agendamento.id,
+            Agendamento.cliente_id,
+            Servico.nome.label("servico"),
+            Agendamento.data,
+            Agendamento.hora,
+            Agendamento.status,
+            Agendamento.forma_pagamento,
+            Agendamento.preco_cobrado.label("preco"),
+            Agendamento.percentual_comissao.label("percentual"),
+        )
+        .select_from(Funcionario)
+        .outerjoin(
+            Agendamento,
+            and_(Agendamento.funcionario_id == Funcionario.id, Agendamento.data.between(inicio, fim)),
+        )
+        .outerjoin(Servico, Agendamento.servico_id == Servico.id)
+        .order_by(Agendamento.data, Agendamento.hora)
+    )
     return session.execute(stmt).all()
 
 
@@ -46,10 +171,71 @@ def listar_horarios_ocupados(
     return set(session.scalars(stmt))
 
 
+def listar_ocupacao_do_dia(
+    session: Session,
+    dia: date,
+    funcionario_ids: Optional[list[int]] = None,
+    ignorar_id: Optional[int] = None,
+    ignorar_ids: Iterable[int] = (),
+):
+    """Linhas (funcionario_id, hora, duracao) que ocupam a agenda do dia (não canceladas),
+    com a duração do serviço de cada uma — de todos os funcionários, ou só dos dados.
+    `ignorar_id`/`ignorar_ids` ficam de fora (o próprio agendamento sendo remarcado ou reativado)."""
+    stmt = (
+        select(Agendamento.funcionario_id, Agendamento.hora, Servico.duracao)
+        .join(Servico, Agendamento.servico_id == Servico.id)
+        .where(Agendamento.data == dia, Agendamento.status != "cancelado")
+    )
+    if funcionario_ids is not None:
+        stmt = stmt.where(Agendamento.funcionario_id.in_(funcionario_ids))
+    ignorados = [*ignorar_ids, *([] if ignorar_id is None else [ignorar_id])]
+    if ignorados:
+        stmt = stmt.where(Agendamento.id.not_in(ignorados))
+    return session.execute(stmt).all()
+
+
+def listar_ocupacao_do_periodo(
+    session: Session, inicio: date, fim: date, funcionario_ids: Optional[list[int]] = None
+):
+    """Como `listar_ocupacao_do_dia`, para um intervalo de datas numa consulta só:
+    linhas (data, funcionario_id, hora, duracao) em ordem de data.
+
+    Devolve o resultado sem materializar (lido em lotes): quem só precisa dos primeiros
+    dias para de ler no meio e fecha o resultado.
+    """
+    stmt = (
+        select(Agendamento.data, Agendamento.funcionario_id, Agendamento.hora, Servico.duracao)
+        .join(Servico, Agendamento.servico_id == Servico.id)
+        .where(Agendamento.data.between(inicio, fim), Agendamento.status != "cancelado")
+        .order_by(Agendamento.data)
+        .execution_options(yield_per=1000)
+    )
+    if funcionario_ids is not None:
+        stmt = stmt.where(Agendamento.funcionario_id.in_(funcionario_ids))
+    return session.execute(stmt)
+
+
+def listar_quadro_do_periodo(session: Session, inicio: date, fim: date):
+    """Linhas (funcionario_id, data, hora, duracao, status) dos agendamentos não cancelados
+    do intervalo, de todos os funcionários — o quadro de ocupação da equipe."""
+    stmt = (
+        select(Agendamento.funcionario_id, Agendamento.data, Agendamento.hora, Servico.duracao, Agendamento.status)
+        .join(Servico, Agendamento.servico_id == Servico.id)
+        .where(Agendamento.data.between(inicio, fim), Agendamento.status != "cancelado")
+    )
+    return session.execute(stmt).all()
+
+
 def obter_por_id(session: Session, agendamento_id: int) -> Optional[Agendamento]:
     return session.get(Agendamento, agendamento_id)
 
 
+def listar_por_ids(session: Session, agendamento_ids: list[int]) -> list[Agendamento]:
+    if not agendamento_ids:
+        return []
+    return list(session.scalars(select(Agendamento).where(Agendamento.id.in_(agendamento_ids))))
+
+
 def listar_ativos_do_cliente(session: Session, cliente_id: int, a_partir_de: date) -> list[Agendamento]:
     """Agendamentos futuros ainda com status 'agendado' do cliente."""
     stmt = (
@@ -64,13 +250,57 @@ def listar_ativos_do_cliente(session: Session, cliente_id: int, a_partir_de: dat
     return list(session.scalars(stmt))
 
 
+def liberar_reservas_vencidas(session: Session, cliente_id: int, antes_de: date) -> None:
+    """Desliga a reserva do cliente presa num agendamento de data já passada (que ninguém
+    concluiu nem cancelou): ela não vale mais como agendamento ativo."""
+    session.execute(
+        update(Agendamento)
+        .where(
+            Agendamento.cliente_id == cliente_id,
+            Agendamento.reserva_do_cliente.is_(True),
+            Agendamento.data < antes_de,
+        )
+        .values(reserva_do_cliente=False)
+        .execution_options(synchronize_session="evaluate")
+    )
+    confirmar(session)
+
+
 def contar_faltas_do_cliente(session: Session, cliente_id: int) -> int:
     """Total de cancelamentos + não comparecimentos do cliente (histórico completo)."""
-    stmt = select(Agendamento).where(
-        Agendamento.cliente_id == cliente_id,
-        Agendamento.status.in_(["cancelado", "nao_compareceu"]),
+    return faltas_por_cliente(session, [cliente_id]).get(cliente_id, 0)
+
+
+def faltas_por_cliente(session: Session, cliente_ids: Optional[list[int]] = None) -> dict[int, int]:
+    """Cancelamentos + não comparecimentos por cliente (só quem tem ao menos um)."""
+    stmt = (
+        select(Agendamento.cliente_id, func.count())
+        .where(Agendamento.status.in_(["cancelado", "nao_compareceu"]))
+        .group_by(Agendamento.cliente_id)
+    )
+    if cliente_ids is not None:
+        if not cliente_ids:
+            return {}
+        stmt = stmt.where(Agendamento.cliente_id.in_(cliente_ids))
+    return {cliente_id: total for cliente_id, total in session.execute(stmt).all()}
+
+
+def _gravar_precos(session: Session, agendamento: Agendamento) -> None:
+    """Copia o preço do serviço e a comissão do funcionário vigentes para o agendamento."""
+    servico = session.get(Servico, agendamento.servico_id)
+    funcionario = session.get(Funcionario, agendamento.funcionario_id)
+    if servico is not None:
+        agendamento.preco_cobrado = servico.preco
+    if funcionario is not None:
+        agendamento.percentual_comissao = funcionario.percentual_comissao
+
+
+def contar_clientes_atendidos(session: Session, inicio: date, fim: date) -> int:
+    """Clientes distintos com ao menos um atendimento concluído no período."""
+    stmt = select(func.count(func.distinct(Agendamento.cliente_id))).where(
+        Agendamento.status == "concluido", Agendamento.data.between(inicio, fim)
     )
-    return len(list(session.scalars(stmt)))
+    return session.scalar(stmt) or 0
 
 
 def criar(
@@ -82,6 +312,7 @@ def criar(
     hora: str,
     status: str = "agendado",
     forma_pagamento: Optional[str] = None,
+    reserva_do_cliente: bool = False,
 ) -> Agendamento:
     agendamento = Agendamento(
         cliente_id=cliente_id,
@@ -91,9 +322,12 @@ def criar(
         hora=hora,
         status=status,
         forma_pagamento=forma_pagamento,
+        reserva_do_cliente=reserva_do_cliente,
     )
+    _gravar_precos(session, agendamento)
     session.add(agendamento)
-    session.commit()
+    receita_diaria_repository.somar(session, agendamento)
+    confirmar(session)
     return agendamento
 
 
@@ -101,10 +335,14 @@ def atualizar(session: Session, agendamento_id: int, dia: date, hora: str, statu
     agendamento = session.get(Agendamento, agendamento_id)
     if agendamento is None:
         return
+    receita_diaria_repository.somar(session, agendamento, -1)
     agendamento.data = dia
     agendamento.hora = hora
     agendamento.status = status
-    session.commit()
+    if status != "agendado":
+        agendamento.reserva_do_cliente = False
+    receita_diaria_repository.somar(session, agendamento)
+    confirmar(session)
 
 
 def atualizar_status(
@@ -113,17 +351,54 @@ def atualizar_status(
     agendamento = session.get(Agendamento, agendamento_id)
     if agendamento is None:
         return
+    receita_diaria_repository.somar(session, agendamento, -1)
     agendamento.status = status
     if status == "concluido":
         agendamento.forma_pagamento = forma_pagamento
+        # Cobra-se o preço vigente na conclusão; depois disso o valor fica congelado.
+        _gravar_precos(session, agendamento)
     elif status != "concluido" and agendamento.forma_pagamento is not None:
         # Reabrir/reclassificar desfaz a conclusão; a forma de pagamento deixa de valer.
         agendamento.forma_pagamento = None
-    session.commit()
+    if status != "agendado":
+        agendamento.reserva_do_cliente = False
+    receita_diaria_repository.somar(session, agendamento)
+    confirmar(session)
+
+
+def atualizar_status_em_lote(
+    session: Session, agendamento_ids: list[int], status: str, forma_pagamento: Optional[str] = None
+) -> int:
+    """Mesma regra de `atualizar_status`, num único UPDATE ... WHERE id IN (...)."""
+    if not agendamento_ids:
+        return 0
+    valores = {"status": status, "forma_pagamento": forma_pagamento if status == "concluido" else None}
+    if status != "agendado":
+        valores["reserva_do_cliente"] = False
+    if status == "concluido":
+        valores["preco_cobrado"] = (
+            select(Servico.preco).where(Servico.id == Agendamento.servico_id).scalar_subquery()
+        )
+        valores["percentual_comissao"] = (
+            select(Funcionario.percentual_comissao)
+            .where(Funcionario.id == Agendamento.funcionario_id)
+            .scalar_subquery()
+        )
+    receita_diaria_repository.somar_em_lote(session, agendamento_ids, -1)
+    resultado = session.execute(
+        update(Agendamento)
+        .where(Agendamento.id.in_(agendamento_ids))
+        .values(**valores)
+        .execution_options(synchronize_session="evaluate")
+    )
+    receita_diaria_repository.somar_em_lote(session, agendamento_ids)
+    confirmar(session)
+    return resultado.rowcount
 
 
 def excluir(session: Session, agendamento_id: int) -> None:
     agendamento = session.get(Agendamento, agendamento_id)
     if agendamento is not None:
+        receita_diaria_repository.somar(session, agendamento, -1)
         session.delete(agendamento)
-        session.commit()
+        confirmar(session)
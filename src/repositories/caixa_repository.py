@@ -1,10 +1,11 @@
 from datetime import date
 from typing import Optional
 
-from sqlalchemy import func, select
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
 from src.database.models import AberturaCaixa, FechamentoCaixa, MovimentoCaixa
+from src.database.transacao import confirmar
 
 
 def obter_abertura(session: Session, dia: date) -> Optional[AberturaCaixa]:
@@ -17,7 +18,7 @@ def criar_abertura(
 ) -> AberturaCaixa:
     abertura = AberturaCaixa(data=dia, valor_inicial=valor_inicial, hora=hora, aberto_por=aberto_por)
     session.add(abertura)
-    session.commit()
+    confirmar(session)
     return abertura
 
 
@@ -30,10 +31,23 @@ def listar_aberturas(session: Session, inicio: date, fim: date) -> list[Abertura
     return list(session.scalars(stmt))
 
 
+def aberturas_sem_fechamento(session: Session, inicio: date, fim: date) -> list[tuple[date, bool]]:
+    """(data, fechado) das aberturas de [inicio, fim] sem fechamento, mais a de `fim` (se houver)
+    mesmo fechada — numa consulta só (LEFT JOIN nos fechamentos)."""
+    fechado = FechamentoCaixa.id.is_not(None)
+    stmt = (
+        select(AberturaCaixa.data, fechado)
+        .outerjoin(FechamentoCaixa, FechamentoCaixa.data == AberturaCaixa.data)
+        .where(AberturaCaixa.data.between(inicio, fim), or_(~fechado, AberturaCaixa.data == fim))
+        .order_by(AberturaCaixa.data)
+    )
+    return [(dia, bool(foi_fechado)) for dia, foi_fechado in session.execute(stmt)]
+
+
 def criar_movimento(session: Session, dia: date, tipo: str, valor: float, descricao: str) -> MovimentoCaixa:
     movimento = MovimentoCaixa(data=dia, tipo=tipo, valor=valor, descricao=descricao)
     session.add(movimento)
-    session.commit()
+    confirmar(session)
     return movimento
 
 
@@ -53,7 +67,7 @@ def excluir_movimento(session: Session, movimento_id: int) -> None:
     movimento = session.get(MovimentoCaixa, movimento_id)
     if movimento is not None:
         session.delete(movimento)
-        session.commit()
+        confirmar(session)
 
 
 def obter_fechamento(session: Session, dia: date) -> Optional[FechamentoCaixa]:
@@ -81,7 +95,7 @@ def criar_fechamento(
         observacao=observacao,
     )
     session.add(fechamento)
-    session.commit()
+    confirmar(session)
     return fechamento
 
 
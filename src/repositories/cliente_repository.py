@@ -1,9 +1,10 @@
 from typing import Optional
 
-from sqlalchemy import func, select
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
 from src.database.models import Cliente
+from src.database.transacao import confirmar
 
 
 def listar(session: Session) -> list[Cliente]:
@@ -21,7 +22,7 @@ def obter_por_id(session: Session, cliente_id: int) -> Optional[Cliente]:
 def criar(session: Session, nome: str, telefone: str, email: str) -> Cliente:
     cliente = Cliente(nome=nome, telefone=telefone, email=email)
     session.add(cliente)
-    session.commit()
+    confirmar(session)
     return cliente
 
 
@@ -32,7 +33,7 @@ def atualizar(session: Session, cliente_id: int, nome: str, telefone: str, email
     cliente.nome = nome
     cliente.telefone = telefone
     cliente.email = email
-    session.commit()
+    confirmar(session)
 
 
 def definir_bloqueio(session: Session, cliente_id: int, bloqueado: bool) -> None:
@@ -40,11 +41,23 @@ def definir_bloqueio(session: Session, cliente_id: int, bloqueado: bool) -> None
     if cliente is None:
         return
     cliente.bloqueado = bloqueado
-    session.commit()
+    confirmar(session)
+
+
+def bloquear_em_lote(session: Session, cliente_ids: list[int]) -> None:
+    if not cliente_ids:
+        return
+    session.execute(
+        update(Cliente)
+        .where(Cliente.id.in_(cliente_ids))
+        .values(bloqueado=True)
+        .execution_options(synchronize_session="evaluate")
+    )
+    confirmar(session)
 
 
 def excluir(session: Session, cliente_id: int) -> None:
     cliente = session.get(Cliente, cliente_id)
     if cliente is not None:
         session.delete(cliente)
-        session.commit()
+        confirmar(session)
@@ -0,0 +1,137 @@
+"""Totais congelados dos dias com caixa fechado (tabela totais_dia_fechado).
+
+Um dia fechado não deveria mudar: os relatórios de período leem os totais dele
+daqui e só tiram do rollup receita_diaria os dias ainda abertos ou os corrigidos
+depois do fechamento ("sujos": FechamentoCaixa.totais_congelados desligado).
+"""
+
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import delete, func, insert, select, union_all, update
+from sqlalchemy.orm import Session
+
+from src.database.models import (
+    Agendamento,
+    FechamentoCaixa,
+    Funcionario,
+    ReceitaDiaria,
+    TotalDiaFechado,
+    percentual_da_comissao,
+)
+from src.database.transacao import confirmar
+
+
+def _totais_das_linhas():
+    """(funcionario_id, status, quantidade, receita, comissao) somados dos agendamentos.
+
+    Comissão pela % gravada em cada agendamento; sem ela, a atual do funcionário.
+    """
+    preco = func.coalesce(Agendamento.preco_cobrado, 0.0)
+    percentual = percentual_da_comissao(Agendamento.percentual_comissao, Funcionario.percentual_comissao)
+    return (
+        select(
+            Agendamento.funcionario_id,
+            Agendamento.status,
+            func.count().label("quantidade"),
+            func.sum(preco).label("receita"),
+            func.sum(preco * percentual).label("comissao"),
+        )
+        .join(Funcionario, Agendamento.funcionario_id == Funcionario.id)
+        .group_by(Agendamento.funcionario_id, Agendamento.status)
+    )
+
+
+def _congelar(bind, dias) -> None:
+    """Regrava os totais dos `dias` (lista de datas ou SELECT de datas) e liga o flag dos
+    fechamentos deles. Aceita Session ou Connection (a migração usa a conexão)."""
+    bind.execute(delete(TotalDiaFechado).where(TotalDiaFechado.data.in_(dias)))
+    stmt = _totais_das_linhas().add_columns(Agendamento.data).where(Agendamento.data.in_(dias)).group_by(
+        Agendamento.data
+    )
+    colunas = ["funcionario_id", "status", "quantidade", "receita", "comissao", "data"]
+    bind.execute(insert(TotalDiaFechado).from_select(colunas, stmt))
+    bind.execute(
+        update(FechamentoCaixa).where(FechamentoCaixa.data.in_(dias)).values(totais_congelados=True)
+    )
+
+
+def congelar(session: Session, dias: Iterable[date]) -> None:
+    dias = sorted(set(dias))
+    if dias:
+        _congelar(session, dias)
+        confirmar(session)
+
+
+def dias_sujos(session: Session) -> list[date]:
+    """Dias fechados cujos totais foram invalidados por uma correção posterior."""
+    stmt = select(FechamentoCaixa.data).where(FechamentoCaixa.totais_congelados.is_(False)).order_by(
+        FechamentoCaixa.data
+    )
+    return list(session.scalars(stmt))
+
+
+def marcar_sujos(session: Session, dias: Iterable[date]) -> None:
+    """Desliga os totais congelados dos dias que estiverem fechados. Não confirma: faz parte
+    da escrita do agendamento que mudou o dia."""
+    dias = sorted(set(dias))
+    if not dias:
+        return
+    session.execute(
+        update(FechamentoCaixa)
+        .where(FechamentoCaixa.data.in_(dias), FechamentoCaixa.totais_congelados.is_(True))
+        .values(totais_congelados=False)
+    )
+
+
+def _totais_por_dia(inicio: date, fim: date):
+    """SELECT (data, funcionario_id, status, quantidade, receita, comissao) de cada dia de
+    [inicio, fim]: dias fechados e congelados de totais_dia_fechado, os demais do rollup
+    receita_diaria — nenhum dia é somado das linhas de agendamentos."""
+    congelados = select(FechamentoCaixa.data).where(FechamentoCaixa.totais_congelados.is_(True))
+    fechados = select(
+        TotalDiaFechado.data,
+        TotalDiaFechado.funcionario_id,
+        TotalDiaFechado.status,
+        TotalDiaFechado.quantidade,
+        TotalDiaFechado.receita,
+        TotalDiaFechado.comissao,
+    ).where(TotalDiaFechado.data.between(inicio, fim), TotalDiaFechado.data.in_(congelados))
+    abertos = (
+        select(
+            ReceitaDiaria.data,
+            ReceitaDiaria.funcionario_id,
+            ReceitaDiaria.status,
+            func.sum(ReceitaDiaria.quantidade).label("quantidade"),
+            func.sum(ReceitaDiaria.receita).label("receita"),
+            func.sum(ReceitaDiaria.comissao).label("comissao"),
+        )
+        .where(ReceitaDiaria.data.between(inicio, fim), ReceitaDiaria.data.not_in(congelados))
+        .group_by(ReceitaDiaria.data, ReceitaDiaria.funcionario_id, ReceitaDiaria.status)
+    )
+    return union_all(fechados, abertos)
+
+
+def totais_por_dia(session: Session, inicio: date, fim: date):
+    """Linhas (data, funcionario_id, status, quantidade, receita, comissao) do período, numa consulta."""
+    return session.execute(_totais_por_dia(inicio, fim)).all()
+
+
+def totais_do_periodo(session: Session, inicio: date, fim: date) -> dict[tuple[int, str], dict]:
+    """(funcionario_id, status) -> {quantidade, receita, comissao} no período.
+
+    Dias fechados e congelados vêm de totais_dia_fechado; os demais (a cauda aberta
+    e os corrigidos depois do fechamento), do rollup — tudo numa única consulta.
+    """
+    dias = _totais_por_dia(inicio, fim).subquery()
+    stmt = select(
+        dias.c.funcionario_id,
+        dias.c.status,
+        func.sum(dias.c.quantidade),
+        func.sum(dias.c.receita),
+        func.sum(dias.c.comissao),
+    ).group_by(dias.c.funcionario_id, dias.c.status)
+    return {
+        (funcionario_id, status): {"quantidade": quantidade, "receita": receita or 0.0, "comissao": comissao or 0.0}
+        for funcionario_id, status, quantidade, receita, comissao in session.execute(stmt)
+    }
@@ -0,0 +1,62 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from src.database.models import ExpedienteFuncionario
+from src.database.transacao import confirmar, marcar_assunto
+
+# Assunto das escritas de expediente: o cache de grades (expediente_service) segue a versão dele.
+ASSUNTO = "expedientes"
+
+
+def listar(session: Session, funcionario_ids: Optional[Iterable[int]] = None) -> list[ExpedienteFuncionario]:
+    """Expedientes cadastrados (de todos os funcionários, ou só dos dados), por funcionário e dia."""
+    stmt = select(ExpedienteFuncionario).order_by(
+        ExpedienteFuncionario.funcionario_id, ExpedienteFuncionario.dia_semana
+    )
+    if funcionario_ids is not None:
+        stmt = stmt.where(ExpedienteFuncionario.funcionario_id.in_(list(funcionario_ids)))
+    return list(session.scalars(stmt))
+
+
+def definir(
+    session: Session,
+    funcionario_id: int,
+    dia_semana: int,
+    folga: bool,
+    inicio: Optional[str] = None,
+    fim: Optional[str] = None,
+    intervalo_inicio: Optional[str] = None,
+    intervalo_fim: Optional[str] = None,
+) -> ExpedienteFuncionario:
+    """Grava o expediente do funcionário no dia da semana (cria ou substitui o que havia)."""
+    expediente = session.scalar(
+        select(ExpedienteFuncionario).where(
+            ExpedienteFuncionario.funcionario_id == funcionario_id,
+            ExpedienteFuncionario.dia_semana == dia_semana,
+        )
+    )
+    if expediente is None:
+        expediente = ExpedienteFuncionario(funcionario_id=funcionario_id, dia_semana=dia_semana)
+        session.add(expediente)
+    expediente.folga = folga
+    expediente.inicio = inicio
+    expediente.fim = fim
+    expediente.intervalo_inicio = intervalo_inicio
+    expediente.intervalo_fim = intervalo_fim
+    marcar_assunto(session, ASSUNTO)
+    confirmar(session)
+    return expediente
+
+
+def remover(session: Session, funcionario_id: int, dia_semana: int) -> None:
+    """Apaga o expediente do dia: o funcionário volta ao horário da barbearia."""
+    session.execute(
+        delete(ExpedienteFuncionario).where(
+            ExpedienteFuncionario.funcionario_id == funcionario_id,
+            ExpedienteFuncionario.dia_semana == dia_semana,
+        )
+    )
+    marcar_assunto(session, ASSUNTO)
+    confirmar(session)
@@ -4,6 +4,8 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from src.database.models import PERCENTUAL_COMISSAO_PADRAO, Funcionario
+from src.database.transacao import confirmar, marcar_assunto
+from src.repositories import expediente_repository
 
 
 def listar(session: Session) -> list[Funcionario]:
@@ -29,7 +31,7 @@ def criar(
         nome=nome, especialidade=especialidade, percentual_comissao=percentual_comissao
     )
     session.add(funcionario)
-    session.commit()
+    confirmar(session)
     return funcionario
 
 
@@ -47,11 +49,13 @@ def atualizar(
     funcionario.especialidade = especialidade
     if percentual_comissao is not None:
         funcionario.percentual_comissao = percentual_comissao
-    session.commit()
+    confirmar(session)
 
 
 def excluir(session: Session, funcionario_id: int) -> None:
     funcionario = session.get(Funcionario, funcionario_id)
     if funcionario is not None:
         session.delete(funcionario)
-        session.commit()
+        # Os expedientes dele saem junto (cascade).
+        marcar_assunto(session, expediente_repository.ASSUNTO)
+        confirmar(session)
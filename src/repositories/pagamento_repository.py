@@ -5,6 +5,7 @@ from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from src.database.models import Funcionario, PagamentoFuncionario
+from src.database.transacao import confirmar
 
 
 def criar(
@@ -29,7 +30,7 @@ def criar(
         observacao=observacao,
     )
     session.add(pagamento)
-    session.commit()
+    confirmar(session)
     return pagamento
 
 
@@ -0,0 +1,184 @@
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from src.database import datas
+from src.database.models import Agendamento, Funcionario, ReceitaDiaria, Servico, percentual_da_comissao
+from src.database.transacao import confirmar
+from src.repositories import dia_fechado_repository
+
+CHAVE = ("data", "status", "funcionario_id", "servico_id", "forma_pagamento")
+# Diferença tolerada entre rollup e agendamentos (somas de float acumulam resíduo).
+TOLERANCIA = 0.005
+
+
+def _agregado_dos_agendamentos():
+    """SELECT que produz as linhas do rollup a partir de agendamentos (mesma regra dos deltas)."""
+    preco = func.coalesce(Agendamento.preco_cobrado, 0.0)
+    percentual = percentual_da_comissao(Agendamento.percentual_comissao, Funcionario.percentual_comissao)
+    forma = func.coalesce(Agendamento.forma_pagamento, "")
+    return select(
+        Agendamento.data,
+        Agendamento.status,
+        Agendamento.funcionario_id,
+        Agendamento.servico_id,
+        forma.label("forma_pagamento"),
+        # Pela data, não pelas colunas ano/mes de agendamentos: a migração 4 roda antes delas existirem.
+        datas.ano(Agendamento.data).label("ano"),
+        datas.mes(Agendamento.data).label("mes"),
+        func.count().label("quantidade"),
+        func.sum(preco).label("receita"),
+        func.sum(preco * percentual).label("comissao"),
+    ).outerjoin(Funcionario, Agendamento.funcionario_id == Funcionario.id).group_by(
+        Agendamento.data, Agendamento.status, Agendamento.funcionario_id, Agendamento.servico_id, forma
+    )
+
+
+def _aplicar(session, chave: dict, quantidade: int, receita: float, comissao: float) -> None:
+    filtro = and_(*(getattr(ReceitaDiaria, campo) == valor for campo, valor in chave.items()))
+    resultado = session.execute(
+        update(ReceitaDiaria)
+        .where(filtro)
+        .values(
+            quantidade=ReceitaDiaria.quantidade + quantidade,
+            receita=ReceitaDiaria.receita + receita,
+            comissao=ReceitaDiaria.comissao + comissao,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount == 0:
+        session.execute(
+            insert(ReceitaDiaria).values(
+                **chave,
+                ano=chave["data"].year,
+                mes=chave["data"].month,
+                quantidade=quantidade,
+                receita=receita,
+                comissao=comissao,
+            )
+        )
+    elif quantidade < 0:
+        session.execute(
+            delete(ReceitaDiaria)
+            .where(filtro, ReceitaDiaria.quantidade <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def somar(session: Session, agendamento: Agendamento, sinal: int = 1) -> None:
+    """Soma (sinal=1) ou retira (sinal=-1) um agendamento do rollup. Não confirma: faz parte da escrita dele."""
+    preco = agendamento.preco_cobrado or 0.0
+    percentual = agendamento.percentual_comissao
+    if percentual is None:
+        funcionario = session.get(Funcionario, agendamento.funcionario_id)
+        percentual = percentual_da_comissao(None, funcionario.percentual_comissao if funcionario else None)
+    chave = {
+        "data": agendamento.data,
+        "status": agendamento.status,
+        "funcionario_id": agendamento.funcionario_id,
+        "servico_id": agendamento.servico_id,
+        "forma_pagamento": agendamento.forma_pagamento or "",
+    }
+    _aplicar(session, chave, sinal, sinal * preco, sinal * preco * percentual)
+    # Todo delta passa por aqui: se o dia já foi fechado, os totais congelados dele deixam de valer.
+    dia_fechado_repository.marcar_sujos(session, [agendamento.data])
+
+
+def somar_em_lote(session: Session, agendamento_ids: list[int], sinal: int = 1) -> None:
+    """Como `somar`, para vários agendamentos: um SELECT agrupado e um delta por combinação."""
+    if not agendamento_ids:
+        return
+    stmt = _agregado_dos_agendamentos().where(Agendamento.id.in_(agendamento_ids))
+    linhas = session.execute(stmt).all()
+    for linha in linhas:
+        chave = {campo: getattr(linha, campo) for campo in CHAVE}
+        _aplicar(session, chave, sinal * linha.quantidade, sinal * linha.receita, sinal * linha.comissao)
+    if sinal < 0:
+        # A retirada antecede toda alteração em lote, que muda o status mas nunca a data:
+        # marcar os dias aqui já cobre a volta.
+        dia_fechado_repository.marcar_sujos(session, {linha.data for linha in linhas})
+
+
+def _reconstruir(bind) -> None:
+    """Refaz o rollup inteiro a partir de agendamentos (aceita Session ou Connection)."""
+    bind.execute(delete(ReceitaDiaria))
+    colunas = [*CHAVE, "ano", "mes", "quantidade", "receita", "comissao"]
+    bind.execute(insert(ReceitaDiaria).from_select(colunas, _agregado_dos_agendamentos()))
+
+
+def reconstruir(session: Session) -> None:
+    _reconstruir(session)
+    confirmar(session)
+
+
+def verificar(session: Session) -> list[dict]:
+    """Compara o rollup com agendamentos. Lista vazia = consistente."""
+    esperado = {tuple(getattr(r, c) for c in CHAVE): r for r in session.execute(_agregado_dos_agendamentos())}
+    atual = {tuple(getattr(r, c) for c in CHAVE): r for r in session.scalars(select(ReceitaDiaria))}
+    divergencias = []
+    for chave in sorted(set(esperado) | set(atual), key=str):
+        e, a = esperado.get(chave), atual.get(chave)
+        valores_e = (e.quantidade, e.receita, e.comissao) if e is not None else (0, 0.0, 0.0)
+        valores_a = (a.quantidade, a.receita, a.comissao) if a is not None else (0, 0.0, 0.0)
+        if valores_e[0] != valores_a[0] or any(
+            abs(x - y) > TOLERANCIA for x, y in zip(valores_e[1:], valores_a[1:])
+        ):
+            divergencias.append(
+                {
+                    "chave": dict(zip(CHAVE, chave)),
+                    "esperado": dict(zip(("quantidade", "receita", "comissao"), valores_e)),
+                    "atual": dict(zip(("quantidade", "receita", "comissao"), valores_a)),
+                }
+            )
+    return divergencias
+
+
+def totais_por_status(
+    session: Session, inicio: Optional[date] = None, fim: Optional[date] = None
+) -> dict[str, dict]:
+    """status -> {quantidade, receita, comissao} no período (ou em todo o histórico)."""
+    stmt = select(
+        ReceitaDiaria.status,
+        func.sum(ReceitaDiaria.quantidade),
+        func.sum(ReceitaDiaria.receita),
+        func.sum(ReceitaDiaria.comissao),
+    ).group_by(ReceitaDiaria.status)
+    if inicio is not None and fim is not None:
+        stmt = stmt.where(ReceitaDiaria.data.between(inicio, fim))
+    return {
+        status: {"quantidade": quantidade, "receita": receita, "comissao": comissao}
+        for status, quantidade, receita, comissao in session.execute(stmt).all()
+    }
+
+
+def agregado_por_dia(
+    session: Session,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    funcionario_id: Optional[int] = None,
+):
+    """(data, funcionario, servico, status, quantidade, receita) por dia, já com os nomes.
+
+    Sem `inicio`/`fim`, o histórico todo. O tamanho acompanha dias x combinações, não agendamentos.
+    """
+    stmt = (
+        select(
+            ReceitaDiaria.data,
+            Funcionario.nome.label("funcionario"),
+            Servico.nome.label("servico"),
+            ReceitaDiaria.status,
+            func.sum(ReceitaDiaria.quantidade).label("quantidade"),
+            func.sum(ReceitaDiaria.receita).label("receita"),
+        )
+        .join(Funcionario, ReceitaDiaria.funcionario_id == Funcionario.id)
+        .join(Servico, ReceitaDiaria.servico_id == Servico.id)
+        .group_by(ReceitaDiaria.data, Funcionario.id, Funcionario.nome, Servico.id, Servico.nome, ReceitaDiaria.status)
+        .order_by(ReceitaDiaria.data)
+    )
+    if inicio is not None and fim is not None:
+        stmt = stmt.where(ReceitaDiaria.data.between(inicio, fim))
+    if funcionario_id is not None:
+        stmt = stmt.where(ReceitaDiaria.funcionario_id == funcionario_id)
+    return session.execute(stmt).all()
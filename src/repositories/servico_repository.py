@@ -4,6 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from src.database.models import Servico
+from src.database.transacao import confirmar
 
 
 def listar(session: Session) -> list[Servico]:
@@ -17,7 +18,7 @@ def obter_por_id(session: Session, servico_id: int) -> Optional[Servico]:
 def criar(session: Session, nome: str, preco: float, duracao: int) -> Servico:
     servico = Servico(nome=nome, preco=preco, duracao=duracao)
     session.add(servico)
-    session.commit()
+    confirmar(session)
     return servico
 
 
@@ -28,11 +29,11 @@ def atualizar(session: Session, servico_id: int, nome: str, preco: float, duraca
     servico.nome = nome
     servico.preco = preco
     servico.duracao = duracao
-    session.commit()
+    confirmar(session)
 
 
 def excluir(session: Session, servico_id: int) -> None:
     servico = session.get(Servico, servico_id)
     if servico is not None:
         session.delete(servico)
-        session.commit()
+        confirmar(session)
@@ -4,6 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from src.database.models import Usuario
+from src.database.transacao import confirmar
 
 
 def obter_por_nome(session: Session, nome_usuario: str) -> Optional[Usuario]:
@@ -17,7 +18,7 @@ def listar(session: Session) -> list[Usuario]:
 def criar(session: Session, nome_usuario: str, senha_hash: str, role: str = "funcionario") -> Usuario:
     usuario = Usuario(nome_usuario=nome_usuario, senha_hash=senha_hash, role=role)
     session.add(usuario)
-    session.commit()
+    confirmar(session)
     return usuario
 
 
@@ -30,7 +31,7 @@ def atualizar_role(session: Session, usuario_id: int, role: str) -> None:
     if usuario is None:
         return
     usuario.role = role
-    session.commit()
+    confirmar(session)
 
 
 def atualizar_senha_hash(session: Session, usuario_id: int, senha_hash: str) -> None:
@@ -38,11 +39,11 @@ def atualizar_senha_hash(session: Session, usuario_id: int, senha_hash: str) ->
     if usuario is None:
         return
     usuario.senha_hash = senha_hash
-    session.commit()
+    confirmar(session)
 
 
 def excluir(session: Session, usuario_id: int) -> None:
     usuario = session.get(Usuario, usuario_id)
     if usuario is not None:
         session.delete(usuario)
-        session.commit()
+        confirmar(session)
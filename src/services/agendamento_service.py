@@ -1,9 +1,10 @@
+from contextlib import closing
 from datetime import date, datetime, timedelta
 from typing import Iterable, Optional
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from src.config import DURACAO_SLOT_MINUTOS, HORARIO_ABERTURA, HORARIO_FECHAMENTO
 from src.database.models import (
     FORMAS_PAGAMENTO,
     STATUS_AGENDADO,
@@ -12,7 +13,9 @@ from src.database.models import (
     STATUS_NAO_COMPARECEU,
     Agendamento,
 )
-from src.repositories import agendamento_repository, cliente_repository
+from src.database.transacao import transacao
+from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
+from src.services import disponibilidade, expediente_service
 
 STATUS_LABELS = {
     STATUS_AGENDADO: "Agendado",
@@ -34,6 +37,27 @@ class AgendamentoDuplicadoError(Exception):
     pass
 
 
+INDICE_HORARIO_AGENDADO = "uq_agendamentos_horario_agendado"
+INDICE_RESERVA_DO_CLIENTE = "uq_agendamentos_reserva_do_cliente"
+
+# O PostgreSQL cita o nome do índice violado; o SQLite só as colunas
+# ("UNIQUE constraint failed: agendamentos.cliente_id").
+_COLUNAS_DOS_INDICES_UNICOS = {
+    indice.name: ", ".join(f"{coluna.table.name}.{coluna.name}" for coluna in indice.columns)
+    for indice in Agendamento.__table__.indexes
+    if indice.unique
+}
+
+
+def _indice_unico_violado(erro: IntegrityError) -> Optional[str]:
+    """Qual índice único da agenda o erro violou; None se foi outra restrição."""
+    mensagem = str(erro.orig)
+    for nome, colunas in _COLUNAS_DOS_INDICES_UNICOS.items():
+        if f'"{nome}"' in mensagem or mensagem == f"UNIQUE constraint failed: {colunas}":
+            return nome
+    return None
+
+
 # Clientes agendam com no mínimo 1 dia de antecedência; o mesmo dia é atendido
 # apenas via encaixe (lancar_atendimento_avulso), que é restrito à equipe.
 ANTECEDENCIA_MINIMA_DIAS = 1
@@ -54,16 +78,9 @@ def _validar_forma_pagamento(forma_pagamento: Optional[str]) -> None:
 
 
 def _gerar_grade_horarios() -> list[str]:
-    inicio = datetime.strptime(HORARIO_ABERTURA, "%H:%M")
-    fim = datetime.strptime(HORARIO_FECHAMENTO, "%H:%M")
-    horarios = []
-    atual = inicio
-    # O último slot começa antes do fechamento: um atendimento às 19:00
-    # terminaria com a barbearia fechada.
-    while atual < fim:
-        horarios.append(atual.strftime("%H:%M"))
-        atual += timedelta(minutes=DURACAO_SLOT_MINUTOS)
-    return horarios
+    # Montada uma vez, na importação de disponibilidade. É a grade da barbearia; a de
+    # cada funcionário é o expediente dele sobre ela (expediente_service).
+    return list(disponibilidade.GRADE)
 
 
 def data_minima_agendamento(hoje: Optional[date] = None) -> date:
@@ -71,14 +88,107 @@ def data_minima_agendamento(hoje: Optional[date] = None) -> date:
     return hoje + timedelta(days=ANTECEDENCIA_MINIMA_DIAS)
 
 
+def _duracao_do_servico(session: Session, servico_id: Optional[int]) -> Optional[int]:
+    servico = servico_repository.obter_por_id(session, servico_id) if servico_id is not None else None
+    return servico.duracao if servico is not None else None
+
+
 def horarios_disponiveis(
-    session: Session, funcionario_id: int, dia: date, agora: Optional[datetime] = None
+    session: Session,
+    funcionario_id: int,
+    dia: date,
+    agora: Optional[datetime] = None,
+    servico_id: Optional[int] = None,
 ) -> list[str]:
+    """Horários em que o serviço cabe inteiro na agenda do funcionário, dentro do
+    expediente dele (sem serviço: um slot)."""
+    agora = agora or datetime.now()
+    if dia < data_minima_agendamento(agora.date()):
+        return []
+    duracao = _duracao_do_servico(session, servico_id)
+    expediente = expediente_service.grade(session, funcionario_id, dia.weekday())
+    if not expediente:
+        return []
+    ocupacao = disponibilidade.ocupacao_do_dia(session, dia, [funcionario_id]).get(funcionario_id, 0)
+    return disponibilidade.horarios(disponibilidade.inicios_livres(ocupacao, duracao, expediente))
+
+
+def horarios_disponiveis_por_funcionario(
+    session: Session,
+    funcionario_ids: list[int],
+    dia: date,
+    servico_id: Optional[int] = None,
+    agora: Optional[datetime] = None,
+) -> dict[int, list[str]]:
+    """Como `horarios_disponiveis`, para vários funcionários de uma vez (uma consulta da agenda)."""
     agora = agora or datetime.now()
     if dia < data_minima_agendamento(agora.date()):
+        return {funcionario_id: [] for funcionario_id in funcionario_ids}
+    duracao = _duracao_do_servico(session, servico_id)
+    expedientes = expediente_service.grades_do_dia(session, dia, funcionario_ids)
+    return disponibilidade.horarios_livres_do_dia(session, dia, funcionario_ids, duracao, expedientes)
+
+
+def proximos_horarios(
+    session: Session,
+    servico_id: int,
+    a_partir_de: date,
+    dias: int = 14,
+    funcionario_id: Optional[int] = None,
+    limite: int = 10,
+    agora: Optional[datetime] = None,
+) -> list[dict]:
+    """Os `limite` primeiros horários em que o serviço cabe, em `dias` dias a partir de
+    `a_partir_de` (nunca antes de `data_minima_agendamento`), de todos os funcionários
+    ou só de `funcionario_id`.
+
+    [{"funcionario_id", "funcionario", "data", "hora"}, ...] por data, hora e nome.
+    A ocupação da janela vem de uma consulta, lida dia a dia só até completar o
+    `limite`; o resto é máscara de bits.
+    """
+    agora = agora or datetime.now()
+    inicio = max(a_partir_de, data_minima_agendamento(agora.date()))
+    fim = inicio + timedelta(days=dias - 1)
+    funcionarios = [f for f in funcionario_repository.listar(session) if funcionario_id in (None, f.id)]
+    if not funcionarios or dias <= 0 or limite <= 0:
         return []
-    ocupados = agendamento_repository.listar_horarios_ocupados(session, funcionario_id, dia)
-    return [h for h in _gerar_grade_horarios() if h not in ocupados]
+    duracao = _duracao_do_servico(session, servico_id)
+    ids = [f.id for f in funcionarios] if funcionario_id is not None else None
+    # Expedientes da semana já em máscara (cache por versão): nada a recalcular por dia.
+    todos = [f.id for f in funcionarios]
+    semana = [expediente_service.grades_do_dia_da_semana(session, todos, d) for d in range(7)]
+
+    resultado = []
+    # closing: sair do laço no meio fecha a consulta em vez de esperar o coletor.
+    with closing(disponibilidade.ocupacao_por_dia(session, inicio, fim, ids)) as dias_da_janela:
+        for dia, ocupacao in dias_da_janela:
+            # (slot, posição do funcionário na lista por nome) dos inícios livres do dia; de cada
+            # funcionário bastam os `restantes` primeiros bits ligados (o menos significativo é o mais cedo).
+            restantes = limite - len(resultado)
+            expedientes = semana[dia.weekday()]
+            livres = []
+            for posicao, funcionario in enumerate(funcionarios):
+                cabem = disponibilidade.inicios_livres(
+                    ocupacao.get(funcionario.id, 0), duracao, expedientes[funcionario.id]
+                )
+                for _ in range(restantes):
+                    if not cabem:
+                        break
+                    livres.append(((cabem & -cabem).bit_length() - 1, posicao))
+                    cabem &= cabem - 1
+            for slot, posicao in sorted(livres)[:restantes]:
+                funcionario = funcionarios[posicao]
+                resultado.append(
+                    {
+                        "funcionario_id": funcionario.id,
+                        "funcionario": funcionario.nome,
+                        "data": dia,
+                        "hora": disponibilidade.GRADE[slot],
+                    }
+                )
+            if len(resultado) >= limite:
+                break
+    return resultado
 
 
 def criar_agendamento(
@@ -100,9 +210,49 @@ def criar_agendamento(
             "Este cliente está bloqueado para novos agendamentos por excesso de "
             "cancelamentos/faltas. Procure a equipe da barbearia para regularizar."
         )
-    ativos = agendamento_repository.listar_ativos_do_cliente(
-        session, cliente_id, a_partir_de=hoje or date.today()
-    )
+    hoje = hoje or date.today()
+    duracao = _duracao_do_servico(session, servico_id)
+    # Checagem antecipada, sem trava: o caso comum recusa aqui, com a mensagem certa.
+    _verificar_cliente_sem_agendamento_ativo(session, cliente_id, hoje)
+    _verificar_horario_livre(session, funcionario_id, dia, hora, duracao)
+    # Grava primeiro e confere depois, na mesma transação: o INSERT já segura a trava
+    # de escrita do SQLite, então a segunda conferência enxerga tudo o que outra sessão
+    # confirmou antes e nada entra entre ela e o commit. Os índices únicos parciais
+    # cobrem o mesmo horário e a reserva do cliente até fora deste caminho; a conferência
+    # cobre o que índice não vê (sobreposição pela duração do serviço).
+    try:
+        with transacao(session):
+            agendamento_repository.liberar_reservas_vencidas(session, cliente_id, antes_de=hoje)
+            agendamento = agendamento_repository.criar(
+                session, cliente_id, funcionario_id, servico_id, dia, hora, reserva_do_cliente=True
+            )
+            _verificar_cliente_sem_agendamento_ativo(session, cliente_id, hoje, ignorar_id=agendamento.id)
+            _verificar_horario_livre(session, funcionario_id, dia, hora, duracao, ignorar_id=agendamento.id)
+    except IntegrityError as erro:
+        indice = _indice_unico_violado(erro)
+        if indice == INDICE_RESERVA_DO_CLIENTE:
+            # A outra reserva já está confirmada: a conferência de novo dá a mensagem com a data dela.
+            _verificar_cliente_sem_agendamento_ativo(session, cliente_id, hoje)
+            raise AgendamentoDuplicadoError(
+                "Este cliente já tem um agendamento ativo. "
+                "Conclua ou cancele o agendamento atual antes de marcar outro."
+            ) from erro
+        if indice == INDICE_HORARIO_AGENDADO:
+            raise ConflitoDeHorarioError(
+                f"O horário {hora} já está ocupado para este funcionário nesta data."
+            ) from erro
+        raise
+    return agendamento
+
+
+def _verificar_cliente_sem_agendamento_ativo(
+    session: Session, cliente_id: int, hoje: date, ignorar_id: Optional[int] = None
+) -> None:
+    ativos = [
+        a
+        for a in agendamento_repository.listar_ativos_do_cliente(session, cliente_id, a_partir_de=hoje)
+        if a.id != ignorar_id
+    ]
     if ativos:
         existente = ativos[0]
         raise AgendamentoDuplicadoError(
@@ -110,12 +260,33 @@ def criar_agendamento(
             f"{existente.data.strftime('%d/%m/%Y')} às {existente.hora}. "
             "Conclua ou cancele o agendamento atual antes de marcar outro."
         )
-    ocupados = agendamento_repository.listar_horarios_ocupados(session, funcionario_id, dia)
-    if hora in ocupados:
+
+
+def _verificar_horario_livre(
+    session: Session,
+    funcionario_id: int,
+    dia: date,
+    hora: str,
+    duracao: Optional[int],
+    ignorar_id: Optional[int] = None,
+) -> None:
+    expediente = expediente_service.grade(session, funcionario_id, dia.weekday())
+    ocupacao = disponibilidade.ocupacao_do_dia(session, dia, [funcionario_id], ignorar_id).get(funcionario_id, 0)
+    if not disponibilidade.cabe(ocupacao, hora, duracao, expediente):
+        if ocupacao & disponibilidade.mascara_do_atendimento(hora, None):
+            raise ConflitoDeHorarioError(
+                f"O horário {hora} já está ocupado para este funcionário nesta data."
+            )
+        if not expediente:
+            raise ConflitoDeHorarioError("O funcionário está de folga neste dia da semana.")
+        if disponibilidade.DIA_CHEIO & ~expediente & disponibilidade.mascara_do_atendimento(hora, duracao):
+            raise ConflitoDeHorarioError(
+                f"O serviço a partir das {hora} fica fora do expediente do funcionário (horário ou intervalo)."
+            )
         raise ConflitoDeHorarioError(
-            f"O horário {hora} já está ocupado para este funcionário nesta data."
+            f"O serviço não cabe a partir das {hora}: invadiria outro agendamento "
+            "ou passaria do fechamento."
         )
-    return agendamento_repository.criar(session, cliente_id, funcionario_id, servico_id, dia, hora)
 
 
 def lancar_atendimento_avulso(
@@ -160,11 +331,44 @@ def _avaliar_blacklist(session: Session, agendamento_id: int) -> None:
     agendamento = agendamento_repository.obter_por_id(session, agendamento_id)
     if agendamento is None:
         return
-    faltas = agendamento_repository.contar_faltas_do_cliente(session, agendamento.cliente_id)
-    if faltas >= LIMITE_FALTAS_BLACKLIST:
+    faltas = agendamento_repository.faltas_por_cliente(session, [agendamento.cliente_id])
+    if faltas.get(agendamento.cliente_id, 0) >= LIMITE_FALTAS_BLACKLIST:
         cliente_repository.definir_bloqueio(session, agendamento.cliente_id, True)
 
 
+def _validar_conclusao(agendamento: Agendamento, agora: datetime) -> None:
+    # Concluir gera receita; só pode acontecer depois do horário marcado,
+    # senão o financeiro registra dinheiro de um serviço que ainda não houve.
+    inicio = datetime.combine(agendamento.data, datetime.strptime(agendamento.hora, "%H:%M").time())
+    if inicio > agora:
+        raise ConclusaoAntecipadaError(
+            f"Não é possível concluir antes do horário agendado "
+            f"({agendamento.data.strftime('%d/%m/%Y')} às {agendamento.hora})."
+        )
+
+
+def _erro_reativacao(agendamento: Agendamento) -> ConflitoDeHorarioError:
+    return ConflitoDeHorarioError(
+        f"Não é possível reativar: o horário {agendamento.hora} já foi ocupado por outro agendamento."
+    )
+
+
+def _ocupar_ao_reativar(agendamento: Agendamento, ocupacao: int, expediente: int) -> int:
+    """Ocupação do dia com `agendamento` de volta na agenda.
+
+    Reativar exige que o serviço inteiro (pela duração) ainda caiba: após um cancelamento,
+    outro cliente pode ter tomado parte do horário, ou o expediente do funcionário mudou.
+    """
+    atendimento = disponibilidade.mascara_do_atendimento(agendamento.hora, agendamento.servico.duracao)
+    if ocupacao & atendimento:
+        raise _erro_reativacao(agendamento)
+    if disponibilidade.DIA_CHEIO & ~expediente & atendimento:
+        raise ConflitoDeHorarioError(
+            f"Não é possível reativar: o serviço das {agendamento.hora} fica fora do expediente do funcionário."
+        )
+    return ocupacao | atendimento
+
+
 def alterar_status(
     session: Session,
     agendamento_id: int,
@@ -176,34 +380,30 @@ def alterar_status(
         raise ValueError(f"Status inválido: {status}")
     _validar_forma_pagamento(forma_pagamento)
     if status == STATUS_CONCLUIDO:
-        # Concluir gera receita; só pode acontecer depois do horário marcado,
-        # senão o financeiro registra dinheiro de um serviço que ainda não houve.
         agendamento = agendamento_repository.obter_por_id(session, agendamento_id)
         if agendamento is not None:
-            agora = agora or datetime.now()
-            inicio = datetime.combine(
-                agendamento.data, datetime.strptime(agendamento.hora, "%H:%M").time()
-            )
-            if inicio > agora:
-                raise ConclusaoAntecipadaError(
-                    f"Não é possível concluir antes do horário agendado "
-                    f"({agendamento.data.strftime('%d/%m/%Y')} às {agendamento.hora})."
-                )
+            _validar_conclusao(agendamento, agora or datetime.now())
     if status == STATUS_AGENDADO:
         # Reativar um agendamento exige que o horário ainda esteja livre —
         # após um cancelamento, outro cliente pode ter tomado o slot.
         agendamento = agendamento_repository.obter_por_id(session, agendamento_id)
         if agendamento is not None:
-            ocupados = agendamento_repository.listar_horarios_ocupados(
-                session, agendamento.funcionario_id, agendamento.data, ignorar_id=agendamento.id
+            fid = agendamento.funcionario_id
+            ocupacao = disponibilidade.ocupacao_do_dia(session, agendamento.data, [fid], ignorar_id=agendamento.id)
+            _ocupar_ao_reativar(
+                agendamento, ocupacao.get(fid, 0), expediente_service.grade(session, fid, agendamento.data.weekday())
             )
-            if agendamento.hora in ocupados:
-                raise ConflitoDeHorarioError(
-                    f"Não é possível reativar: o horário {agendamento.hora} já foi ocupado por outro agendamento."
-                )
-    agendamento_repository.atualizar_status(session, agendamento_id, status, forma_pagamento)
-    if status in (STATUS_CANCELADO, STATUS_NAO_COMPARECEU):
-        _avaliar_blacklist(session, agendamento_id)
+    # Novo status e eventual bloqueio do cliente entram juntos, num commit só.
+    try:
+        with transacao(session):
+            agendamento_repository.atualizar_status(session, agendamento_id, status, forma_pagamento)
+            if status in (STATUS_CANCELADO, STATUS_NAO_COMPARECEU):
+                _avaliar_blacklist(session, agendamento_id)
+    except IntegrityError as erro:
+        if _indice_unico_violado(erro) != INDICE_HORARIO_AGENDADO:
+            raise
+        # Outra sessão agendou o mesmo horário entre a checagem e o UPDATE (índice único).
+        raise _erro_reativacao(agendamento) from erro
 
 
 def alterar_status_em_lote(
@@ -213,9 +413,51 @@ def alterar_status_em_lote(
     agora: Optional[datetime] = None,
     forma_pagamento: Optional[str] = None,
 ) -> int:
-    """Aplica o mesmo status a vários agendamentos. Retorna quantos foram alterados."""
-    alterados = 0
-    for agendamento_id in agendamento_ids:
-        alterar_status(session, agendamento_id, status, agora=agora, forma_pagamento=forma_pagamento)
-        alterados += 1
-    return alterados
+    """Aplica o mesmo status a vários agendamentos. Retorna quantos foram alterados.
+
+    Mesmas regras e mensagens de `alterar_status`, item a item e na ordem recebida,
+    mas em lote: uma leitura dos alvos, validação em memória, um UPDATE, uma contagem
+    agrupada de faltas para o bloqueio e um único commit — tudo ou nada.
+    """
+    if status not in STATUS_LABELS:
+        raise ValueError(f"Status inválido: {status}")
+    _validar_forma_pagamento(forma_pagamento)
+    ids = list(dict.fromkeys(agendamento_ids))
+    por_id = {a.id: a for a in agendamento_repository.listar_por_ids(session, ids)}
+    alvos = [por_id[agendamento_id] for agendamento_id in ids if agendamento_id in por_id]
+
+    if status == STATUS_CONCLUIDO:
+        agora = agora or datetime.now()
+        for agendamento in alvos:
+            _validar_conclusao(agendamento, agora)
+    if status == STATUS_AGENDADO:
+        # Uma máscara por (funcionário, dia) afetado, sem os próprios alvos: cada item
+        # reativado passa a ocupar a agenda para os seguintes do lote.
+        ocupacoes: dict[tuple[int, date], int] = {}
+        expedientes: dict[tuple[int, date], int] = {}
+        for dia in {a.data for a in alvos}:
+            funcionarios = list({a.funcionario_id for a in alvos if a.data == dia})
+            ocupacao = disponibilidade.ocupacao_do_dia(session, dia, funcionarios, ignorar_ids=[a.id for a in alvos])
+            for fid, expediente in expediente_service.grades_do_dia(session, dia, funcionarios).items():
+                ocupacoes[(fid, dia)] = ocupacao.get(fid, 0)
+                expedientes[(fid, dia)] = expediente
+        for agendamento in alvos:
+            chave = (agendamento.funcionario_id, agendamento.data)
+            ocupacoes[chave] = _ocupar_ao_reativar(agendamento, ocupacoes[chave], expedientes[chave])
+
+    try:
+        with transacao(session):
+            agendamento_repository.atualizar_status_em_lote(session, [a.id for a in alvos], status, forma_pagamento)
+            if status in (STATUS_CANCELADO, STATUS_NAO_COMPARECEU):
+                clientes = list({a.cliente_id for a in alvos})
+                faltas = agendamento_repository.faltas_por_cliente(session, clientes)
+                cliente_repository.bloquear_em_lote(
+                    session, [c for c in clientes if faltas.get(c, 0) >= LIMITE_FALTAS_BLACKLIST]
+                )
+    except IntegrityError as erro:
+        if _indice_unico_violado(erro) != INDICE_HORARIO_AGENDADO:
+            raise
+        raise ConflitoDeHorarioError(
+            "Não é possível reativar: um dos horários acabou de ser ocupado por outro agendamento."
+        ) from erro
+    return len(alvos)
@@ -0,0 +1,184 @@
+"""Cache de leituras dos serviços, invalidado pelas escritas.
+
+A chave de cada entrada é (função, banco, argumentos, versão dos dados). Toda
+escrita de repositório passa por `confirmar`/`transacao`, que incrementam a
+versão depois do commit — a entrada antiga deixa de casar e sai pelo LRU.
+Reabrir um relatório sem nenhuma escrita no meio não vai ao banco.
+
+Vale para o processo atual: escritas feitas por outro processo (comandos.py,
+outra instância do app) não mudam a versão daqui.
+
+Os resultados são compartilhados entre chamadas; quem recebe não deve alterá-los.
+"""
+
+import functools
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.config import CACHE_LEITURAS_MAX_MB
+from src.database.transacao import em_transacao, versao_do_assunto, versao_dos_dados, versoes_dos_assuntos
+
+
+class _CacheLRU:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entradas: OrderedDict = OrderedDict()  # chave -> (valor, tamanho)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.faltas += 1
+                return False, None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return True, entrada[0]
+
+    def guardar(self, chave, valor) -> None:
+        tamanho = _tamanho_aproximado(valor)
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            antiga = self._entradas.pop(chave, None)
+            if antiga is not None:
+                self._bytes -= antiga[1]
+            self._entradas[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.max_bytes:
+                _, (_, liberado) = self._entradas.popitem(last=False)
+                self._bytes -= liberado
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self.acertos = 0
+            self.faltas = 0
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "itens": len(self._entradas),
+                "bytes": self._bytes,
+            }
+
+
+def _tamanho_aproximado(valor, _vistos=None) -> int:
+    """Bytes ocupados por `valor` e pelo que ele contém (listas, dicts, linhas, objetos simples)."""
+    vistos = _vistos if _vistos is not None else set()
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, (str, bytes, int, float, bool)) or valor is None:
+        return tamanho
+    if isinstance(valor, dict):
+        return tamanho + sum(
+            _tamanho_aproximado(k, vistos) + _tamanho_aproximado(v, vistos) for k, v in valor.items()
+        )
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return tamanho + sum(_tamanho_aproximado(item, vistos) for item in valor)
+    if hasattr(valor, "_mapping"):  # Row do SQLAlchemy
+        return tamanho + sum(_tamanho_aproximado(item, vistos) for item in tuple(valor))
+    if hasattr(valor, "__dict__"):
+        return tamanho + _tamanho_aproximado(vars(valor), vistos)
+    return tamanho
+
+
+_cache = _CacheLRU(int(CACHE_LEITURAS_MAX_MB * 1024 * 1024))
+
+_VERSAO_NO_INICIO = "cache_versao_no_inicio"
+_ASSUNTOS_NO_INICIO = "cache_assuntos_no_inicio"
+
+
+@event.listens_for(Session, "after_begin")
+def _anotar_versao(session, transaction, connection) -> None:
+    session.info[_VERSAO_NO_INICIO] = versao_dos_dados()
+    session.info[_ASSUNTOS_NO_INICIO] = versoes_dos_assuntos()
+
+
+def _versao_vista(session: Session, assunto: Optional[str] = None) -> int:
+    """Versão dos dados (ou só do `assunto`) que a sessão enxerga.
+
+    Uma transação já aberta lê o banco como estava quando começou; usar a versão
+    atual guardaria esse retrato antigo sob o número novo.
+    """
+    if assunto is not None:
+        if session.in_transaction() and _ASSUNTOS_NO_INICIO in session.info:
+            return session.info[_ASSUNTOS_NO_INICIO].get(assunto, 0)
+        return versao_do_assunto(assunto)
+    if session.in_transaction():
+        return session.info.get(_VERSAO_NO_INICIO, versao_dos_dados())
+    return versao_dos_dados()
+
+
+def _identificar_banco(session: Session) -> str:
+    return str(session.get_bind().url)
+
+
+def chave_da_sessao(session: Session, assunto: Optional[str] = None):
+    """(banco, versão dos dados vista pela sessão) para guardar o que ela leu. Com `assunto`,
+    a versão dele (transacao.versao_do_assunto), que só muda quando ele é gravado.
+
+    None quando a sessão tem escritas pendentes ou está dentro de `transacao`: ela
+    vê dados que os outros ainda não veem, e a leitura deve ir direto ao banco.
+    """
+    if em_transacao(session) or session.new or session.dirty or session.deleted:
+        return None
+    return _identificar_banco(session), _versao_vista(session, assunto)
+
+
+def em_cache(funcao):
+    """Decora uma leitura de serviço que recebe a sessão como argumento.
+
+    A sessão fica fora da chave (só o banco a que ela aponta entra). Com escritas
+    pendentes ou dentro de `transacao`, a sessão vê dados que os outros ainda não
+    veem — nesses casos a função roda direto, sem ler nem gravar no cache.
+    """
+
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        session = next((a for a in args if isinstance(a, Session)), None)
+        banco_e_versao = chave_da_sessao(session) if session is not None else None
+        if banco_e_versao is None:
+            return funcao(*args, **kwargs)
+        banco, versao = banco_e_versao
+        chave = (
+            funcao.__module__,
+            funcao.__qualname__,
+            banco,
+            tuple(a for a in args if a is not session),
+            tuple(sorted(kwargs.items())),
+            versao,
+        )
+        try:
+            encontrado, valor = _cache.obter(chave)
+        except TypeError:  # argumento não hashable: sem cache
+            return funcao(*args, **kwargs)
+        if encontrado:
+            return valor
+        valor = funcao(*args, **kwargs)
+        _cache.guardar(chave, valor)
+        return valor
+
+    return envoltorio
+
+
+def limpar() -> None:
+    _cache.limpar()
+
+
+def estatisticas() -> dict:
+    """Acertos, faltas, itens guardados e bytes estimados do cache."""
+    return _cache.estatisticas()
@@ -1,3 +1,4 @@
+import itertools
 from datetime import date, datetime, timedelta
 from typing import Optional
 
@@ -5,8 +6,9 @@ from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from src.config import HORARIO_ABERTURA, HORARIO_FECHAMENTO
-from src.database.models import STATUS_CONCLUIDO, Agendamento, FechamentoCaixa, Servico
-from src.repositories import adiantamento_repository, caixa_repository
+from src.database.models import STATUS_CONCLUIDO, Agendamento, FechamentoCaixa
+from src.database.transacao import transacao
+from src.repositories import adiantamento_repository, caixa_repository, dia_fechado_repository
 
 STATUS_NAO_ABERTO = "nao_aberto"
 STATUS_ABERTO = "aberto"
@@ -15,6 +17,9 @@ STATUS_FECHADO = "fechado"
 # Quantos dias para trás procurar caixas abertos sem fechamento.
 JANELA_PENDENCIAS_DIAS = 7
 
+_contador_do_caixa = itertools.count(1)
+_versao_do_caixa = 0
+
 
 class CaixaError(Exception):
     pass
@@ -22,9 +27,7 @@ class CaixaError(Exception):
 
 def receita_servicos_do_dia(session: Session, dia: date) -> float:
     stmt = (
-        select(func.coalesce(func.sum(Servico.preco), 0.0))
-        .select_from(Agendamento)
-        .join(Servico, Agendamento.servico_id == Servico.id)
+        select(func.coalesce(func.sum(Agendamento.preco_cobrado), 0.0))
         .where(Agendamento.data == dia, Agendamento.status == STATUS_CONCLUIDO)
     )
     return session.scalar(stmt) or 0.0
@@ -38,6 +41,20 @@ def status_do_dia(session: Session, dia: date) -> str:
     return STATUS_NAO_ABERTO
 
 
+def versao_do_caixa() -> int:
+    """Número que muda a cada abertura ou fechamento de caixa neste processo.
+
+    Quem guarda `situacao` (a barra lateral do app, por sessão) compara com ele para
+    descartar o que guardou.
+    """
+    return _versao_do_caixa
+
+
+def _caixa_mudou() -> None:
+    global _versao_do_caixa
+    _versao_do_caixa = next(_contador_do_caixa)
+
+
 def abrir_caixa(
     session: Session,
     dia: date,
@@ -53,9 +70,11 @@ def abrir_caixa(
     if status == STATUS_ABERTO:
         raise CaixaError(f"O caixa de {dia.strftime('%d/%m/%Y')} já está aberto.")
     agora = agora or datetime.now()
-    return caixa_repository.criar_abertura(
+    abertura = caixa_repository.criar_abertura(
         session, dia, valor_inicial, agora.strftime("%H:%M"), aberto_por
     )
+    _caixa_mudou()
+    return abertura
 
 
 def resumo_do_dia(session: Session, dia: date) -> dict:
@@ -76,54 +95,70 @@ def resumo_do_dia(session: Session, dia: date) -> dict:
 
 
 def fechar_caixa(session: Session, dia: date, observacao: Optional[str] = None) -> FechamentoCaixa:
-    status = status_do_dia(session, dia)
-    if status == STATUS_FECHADO:
-        raise CaixaError(f"O caixa de {dia.strftime('%d/%m/%Y')} já foi fechado.")
-    if status == STATUS_NAO_ABERTO:
-        raise CaixaError(
-            f"O caixa de {dia.strftime('%d/%m/%Y')} ainda não foi aberto — abra antes de fechar."
+    """Grava o fechamento do dia e congela os totais de agendamentos dele para os relatórios
+    (recongelando também dias fechados que foram corrigidos depois)."""
+    # Status, resumo e gravação na mesma transação: o fechamento reflete exatamente o que foi lido.
+    with transacao(session):
+        status = status_do_dia(session, dia)
+        if status == STATUS_FECHADO:
+            raise CaixaError(f"O caixa de {dia.strftime('%d/%m/%Y')} já foi fechado.")
+        if status == STATUS_NAO_ABERTO:
+            raise CaixaError(
+                f"O caixa de {dia.strftime('%d/%m/%Y')} ainda não foi aberto — abra antes de fechar."
+            )
+        resumo = resumo_do_dia(session, dia)
+        fechamento = caixa_repository.criar_fechamento(
+            session,
+            dia,
+            receita_servicos=resumo["receita_servicos"],
+            entradas=resumo["entradas"],
+            saidas=resumo["saidas"],
+            adiantamentos=resumo["adiantamentos"],
+            saldo=resumo["saldo"],
+            observacao=observacao,
         )
-    resumo = resumo_do_dia(session, dia)
-    return caixa_repository.criar_fechamento(
-        session,
-        dia,
-        receita_servicos=resumo["receita_servicos"],
-        entradas=resumo["entradas"],
-        saidas=resumo["saidas"],
-        adiantamentos=resumo["adiantamentos"],
-        saldo=resumo["saldo"],
-        observacao=observacao,
-    )
+        dia_fechado_repository.congelar(session, dia_fechado_repository.dias_sujos(session))
+    _caixa_mudou()
+    return fechamento
 
 
-def pendencias(session: Session, agora: Optional[datetime] = None) -> list[dict]:
-    """Lembretes inteligentes do caixa, do mais urgente para o menos.
+def situacao(session: Session, hoje: date) -> dict:
+    """Dias da janela abertos e nunca fechados, e o status de hoje — numa consulta só.
+
+    {"dias_pendentes": [date, ...], "status_hoje": STATUS_*}
+    """
+    inicio_janela = hoje - timedelta(days=JANELA_PENDENCIAS_DIAS)
+    dias_pendentes, status_hoje = [], STATUS_NAO_ABERTO
+    for dia, fechado in caixa_repository.aberturas_sem_fechamento(session, inicio_janela, hoje):
+        if dia == hoje:
+            status_hoje = STATUS_FECHADO if fechado else STATUS_ABERTO
+        else:
+            dias_pendentes.append(dia)
+    return {"dias_pendentes": dias_pendentes, "status_hoje": status_hoje}
+
+
+def alertas(situacao_do_caixa: dict, agora: datetime) -> list[dict]:
+    """Lembretes inteligentes do caixa a partir de `situacao`, do mais urgente para o menos.
 
     - Dias anteriores abertos e nunca fechados (erro: o financeiro fica furado);
     - Hoje após o fim do expediente com caixa ainda aberto (hora de fechar);
     - Hoje dentro do expediente com caixa ainda não aberto (aviso).
     """
-    agora = agora or datetime.now()
-    hoje = agora.date()
-    alertas = []
-
-    inicio_janela = hoje - timedelta(days=JANELA_PENDENCIAS_DIAS)
-    for abertura in caixa_repository.listar_aberturas(session, inicio_janela, hoje - timedelta(days=1)):
-        if caixa_repository.obter_fechamento(session, abertura.data) is None:
-            alertas.append(
-                {
-                    "nivel": "erro",
-                    "mensagem": (
-                        f"🔴 O caixa de {abertura.data.strftime('%d/%m/%Y')} ficou aberto e nunca "
-                        "foi fechado. Feche-o para regularizar o financeiro."
-                    ),
-                }
-            )
-
-    status_hoje = status_do_dia(session, hoje)
+    resultado = [
+        {
+            "nivel": "erro",
+            "mensagem": (
+                f"🔴 O caixa de {dia.strftime('%d/%m/%Y')} ficou aberto e nunca "
+                "foi fechado. Feche-o para regularizar o financeiro."
+            ),
+        }
+        for dia in situacao_do_caixa["dias_pendentes"]
+    ]
+
+    status_hoje = situacao_do_caixa["status_hoje"]
     hora_atual = agora.strftime("%H:%M")
     if status_hoje == STATUS_ABERTO and hora_atual >= HORARIO_FECHAMENTO:
-        alertas.append(
+        resultado.append(
             {
                 "nivel": "aviso",
                 "mensagem": (
@@ -133,10 +168,16 @@ def pendencias(session: Session, agora: Optional[datetime] = None) -> list[dict]
             }
         )
     elif status_hoje == STATUS_NAO_ABERTO and HORARIO_ABERTURA <= hora_atual < HORARIO_FECHAMENTO:
-        alertas.append(
+        resultado.append(
             {
                 "nivel": "info",
                 "mensagem": "🟡 O caixa de hoje ainda não foi aberto. Abra o caixa para começar o dia.",
             }
         )
-    return alertas
+    return resultado
+
+
+def pendencias(session: Session, agora: Optional[datetime] = None) -> list[dict]:
+    """`alertas` da situação atual do caixa (uma consulta)."""
+    agora = agora or datetime.now()
+    return alertas(situacao(session, agora.date()), agora)
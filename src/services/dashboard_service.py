@@ -1,33 +1,98 @@
+from datetime import date
+from typing import Optional
+
 import pandas as pd
 from sqlalchemy.orm import Session
 
 from src.database.models import STATUS_CANCELADO, STATUS_CONCLUIDO, STATUS_NAO_COMPARECEU
-from src.repositories import agendamento_repository
+from src.repositories import agendamento_repository, receita_diaria_repository
+from src.services.cache import em_cache
+from src.services.relatorio_service import _periodo_anterior
+from src.services.tabela import montar_dataframe, quadro_de_agendamentos
+
+TAMANHO_PAGINA_AGENDA = 50
+COLUNAS_AGREGADO = ["Data", "Funcionario", "Servico", "Status", "Quantidade", "Preco"]
+
+
+@em_cache
+def carregar_painel(
+    session: Session, inicio: Optional[date], fim: Optional[date], funcionario_id: Optional[int] = None
+) -> dict:
+    """Dados do Dashboard para o período (None/None = todo o histórico) e, se houver, o período anterior.
+
+    Uma consulta agrupada no rollup receita_diaria cobre as duas janelas. `agregado`
+    traz uma linha por (dia, funcionário, serviço, status), com a Quantidade de
+    agendamentos e a soma de Preco — base dos gráficos e de `calcular_metricas`.
+    """
+    anterior = _periodo_anterior(inicio, fim) if inicio is not None else None
+    linhas = receita_diaria_repository.agregado_por_dia(
+        session, anterior[0] if anterior else None, fim, funcionario_id
+    )
+    df = montar_dataframe(linhas, COLUNAS_AGREGADO, categoricas=("Funcionario", "Servico", "Status"), datas=("Data",))
+    corte = pd.Timestamp(inicio) if inicio is not None else None
+    atual = df if corte is None else df[df["Data"] >= corte]
+    return {
+        "agregado": atual,
+        "metricas": calcular_metricas(atual),
+        "metricas_anterior": calcular_metricas(df[df["Data"] < corte]) if anterior else None,
+        "periodo_anterior": anterior,
+    }
+
+
+def pagina_da_agenda(
+    session: Session,
+    inicio: Optional[date],
+    fim: Optional[date],
+    funcionario_id: Optional[int] = None,
+    apos: Optional[tuple] = None,
+    tamanho: int = TAMANHO_PAGINA_AGENDA,
+) -> tuple[pd.DataFrame, Optional[tuple]]:
+    """Uma página da agenda detalhada (colunas de `tabela.COLUNAS_AGENDAMENTOS`) e o
+    cursor da próxima (None quando esta é a última)."""
+    linhas = agendamento_repository.listar_pagina(session, inicio, fim, funcionario_id, apos, tamanho + 1)
+    proximo = None
+    if len(linhas) > tamanho:
+        linhas = linhas[:tamanho]
+        ultima = linhas[-1]
+        proximo = (ultima.data, ultima.hora, ultima.id)
+    return quadro_de_agendamentos(linhas), proximo
 
 
-def listar_agendamentos_detalhado(session: Session):
-    """Base de dados compartilhada entre Dashboard e Faturamento: um agendamento por linha, já com nomes."""
-    return agendamento_repository.listar_detalhado(session)
+def lotes_da_agenda(
+    session: Session,
+    inicio: Optional[date],
+    fim: Optional[date],
+    funcionario_id: Optional[int] = None,
+    lote: int = 5_000,
+):
+    """Todos os agendamentos do período (para exportação), em quadros de até `lote` linhas lidos do cursor."""
+    for linhas in agendamento_repository.iterar_detalhado(session, inicio, fim, funcionario_id, lote).partitions():
+        yield quadro_de_agendamentos(linhas)
 
 
 def calcular_metricas(df: pd.DataFrame) -> dict:
     """Métricas do RF012 sobre o DataFrame de agendamentos.
 
     Espera as colunas Funcionario, Servico, Preco e Status (status crus do banco).
+    Com a coluna Quantidade (linhas já agrupadas, como em `carregar_painel`), cada
+    linha vale Quantidade agendamentos e Preco é a soma deles. Aceita Funcionario,
+    Servico e Status categóricos (os agrupamentos só consideram categorias presentes).
     Receita, ticket médio e rankings consideram apenas atendimentos concluídos;
     as taxas de cancelamento/no-show são sobre o total de agendamentos.
     """
-    total = len(df)
-    concluidos = df[df["Status"] == STATUS_CONCLUIDO]
-    receita = float(concluidos["Preco"].sum())
-    por_servico = concluidos["Servico"].value_counts()
-    por_barbeiro = concluidos.groupby("Funcionario")["Preco"].sum()
+    peso = df["Quantidade"] if "Quantidade" in df.columns else pd.Series(1, index=df.index)
+    total = int(peso.sum())
+    concluidos = df["Status"] == STATUS_CONCLUIDO
+    n_concluidos = int(peso[concluidos].sum())
+    receita = float(df.loc[concluidos, "Preco"].sum())
+    por_servico = peso[concluidos].groupby(df.loc[concluidos, "Servico"], observed=True).sum()
+    por_barbeiro = df[concluidos].groupby("Funcionario", observed=True)["Preco"].sum()
     return {
         "total_agendamentos": total,
         "receita": receita,
-        "ticket_medio": receita / len(concluidos) if len(concluidos) else 0.0,
-        "taxa_cancelamento": float((df["Status"] == STATUS_CANCELADO).mean()) if total else 0.0,
-        "taxa_no_show": float((df["Status"] == STATUS_NAO_COMPARECEU).mean()) if total else 0.0,
+        "ticket_medio": receita / n_concluidos if n_concluidos else 0.0,
+        "taxa_cancelamento": float(peso[df["Status"] == STATUS_CANCELADO].sum() / total) if total else 0.0,
+        "taxa_no_show": float(peso[df["Status"] == STATUS_NAO_COMPARECEU].sum() / total) if total else 0.0,
         "servico_mais_vendido": por_servico.idxmax() if not por_servico.empty else None,
         "barbeiro_top": por_barbeiro.idxmax() if not por_barbeiro.empty else None,
     }
@@ -0,0 +1,174 @@
+"""Disponibilidade da agenda em bitmask: um inteiro por funcionário e dia.
+
+O bit i representa o i-ésimo slot da grade (GRADE[i], de DURACAO_SLOT_MINUTOS):
+ligado = ocupado. Cada agendamento ocupa os slots que a duração do serviço dele
+cobre (um serviço de 60 min às 10:00 ocupa 10:00 e 10:30), e um serviço de k slots
+cabe a partir do slot i se os bits i..i+k-1 estão livres e ele termina até o
+fechamento — um teste de deslocamento e máscara, sem montar listas de horários.
+
+O expediente de cada funcionário (expediente_service) é outra máscara da mesma
+grade: slots fora dela contam como ocupados.
+
+A ocupação de todos os funcionários de um dia (ou de um intervalo de dias) sai de
+uma única consulta (agendamento_repository.listar_ocupacao_do_dia / _do_periodo).
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from src.config import DURACAO_SLOT_MINUTOS, HORARIO_ABERTURA, HORARIO_FECHAMENTO
+from src.repositories import agendamento_repository
+
+
+def minutos(hora: str) -> int:
+    """Minutos desde a meia-noite: "09:30" -> 570."""
+    h, m = hora.split(":")
+    return int(h) * 60 + int(m)
+
+
+_ABERTURA = minutos(HORARIO_ABERTURA)
+_FECHAMENTO = minutos(HORARIO_FECHAMENTO)
+
+# O último slot começa antes do fechamento: um atendimento às 19:00
+# terminaria com a barbearia fechada.
+GRADE: tuple[str, ...] = tuple(
+    f"{m // 60:02d}:{m % 60:02d}" for m in range(_ABERTURA, _FECHAMENTO, DURACAO_SLOT_MINUTOS)
+)
+_INDICE = {hora: i for i, hora in enumerate(GRADE)}
+# Todos os slots da grade ligados.
+DIA_CHEIO = (1 << len(GRADE)) - 1
+
+
+def duracao_efetiva(duracao: Optional[int]) -> int:
+    """Minutos que o atendimento ocupa: serviço sem duração cadastrada (ou não informado) ocupa um slot."""
+    return duracao if duracao and duracao > 0 else DURACAO_SLOT_MINUTOS
+
+
+def slots_do_servico(duracao: Optional[int]) -> int:
+    """Quantos slots um serviço de `duracao` minutos ocupa (no mínimo um)."""
+    return -(-duracao_efetiva(duracao) // DURACAO_SLOT_MINUTOS)
+
+
+def mascara_do_atendimento(hora: str, duracao: Optional[int]) -> int:
+    """Slots da grade cobertos por um atendimento que começa em `hora` e dura `duracao` minutos.
+
+    Funciona também para horários fora da grade (encaixes às 12:10 ocupam 12:00 e 12:30
+    se passarem das 12:30); a parte antes da abertura ou depois do fechamento é ignorada.
+    """
+    inicio = minutos(hora) - _ABERTURA
+    fim = inicio + duracao_efetiva(duracao)
+    primeiro = max(inicio // DURACAO_SLOT_MINUTOS, 0)
+    ultimo = min(-(-fim // DURACAO_SLOT_MINUTOS), len(GRADE))
+    if ultimo <= primeiro:
+        return 0
+    return ((1 << (ultimo - primeiro)) - 1) << primeiro
+
+
+def mascara_do_expediente(
+    inicio: str, fim: str, intervalo_inicio: Optional[str] = None, intervalo_fim: Optional[str] = None
+) -> int:
+    """Slots da grade inteiros dentro de [inicio, fim), menos os que o intervalo toca."""
+    primeiro = max(-(-(minutos(inicio) - _ABERTURA) // DURACAO_SLOT_MINUTOS), 0)
+    ultimo = min((minutos(fim) - _ABERTURA) // DURACAO_SLOT_MINUTOS, len(GRADE))
+    mascara = ((1 << (ultimo - primeiro)) - 1) << primeiro if ultimo > primeiro else 0
+    if intervalo_inicio and intervalo_fim:
+        mascara &= ~mascara_do_atendimento(intervalo_inicio, minutos(intervalo_fim) - minutos(intervalo_inicio))
+    return mascara
+
+
+def contar_slots(mascara: int) -> int:
+    return bin(mascara).count("1")
+
+
+def ocupacao_do_dia(
+    session: Session,
+    dia: date,
+    funcionario_ids: Optional[list[int]] = None,
+    ignorar_id: Optional[int] = None,
+    ignorar_ids: Iterable[int] = (),
+) -> dict[int, int]:
+    """funcionario_id -> bitmask dos slots ocupados no dia (só quem tem agendamento)."""
+    ocupacao: dict[int, int] = {}
+    for funcionario_id, hora, duracao in agendamento_repository.listar_ocupacao_do_dia(
+        session, dia, funcionario_ids, ignorar_id, ignorar_ids
+    ):
+        ocupacao[funcionario_id] = ocupacao.get(funcionario_id, 0) | mascara_do_atendimento(hora, duracao)
+    return ocupacao
+
+
+def ocupacao_por_dia(
+    session: Session, inicio: date, fim: date, funcionario_ids: Optional[list[int]] = None
+) -> Iterator[tuple[date, dict[int, int]]]:
+    """(data, {funcionario_id: bitmask}) de cada dia de [inicio, fim], em ordem (dias
+    sem agendamento vêm com {}).
+
+    Uma consulta para o intervalo inteiro, lida à medida que os dias são pedidos:
+    interromper a iteração cedo não busca o resto do intervalo.
+    """
+    resultado = agendamento_repository.listar_ocupacao_do_periodo(session, inicio, fim, funcionario_ids)
+    try:
+        linhas = iter(resultado)
+        pendente = next(linhas, None)
+        dia = inicio
+        while dia <= fim:
+            ocupacao: dict[int, int] = {}
+            while pendente is not None and pendente.data == dia:
+                _, funcionario_id, hora, duracao = pendente
+                ocupacao[funcionario_id] = ocupacao.get(funcionario_id, 0) | mascara_do_atendimento(hora, duracao)
+                pendente = next(linhas, None)
+            yield dia, ocupacao
+            dia += timedelta(days=1)
+    finally:
+        resultado.close()
+
+
+def inicios_livres(ocupacao: int, duracao: Optional[int], expediente: int = DIA_CHEIO) -> int:
+    """Bitmask dos slots em que um serviço de `duracao` minutos pode começar.
+
+    O slot i fica ligado se os k slots a partir dele estão livres (dentro do
+    `expediente` e sem agendamento): a interseção do livre com ele mesmo deslocado
+    1..k-1 posições. Acima da grade os bits são zero, então quem terminaria depois
+    do fechamento cai fora sozinho — e o mesmo vale para o fim do expediente e o intervalo.
+    """
+    livre = expediente & ~ocupacao
+    cabem = livre
+    for deslocamento in range(1, slots_do_servico(duracao)):
+        cabem &= livre >> deslocamento
+    return cabem
+
+
+def cabe(ocupacao: int, hora: str, duracao: Optional[int], expediente: int = DIA_CHEIO) -> bool:
+    """O serviço cabe na agenda a partir de `hora`: dentro do expediente e sem sobrepor ninguém."""
+    if hora in _INDICE:
+        return bool(inicios_livres(ocupacao, duracao, expediente) >> _INDICE[hora] & 1)
+    inicio = minutos(hora)
+    if inicio < _ABERTURA or inicio + duracao_efetiva(duracao) > _FECHAMENTO:
+        return False
+    return not (ocupacao | DIA_CHEIO & ~expediente) & mascara_do_atendimento(hora, duracao)
+
+
+def horarios(mascara: int) -> list[str]:
+    """Os horários da grade cujos bits estão ligados em `mascara`, em ordem."""
+    return [hora for i, hora in enumerate(GRADE) if mascara >> i & 1]
+
+
+def horarios_livres_do_dia(
+    session: Session,
+    dia: date,
+    funcionario_ids: list[int],
+    duracao: Optional[int],
+    expedientes: Optional[dict[int, int]] = None,
+) -> dict[int, list[str]]:
+    """funcionario_id -> horários em que o serviço cabe no dia, para vários funcionários
+    com uma consulta só. `expedientes`: funcionario_id -> máscara do expediente no dia
+    (quem não estiver nele atende a grade inteira)."""
+    ocupacao = ocupacao_do_dia(session, dia, funcionario_ids)
+    expedientes = expedientes or {}
+    return {
+        funcionario_id: horarios(
+            inicios_livres(ocupacao.get(funcionario_id, 0), duracao, expedientes.get(funcionario_id, DIA_CHEIO))
+        )
+        for funcionario_id in funcionario_ids
+    }
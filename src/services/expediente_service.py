@@ -0,0 +1,180 @@
+"""Expediente dos funcionários: horário de trabalho, intervalo e folga por dia da semana.
+
+Cada expediente vira uma máscara da grade de disponibilidade (bit ligado = o
+funcionário atende naquele slot). As semanas de máscaras ficam guardadas por
+(banco, versão dos expedientes): agenda, próximos horários e a capacidade dos
+relatórios consultam a tabela uma vez por funcionário e versão e depois só leem
+daqui. A versão só muda quando um expediente é gravado (expediente_repository
+marca o assunto) — agendamentos, pagamentos e caixa não descartam as grades. Uma
+sessão com escritas pendentes ou dentro de `transacao` sempre lê do banco.
+"""
+
+import threading
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from src.config import HORARIO_ABERTURA, HORARIO_FECHAMENTO
+from src.repositories import expediente_repository
+from src.services import cache, disponibilidade
+
+# (banco, versão dos expedientes) -> {funcionario_id: máscaras de segunda a domingo}. Só a versão
+# mais recente de cada banco fica guardada.
+_semanas: dict[tuple[str, int], dict[int, tuple[int, ...]]] = {}
+_lock = threading.Lock()
+
+
+def limpar() -> None:
+    with _lock:
+        _semanas.clear()
+
+
+def _mascara(expediente) -> int:
+    if expediente.folga:
+        return 0
+    return disponibilidade.mascara_do_expediente(
+        expediente.inicio, expediente.fim, expediente.intervalo_inicio, expediente.intervalo_fim
+    )
+
+
+def _carregar(
+    session: Session, funcionario_ids: list[int], chave: Optional[tuple[str, int]]
+) -> dict[int, tuple[int, ...]]:
+    """Máscaras da semana inteira dos funcionários dados, com uma consulta.
+
+    Guarda o resultado sob `chave` (banco e versão que a sessão enxergava antes da
+    consulta), a menos que ela seja None ou que uma versão mais nova já esteja guardada.
+    """
+    semanas = {funcionario_id: [disponibilidade.DIA_CHEIO] * 7 for funcionario_id in funcionario_ids}
+    for expediente in expediente_repository.listar(session, funcionario_ids):
+        semanas[expediente.funcionario_id][expediente.dia_semana] = _mascara(expediente)
+    carregadas = {funcionario_id: tuple(semana) for funcionario_id, semana in semanas.items()}
+    if chave is not None:
+        banco, versao = chave
+        with _lock:
+            versoes = [v for b, v in _semanas if b == banco]
+            if all(v <= versao for v in versoes):
+                for v in versoes:
+                    if v < versao:
+                        del _semanas[(banco, v)]
+                _semanas.setdefault(chave, {}).update(carregadas)
+    return carregadas
+
+
+def grades_do_dia_da_semana(session: Session, funcionario_ids: Iterable[int], dia_semana: int) -> dict[int, int]:
+    """funcionario_id -> máscara do expediente no dia da semana (0 = segunda). Só vai ao
+    banco pelos funcionários que ainda não estão guardados na versão que a sessão vê."""
+    ids = list(dict.fromkeys(funcionario_ids))
+    chave = cache.chave_da_sessao(session, expediente_repository.ASSUNTO)
+    guardadas = _semanas.get(chave, {}) if chave is not None else {}
+    faltando = [f for f in ids if f not in guardadas]
+    if faltando:
+        guardadas = {**guardadas, **_carregar(session, faltando, chave)}
+    return {f: guardadas[f][dia_semana] for f in ids}
+
+
+def grade(session: Session, funcionario_id: int, dia_semana: int) -> int:
+    """Máscara do expediente de um funcionário num dia da semana."""
+    return grades_do_dia_da_semana(session, [funcionario_id], dia_semana)[funcionario_id]
+
+
+def grades_do_dia(session: Session, dia: date, funcionario_ids: Iterable[int]) -> dict[int, int]:
+    return grades_do_dia_da_semana(session, funcionario_ids, dia.weekday())
+
+
+def capacidade(session: Session, inicio: date, fim: date, funcionario_ids: Iterable[int]) -> int:
+    """Slots de trabalho da equipe em [inicio, fim], pelos expedientes de cada um.
+
+    Sem funcionários, a grade inteira de uma cadeira por dia (a regra de antes dos expedientes).
+    """
+    ids = list(funcionario_ids)
+    dias = (fim - inicio).days + 1
+    if dias <= 0:
+        return 0
+    if not ids:
+        return dias * len(disponibilidade.GRADE)
+    # Quantas vezes cada dia da semana aparece no período.
+    ocorrencias = [dias // 7] * 7
+    for i in range(dias % 7):
+        ocorrencias[(inicio + timedelta(days=i)).weekday()] += 1
+    total = 0
+    for dia_semana, vezes in enumerate(ocorrencias):
+        if vezes:
+            grades = grades_do_dia_da_semana(session, ids, dia_semana)
+            total += vezes * sum(disponibilidade.contar_slots(mascara) for mascara in grades.values())
+    return total
+
+
+def semana_do_funcionario(session: Session, funcionario_id: int) -> list[dict]:
+    """Os 7 dias (0 = segunda) com o expediente cadastrado; `padrao` = sem cadastro, vale o horário da barbearia."""
+    cadastrados = {e.dia_semana: e for e in expediente_repository.listar(session, [funcionario_id])}
+    semana = []
+    for dia_semana in range(7):
+        expediente = cadastrados.get(dia_semana)
+        if expediente is None:
+            semana.append(
+                {
+                    "dia_semana": dia_semana,
+                    "padrao": True,
+                    "folga": False,
+                    "inicio": HORARIO_ABERTURA,
+                    "fim": HORARIO_FECHAMENTO,
+                    "intervalo_inicio": None,
+                    "intervalo_fim": None,
+                }
+            )
+        else:
+            semana.append(
+                {
+                    "dia_semana": dia_semana,
+                    "padrao": False,
+                    "folga": expediente.folga,
+                    "inicio": expediente.inicio,
+                    "fim": expediente.fim,
+                    "intervalo_inicio": expediente.intervalo_inicio,
+                    "intervalo_fim": expediente.intervalo_fim,
+                }
+            )
+    return semana
+
+
+def _validar_dia_semana(dia_semana: int) -> None:
+    if dia_semana not in range(7):
+        raise ValueError(f"Dia da semana inválido: {dia_semana} (0 = segunda ... 6 = domingo).")
+
+
+def definir_expediente(
+    session: Session,
+    funcionario_id: int,
+    dia_semana: int,
+    inicio: str,
+    fim: str,
+    intervalo_inicio: Optional[str] = None,
+    intervalo_fim: Optional[str] = None,
+) -> None:
+    """Horário de trabalho do funcionário no dia da semana, com intervalo opcional."""
+    _validar_dia_semana(dia_semana)
+    if not HORARIO_ABERTURA <= inicio < fim <= HORARIO_FECHAMENTO:
+        raise ValueError(
+            f"O expediente deve começar antes de terminar e ficar entre {HORARIO_ABERTURA} e {HORARIO_FECHAMENTO}."
+        )
+    if bool(intervalo_inicio) != bool(intervalo_fim):
+        raise ValueError("Informe o início e o fim do intervalo (ou nenhum dos dois).")
+    if intervalo_inicio and not inicio < intervalo_inicio < intervalo_fim < fim:
+        raise ValueError("O intervalo deve ficar dentro do expediente.")
+    expediente_repository.definir(
+        session, funcionario_id, dia_semana, False, inicio, fim, intervalo_inicio or None, intervalo_fim or None
+    )
+
+
+def definir_folga(session: Session, funcionario_id: int, dia_semana: int) -> None:
+    """O funcionário não atende nesse dia da semana."""
+    _validar_dia_semana(dia_semana)
+    expediente_repository.definir(session, funcionario_id, dia_semana, True)
+
+
+def usar_horario_da_barbearia(session: Session, funcionario_id: int, dia_semana: int) -> None:
+    """Remove o expediente do dia: volta a valer HORARIO_ABERTURA a HORARIO_FECHAMENTO."""
+    _validar_dia_semana(dia_semana)
+    expediente_repository.remover(session, funcionario_id, dia_semana)
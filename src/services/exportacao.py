@@ -0,0 +1,112 @@
+"""Exportação de relatórios em Excel e CSV, lote a lote e com memória constante.
+
+As funções recebem `lotes`: um iterável de DataFrames pequenos (em geral montados
+a partir de um cursor lido com yield_per — ver `faturamento_service.lotes_de_repasse`
+e `dashboard_service.lotes_da_agenda`). Cada lote é formatado e escrito antes do
+próximo ser lido, de modo que nunca existe um quadro com o período inteiro.
+
+`colunas` lista (campo do lote, título, formato), com formato None, "moeda",
+"percentual" ou "data".
+"""
+
+import csv
+import io
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+import xlsxwriter
+
+from src.ui.formatos import moeda, percentual
+
+Colunas = list[tuple[str, str, Optional[str]]]
+
+# Mesmo visual de moeda()/percentual() dentro do Excel, mas com a célula numérica.
+_FORMATOS_EXCEL = {"moeda": '"R$" #,##0.00', "percentual": "0.0%", "data": "dd/mm/yyyy"}
+_FORMATOS_TEXTO = {
+    "moeda": moeda,
+    "percentual": percentual,
+    "data": lambda d: d.strftime("%d/%m/%Y"),
+}
+
+
+def _formatar_para_texto(lote: pd.DataFrame, colunas: Colunas) -> pd.DataFrame:
+    formatado = {}
+    for campo, titulo, formato in colunas:
+        serie = lote[campo]
+        if formato is not None:
+            funcao = _FORMATOS_TEXTO[formato]
+            serie = serie.map(lambda v: "" if pd.isna(v) else funcao(v)).astype(object)
+        formatado[titulo] = serie.to_numpy(dtype=object)
+    return pd.DataFrame(formatado)
+
+
+def gerar_csv(lotes: Iterable[pd.DataFrame], colunas: Colunas) -> Iterator[bytes]:
+    """CSV (UTF-8 com BOM, como o Excel espera) em pedaços de bytes, um por lote."""
+    cabecalho = io.StringIO()
+    csv.writer(cabecalho).writerow([titulo for _, titulo, _ in colunas])
+    yield cabecalho.getvalue().encode("utf-8-sig")
+    for lote in lotes:
+        if lote.empty:
+            continue
+        yield _formatar_para_texto(lote, colunas).to_csv(header=False, index=False).encode("utf-8")
+
+
+def _valor_excel(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    if hasattr(valor, "item"):  # escalares NumPy -> int/float do Python
+        return valor.item()
+    return valor
+
+
+def escrever_excel(destino, lotes: Iterable[pd.DataFrame], colunas: Colunas, aba: str = "Relatório") -> int:
+    """Grava o .xlsx em `destino` (caminho ou arquivo binário) e devolve o número de linhas.
+
+    constant_memory: o XlsxWriter descarrega cada linha assim que a próxima começa,
+    então a memória não cresce com o tamanho da exportação.
+    """
+    workbook = xlsxwriter.Workbook(destino, {"constant_memory": True})
+    try:
+        worksheet = workbook.add_worksheet(aba[:31])
+        negrito = workbook.add_format({"bold": True})
+        formatos = [
+            workbook.add_format({"num_format": _FORMATOS_EXCEL[formato]}) if formato else None
+            for _, _, formato in colunas
+        ]
+        for indice, (_, titulo, _) in enumerate(colunas):
+            worksheet.write_string(0, indice, titulo, negrito)
+            worksheet.set_column(indice, indice, max(12, len(titulo) + 2))
+        linha = 0
+        campos = [campo for campo, _, _ in colunas]
+        for lote in lotes:
+            for valores in lote[campos].itertuples(index=False, name=None):
+                linha += 1
+                for indice, valor in enumerate(valores):
+                    valor = _valor_excel(valor)
+                    if valor is None:
+                        continue
+                    if formatos[indice] is not None:
+                        worksheet.write(linha, indice, valor, formatos[indice])
+                    else:
+                        worksheet.write(linha, indice, valor)
+    finally:
+        workbook.close()
+    return linha
+
+
+def gerar_excel(lotes: Iterable[pd.DataFrame], colunas: Colunas, aba: str = "Relatório") -> bytes:
+    """O .xlsx pronto para st.download_button. O arquivo é montado em disco; só o resultado
+    compactado vem para a memória."""
+    with tempfile.TemporaryFile() as arquivo:
+        escrever_excel(arquivo, lotes, colunas, aba)
+        arquivo.seek(0)
+        return arquivo.read()
+
+
+def em_lotes(df: pd.DataFrame, tamanho: int = 10_000) -> Iterator[pd.DataFrame]:
+    """Um quadro que já está em memória, fatiado no formato que as exportações recebem."""
+    for inicio in range(0, len(df), tamanho):
+        yield df.iloc[inicio:inicio + tamanho]
@@ -0,0 +1,155 @@
+"""Exportação analítica dos agendamentos em Parquet, particionada por ano e mês.
+
+Layout (partições no estilo Hive, lido direto por pandas/pyarrow/DuckDB/Polars):
+
+    destino/ano=2026/mes=08/agendamentos.parquet
+    destino/_manifesto.json
+
+Cada arquivo traz a tabela fato do mês (`agendamento_repository.iterar_fato`),
+com as colunas de texto repetitivas (nomes, status, forma de pagamento)
+dicionarizadas. O manifesto guarda a assinatura de cada mês exportado; uma nova
+exportação reescreve só os meses cuja assinatura mudou, remove os que ficaram
+vazios e não toca nos demais. Renomear cliente, funcionário ou serviço muda a
+assinatura das dimensões e reescreve tudo (é raro e os nomes estão em todos os meses).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from calendar import monthrange
+from datetime import date
+from pathlib import Path
+from typing import Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.database.models import Cliente, Funcionario, Servico
+from src.repositories import agendamento_repository
+
+ARQUIVO = "agendamentos.parquet"
+MANIFESTO = "_manifesto.json"
+VERSAO_FORMATO = 1
+
+_TEXTO = pa.dictionary(pa.int32(), pa.string())
+ESQUEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("data", pa.date32()),
+        ("hora", pa.string()),
+        ("status", _TEXTO),
+        ("forma_pagamento", _TEXTO),
+        ("cliente_id", pa.int64()),
+        ("cliente", _TEXTO),
+        ("funcionario_id", pa.int64()),
+        ("funcionario", _TEXTO),
+        ("servico_id", pa.int64()),
+        ("servico", _TEXTO),
+        ("preco", pa.float64()),
+        ("percentual", pa.float64()),
+        ("comissao", pa.float64()),
+    ]
+)
+
+
+def _assinatura_das_dimensoes(session: Session) -> str:
+    """Hash dos nomes de clientes, funcionários e serviços (o que a tabela fato copia deles)."""
+    resumo = hashlib.sha256()
+    for modelo in (Cliente, Funcionario, Servico):
+        for id_, nome in session.execute(select(modelo.id, modelo.nome).order_by(modelo.id)):
+            resumo.update(f"{modelo.__tablename__}\x1f{id_}\x1f{nome}\x1e".encode())
+    return resumo.hexdigest()
+
+
+def _assinatura(linhas: int, soma_ids: int, alterado) -> dict:
+    return {"linhas": linhas, "soma_ids": soma_ids, "alterado": alterado.isoformat() if alterado else None}
+
+
+def _lote_arrow(nomes: list[str], linhas) -> pa.RecordBatch:
+    """Linhas de iterar_fato -> RecordBatch no ESQUEMA (comissão = preço x percentual)."""
+    valores = dict(zip(nomes, zip(*linhas)))
+    arrays = {}
+    for campo in ESQUEMA:
+        if campo.name == "comissao":
+            arrays[campo.name] = pc.multiply(arrays["preco"], arrays["percentual"])
+        elif pa.types.is_dictionary(campo.type):
+            arrays[campo.name] = pa.array(valores[campo.name], pa.string()).dictionary_encode()
+        else:
+            arrays[campo.name] = pa.array(valores[campo.name], campo.type)
+    return pa.RecordBatch.from_arrays(list(arrays.values()), schema=ESQUEMA)
+
+
+def caminho_da_particao(destino: Path, ano: int, mes: int) -> Path:
+    return destino / f"ano={ano}" / f"mes={mes:02d}" / ARQUIVO
+
+
+def _escrever_mes(session: Session, arquivo: Path, ano: int, mes: int, lote: int) -> None:
+    """Grava o mês lote a lote num arquivo temporário e só então troca pelo definitivo."""
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    temporario = arquivo.with_suffix(".parquet.tmp")
+    resultado = agendamento_repository.iterar_fato(
+        session, date(ano, mes, 1), date(ano, mes, monthrange(ano, mes)[1]), lote
+    )
+    nomes = list(resultado.keys())
+    with pq.ParquetWriter(temporario, ESQUEMA, compression="zstd") as escritor:
+        for linhas in resultado.partitions():
+            escritor.write_batch(_lote_arrow(nomes, linhas))
+    os.replace(temporario, arquivo)
+
+
+def _ler_manifesto(destino: Path) -> dict:
+    try:
+        manifesto = json.loads((destino / MANIFESTO).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    return manifesto if manifesto.get("versao") == VERSAO_FORMATO else {}
+
+
+def _gravar_manifesto(destino: Path, manifesto: dict) -> None:
+    temporario = destino / f"{MANIFESTO}.tmp"
+    temporario.write_text(json.dumps(manifesto, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(temporario, destino / MANIFESTO)
+
+
+def exportar_agendamentos(
+    session: Session, destino: Union[str, Path], completo: bool = False, lote: int = 10_000
+) -> dict:
+    """Exporta (ou atualiza) o diretório Parquet em `destino`.
+
+    Devolve {"escritos": [(ano, mes), ...], "removidos": [...], "inalterados": n}.
+    `completo=True` ignora o manifesto e reescreve todos os meses.
+    """
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    anterior = _ler_manifesto(destino)
+    dimensoes = _assinatura_das_dimensoes(session)
+    reaproveitar = not completo and anterior.get("dimensoes") == dimensoes
+    exportados = anterior.get("particoes", {}) if reaproveitar else {}
+
+    particoes, escritos, inalterados = {}, [], 0
+    for (ano, mes), valores in sorted(agendamento_repository.assinaturas_por_mes(session).items()):
+        chave = f"{ano}-{mes:02d}"
+        assinatura = _assinatura(*valores)
+        arquivo = caminho_da_particao(destino, ano, mes)
+        if exportados.get(chave) == assinatura and arquivo.exists():
+            inalterados += 1
+        else:
+            _escrever_mes(session, arquivo, ano, mes, lote)
+            escritos.append((ano, mes))
+        particoes[chave] = assinatura
+
+    removidos = []
+    for chave in sorted(set(anterior.get("particoes", {})) - set(particoes)):
+        ano, mes = (int(parte) for parte in chave.split("-"))
+        pasta = caminho_da_particao(destino, ano, mes).parent
+        shutil.rmtree(pasta, ignore_errors=True)
+        if pasta.parent.exists() and not any(pasta.parent.iterdir()):
+            pasta.parent.rmdir()
+        removidos.append((ano, mes))
+
+    _gravar_manifesto(destino, {"versao": VERSAO_FORMATO, "dimensoes": dimensoes, "particoes": particoes})
+    return {"escritos": escritos, "removidos": removidos, "inalterados": inalterados}
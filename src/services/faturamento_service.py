@@ -1,61 +1,83 @@
 from datetime import date
 from typing import Optional
 
+import pandas as pd
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from src.database.models import (
-    FORMA_NAO_INFORMADA,
-    FORMAS_PAGAMENTO,
     PERCENTUAL_COMISSAO_PADRAO,
     STATUS_CONCLUIDO,
     Agendamento,
     Funcionario,
+    ReceitaDiaria,
     Servico,
 )
-from src.repositories import adiantamento_repository, funcionario_repository, pagamento_repository
+from src.repositories import (
+    adiantamento_repository,
+    dia_fechado_repository,
+    funcionario_repository,
+    pagamento_repository,
+)
+from src.services.cache import em_cache
+from src.services.tabela import montar_dataframe
+from src.ui import formatos
+
+# Colunas de faturamento_por_periodo, na ordem do SELECT, e as do repasse por atendimento.
+COLUNAS_PERIODO = ["funcionario_id", "funcionario", "servico", "preco_servico", "percentual", "data"]
+COLUNAS_REPASSE = [
+    "funcionario_id",
+    "funcionario",
+    "servico",
+    "preco_servico",
+    "data",
+    "percentual",
+    "repasse_funcionario",
+    "repasse_loja",
+]
+
 
+# Totais, meses, anos e formas de pagamento leem o rollup receita_diaria: o custo
+# acompanha a quantidade de dias, não de agendamentos. Meses e anos agrupam pelas
+# colunas ano/mes gravadas no rollup (índice ix_receita_diaria_status_ano_mes).
+# As leituras públicas passam pelo cache de leituras (src/services/cache.py),
+# invalidado a cada escrita.
 
+
+@em_cache
 def faturamento_total(session: Session) -> float:
-    stmt = (
-        select(func.coalesce(func.sum(Servico.preco), 0.0))
-        .select_from(Agendamento)
-        .join(Servico, Agendamento.servico_id == Servico.id)
-        .where(Agendamento.status == STATUS_CONCLUIDO)
+    stmt = select(func.coalesce(func.sum(ReceitaDiaria.receita), 0.0)).where(
+        ReceitaDiaria.status == STATUS_CONCLUIDO
     )
     return session.scalar(stmt) or 0.0
 
 
+@em_cache
 def faturamento_por_funcionario(session: Session):
     stmt = (
         select(
             Funcionario.id.label("funcionario_id"),
             Funcionario.nome.label("funcionario"),
-            func.coalesce(func.sum(Servico.preco), 0.0).label("faturamento"),
+            func.coalesce(func.sum(Agendamento.preco_cobrado), 0.0).label("faturamento"),
             func.count(Agendamento.id).label("atendimentos"),
         )
         .select_from(Agendamento)
-        .join(Servico, Agendamento.servico_id == Servico.id)
         .join(Funcionario, Agendamento.funcionario_id == Funcionario.id)
         .where(Agendamento.status == STATUS_CONCLUIDO)
         .group_by(Funcionario.id)
-        .order_by(func.sum(Servico.preco).desc())
+        .order_by(func.sum(Agendamento.preco_cobrado).desc())
     )
     return session.execute(stmt).all()
 
 
-def faturamento_por_periodo(
-    session: Session,
-    data_inicio: date,
-    data_fim: date,
-    funcionario_nome: Optional[str] = None,
-):
+def _consulta_do_periodo(data_inicio: date, data_fim: date, funcionario_nome: Optional[str] = None):
     stmt = (
         select(
             Funcionario.id.label("funcionario_id"),
             Funcionario.nome.label("funcionario"),
             Servico.nome.label("servico"),
-            Servico.preco.label("preco_servico"),
+            Agendamento.preco_cobrado.label("preco_servico"),
+            Agendamento.percentual_comissao.label("percentual"),
             Agendamento.data,
         )
         .select_from(Agendamento)
@@ -66,62 +88,125 @@ def faturamento_por_periodo(
     )
     if funcionario_nome:
         stmt = stmt.where(Funcionario.nome == funcionario_nome)
-    return session.execute(stmt).all()
+    return stmt
 
 
+@em_cache
+def faturamento_por_periodo(
+    session: Session,
+    data_inicio: date,
+    data_fim: date,
+    funcionario_nome: Optional[str] = None,
+):
+    return session.execute(_consulta_do_periodo(data_inicio, data_fim, funcionario_nome)).all()
+
+
+def lotes_de_repasse(
+    session: Session,
+    data_inicio: date,
+    data_fim: date,
+    funcionario_nome: Optional[str] = None,
+    percentuais: Optional[dict[int, float]] = None,
+    lote: int = 5_000,
+):
+    """Repasse do período (COLUNAS_REPASSE) em quadros de até `lote` linhas, lidos do cursor
+    sob demanda — para exportações que não podem carregar anos de atendimentos de uma vez."""
+    resultado = session.execute(
+        _consulta_do_periodo(data_inicio, data_fim, funcionario_nome), execution_options={"yield_per": lote}
+    )
+    for linhas in resultado.partitions():
+        yield calcular_repasse_vetorizado(quadro_do_periodo(linhas), percentuais)
+
+
+@em_cache
 def faturamento_por_mes(session: Session):
-    mes_expr = func.strftime("%m-%Y", Agendamento.data).label("mes")
+    """Receita concluída por (ano, mês), do mês mais recente para o mais antigo."""
     stmt = (
-        select(mes_expr, func.coalesce(func.sum(Servico.preco), 0.0).label("faturamento"))
-        .select_from(Agendamento)
-        .join(Servico, Agendamento.servico_id == Servico.id)
-        .where(Agendamento.status == STATUS_CONCLUIDO)
-        .group_by(mes_expr)
-        .order_by(mes_expr.desc())
+        select(
+            ReceitaDiaria.ano,
+            ReceitaDiaria.mes,
+            func.coalesce(func.sum(ReceitaDiaria.receita), 0.0).label("faturamento"),
+        )
+        .where(ReceitaDiaria.status == STATUS_CONCLUIDO)
+        .group_by(ReceitaDiaria.ano, ReceitaDiaria.mes)
+        .order_by(ReceitaDiaria.ano.desc(), ReceitaDiaria.mes.desc())
     )
     return session.execute(stmt).all()
 
 
+@em_cache
 def faturamento_por_ano(session: Session):
-    ano_expr = func.strftime("%Y", Agendamento.data).label("ano")
     stmt = (
-        select(ano_expr, func.coalesce(func.sum(Servico.preco), 0.0).label("faturamento"))
-        .select_from(Agendamento)
-        .join(Servico, Agendamento.servico_id == Servico.id)
-        .where(Agendamento.status == STATUS_CONCLUIDO)
-        .group_by(ano_expr)
-        .order_by(ano_expr.desc())
+        select(ReceitaDiaria.ano, func.coalesce(func.sum(ReceitaDiaria.receita), 0.0).label("faturamento"))
+        .where(ReceitaDiaria.status == STATUS_CONCLUIDO)
+        .group_by(ReceitaDiaria.ano)
+        .order_by(ReceitaDiaria.ano.desc())
     )
     return session.execute(stmt).all()
 
 
+@em_cache
 def receita_por_forma_pagamento(
     session: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None
 ) -> list[dict]:
     """Receita e atendimentos concluídos agrupados por forma de pagamento."""
     stmt = (
         select(
-            Agendamento.forma_pagamento,
-            func.coalesce(func.sum(Servico.preco), 0.0).label("receita"),
-            func.count(Agendamento.id).label("atendimentos"),
+            ReceitaDiaria.forma_pagamento,
+            func.coalesce(func.sum(ReceitaDiaria.receita), 0.0).label("receita"),
+            func.coalesce(func.sum(ReceitaDiaria.quantidade), 0).label("atendimentos"),
         )
-        .select_from(Agendamento)
-        .join(Servico, Agendamento.servico_id == Servico.id)
-        .where(Agendamento.status == STATUS_CONCLUIDO)
-        .group_by(Agendamento.forma_pagamento)
+        .where(ReceitaDiaria.status == STATUS_CONCLUIDO)
+        .group_by(ReceitaDiaria.forma_pagamento)
     )
     if data_inicio is not None and data_fim is not None:
-        stmt = stmt.where(Agendamento.data.between(data_inicio, data_fim))
-    linhas = session.execute(stmt).all()
-    resultado = [
-        {
-            "forma": FORMAS_PAGAMENTO.get(forma, FORMA_NAO_INFORMADA),
-            "receita": round(receita, 2),
-            "atendimentos": atendimentos,
-        }
-        for forma, receita, atendimentos in linhas
-    ]
-    return sorted(resultado, key=lambda item: item["receita"], reverse=True)
+        stmt = stmt.where(ReceitaDiaria.data.between(data_inicio, data_fim))
+    return formatos.receita_por_forma(session.execute(stmt).all())
+
+
+def quadro_do_periodo(linhas) -> pd.DataFrame:
+    """Linhas de faturamento_por_periodo em colunas (COLUNAS_PERIODO), funcionário e serviço categóricos."""
+    return montar_dataframe(linhas, COLUNAS_PERIODO, categoricas=("funcionario", "servico"), datas=("data",))
+
+
+@em_cache
+def _quadro_de_faturamento(
+    session: Session, data_inicio: date, data_fim: date, funcionario_nome: Optional[str] = None
+) -> pd.DataFrame:
+    return quadro_do_periodo(faturamento_por_periodo(session, data_inicio, data_fim, funcionario_nome))
+
+
+def quadro_de_faturamento(
+    session: Session, data_inicio: date, data_fim: date, funcionario_nome: Optional[str] = None
+) -> pd.DataFrame:
+    """faturamento_por_periodo já em colunas. Montado uma vez por versão dos dados; cada
+    chamada recebe uma cópia, que pode alterar sem mexer no quadro guardado no cache."""
+    return _quadro_de_faturamento(session, data_inicio, data_fim, funcionario_nome).copy()
+
+
+def _percentual_efetivo(
+    df: pd.DataFrame, percentuais: dict[int, float], percentual_padrao: float = PERCENTUAL_COMISSAO_PADRAO
+) -> pd.Series:
+    """Por linha: a comissão gravada (`percentual`); sem ela, `percentuais[funcionario_id]`; por fim o padrão."""
+    efetivo = df["funcionario_id"].map(percentuais).astype(float).fillna(percentual_padrao)
+    if "percentual" in df.columns:
+        efetivo = df["percentual"].astype(float).fillna(efetivo)
+    return efetivo
+
+
+def calcular_repasse_vetorizado(
+    df: pd.DataFrame,
+    percentuais: Optional[dict[int, float]] = None,
+    percentual_padrao: float = PERCENTUAL_COMISSAO_PADRAO,
+) -> pd.DataFrame:
+    """Repasse funcionário/loja de cada atendimento sobre o quadro de `quadro_do_periodo` (COLUNAS_REPASSE)."""
+    percentual = _percentual_efetivo(df, percentuais or {}, percentual_padrao)
+    preco = df["preco_servico"].astype(float).fillna(0.0)
+    return df.assign(
+        percentual=percentual,
+        repasse_funcionario=(preco * percentual).round(2),
+        repasse_loja=(preco * (1 - percentual)).round(2),
+    )[COLUNAS_REPASSE]
 
 
 def calcular_repasse(
@@ -131,55 +216,55 @@ def calcular_repasse(
 ) -> list[dict]:
     """Recebe as linhas de faturamento_por_periodo e calcula o repasse funcionário/loja.
 
-    `percentuais` mapeia funcionario_id -> fração da comissão; quem não estiver
-    no mapa usa o percentual padrão.
+    Vale a comissão gravada na linha (`percentual`, de faturamento_por_periodo);
+    linhas sem ela usam `percentuais` (funcionario_id -> fração) e, por fim, o padrão.
+    Adaptador de `calcular_repasse_vetorizado` para quem ainda trabalha com dicts.
     """
-    percentuais = percentuais or {}
-    resultado = []
-    for row in rows:
-        preco = row.preco_servico
-        percentual = percentuais.get(row.funcionario_id, percentual_padrao)
-        resultado.append(
-            {
-                "funcionario_id": row.funcionario_id,
-                "funcionario": row.funcionario,
-                "servico": row.servico,
-                "preco_servico": preco,
-                "data": row.data,
-                "percentual": percentual,
-                "repasse_funcionario": round(preco * percentual, 2),
-                "repasse_loja": round(preco * (1 - percentual), 2),
-            }
-        )
-    return resultado
+    rows = list(rows)
+    df = pd.DataFrame({coluna: [getattr(row, coluna, None) for row in rows] for coluna in COLUNAS_PERIODO})
+    return calcular_repasse_vetorizado(df, percentuais, percentual_padrao).to_dict("records")
+
 
+def _receitas_por_funcionario(session: Session, data_inicio: date, data_fim: date) -> dict[int, dict]:
+    """funcionario_id -> atendimentos, receita bruta e comissão (pela % gravada em cada atendimento).
 
+    Dias com caixa fechado vêm dos totais congelados no fechamento; só o restante é somado das linhas.
+    """
+    return {
+        funcionario_id: {
+            "atendimentos": item["quantidade"],
+            "receita_bruta": item["receita"],
+            "comissao": item["comissao"],
+        }
+        for (funcionario_id, status), item in dia_fechado_repository.totais_do_periodo(
+            session, data_inicio, data_fim
+        ).items()
+        if status == STATUS_CONCLUIDO
+    }
+
+
+@em_cache
 def relatorio_pagamentos(session: Session, data_inicio: date, data_fim: date) -> list[dict]:
     """Relatório completo de pagamentos por funcionário no período.
 
-    Receita bruta gerada, comissão pela % cadastrada, descontos (vales ainda
+    Receita bruta gerada, comissão pela % gravada em cada atendimento, descontos (vales ainda
     pendentes de abatimento, de qualquer data até o fim do período), o que já
     foi pago em acertos no período e o líquido restante a pagar.
     """
-    linhas = faturamento_por_periodo(session, data_inicio, data_fim)
     percentuais = funcionario_repository.percentuais_por_funcionario(session)
+    receitas = _receitas_por_funcionario(session, data_inicio, data_fim)
     nomes = {f.id: f.nome for f in funcionario_repository.listar(session)}
     vales_pendentes = adiantamento_repository.total_pendente_por_funcionario(session, ate=data_fim)
     pagos = pagamento_repository.total_pago_por_funcionario(session, data_inicio, data_fim)
     abatidos = pagamento_repository.total_abatido_por_funcionario(session, data_inicio, data_fim)
 
-    receitas: dict[int, dict] = {}
-    for row in linhas:
-        item = receitas.setdefault(row.funcionario_id, {"atendimentos": 0, "receita_bruta": 0.0})
-        item["atendimentos"] += 1
-        item["receita_bruta"] += row.preco_servico
-
     resultado = []
     ids = sorted(set(receitas) | set(vales_pendentes) | set(pagos), key=lambda i: nomes.get(i, ""))
     for funcionario_id in ids:
         receita = receitas.get(funcionario_id, {}).get("receita_bruta", 0.0)
         percentual = percentuais.get(funcionario_id, PERCENTUAL_COMISSAO_PADRAO)
-        comissao = round(receita * percentual, 2)
+        # Comissão pela fração gravada em cada atendimento (a % atual só vale para os novos).
+        comissao = round(receitas.get(funcionario_id, {}).get("comissao", 0.0), 2)
         descontos = round(vales_pendentes.get(funcionario_id, 0.0), 2)
         pago = round(pagos.get(funcionario_id, 0.0), 2)
         # O que já foi quitado em acertos = dinheiro pago + vales abatidos neles.
@@ -200,6 +285,7 @@ def relatorio_pagamentos(session: Session, data_inicio: date, data_fim: date) ->
     return resultado
 
 
+@em_cache
 def resumo_financeiro(session: Session, data_inicio: date, data_fim: date) -> dict:
     """Visão da loja no período: bruto, custo com funcionários e o que sobra.
 
@@ -9,8 +9,9 @@ from src.database.models import (
     TIPO_SAIDA,
     Agendamento,
     PagamentoFuncionario,
-    Servico,
+    percentual_da_comissao,
 )
+from src.database.transacao import transacao
 from src.repositories import (
     adiantamento_repository,
     caixa_repository,
@@ -27,18 +28,14 @@ def comissao_do_periodo(session: Session, funcionario_id: int, inicio: date, fim
     funcionario = funcionario_repository.obter_por_id(session, funcionario_id)
     if funcionario is None:
         return 0.0
-    stmt = (
-        select(func.coalesce(func.sum(Servico.preco), 0.0))
-        .select_from(Agendamento)
-        .join(Servico, Agendamento.servico_id == Servico.id)
-        .where(
-            Agendamento.funcionario_id == funcionario_id,
-            Agendamento.status == STATUS_CONCLUIDO,
-            Agendamento.data.between(inicio, fim),
-        )
+    # Cada atendimento rende a comissão gravada nele; linhas sem ela usam a % atual.
+    percentual = percentual_da_comissao(Agendamento.percentual_comissao, funcionario.percentual_comissao)
+    stmt = select(func.coalesce(func.sum(Agendamento.preco_cobrado * percentual), 0.0)).where(
+        Agendamento.funcionario_id == funcionario_id,
+        Agendamento.status == STATUS_CONCLUIDO,
+        Agendamento.data.between(inicio, fim),
     )
-    receita = session.scalar(stmt) or 0.0
-    return round(receita * funcionario.percentual_comissao, 2)
+    return round(session.scalar(stmt) or 0.0, 2)
 
 
 def previa_acerto(
@@ -88,26 +85,28 @@ def registrar_pagamento(
     if valor_pago < 0:
         raise PagamentoError("O valor pago não pode ser negativo.")
 
-    pagamento = pagamento_repository.criar(
-        session,
-        funcionario_id=funcionario_id,
-        data_pagamento=data_pagamento,
-        periodo_inicio=periodo_inicio,
-        periodo_fim=periodo_fim,
-        comissao_base=previa["comissao"],
-        descontos_abatidos=previa["total_vales"],
-        valor_pago=round(valor_pago, 2),
-        observacao=observacao,
-    )
-    adiantamento_repository.marcar_abatidos(
-        session, [v.id for v in previa["vales_pendentes"]], pagamento.id
-    )
-    if lancar_no_caixa and valor_pago > 0:
-        caixa_repository.criar_movimento(
+    # Pagamento, baixa dos vales e saída no caixa: tudo ou nada, num commit só.
+    with transacao(session):
+        pagamento = pagamento_repository.criar(
             session,
-            data_pagamento,
-            TIPO_SAIDA,
-            round(valor_pago, 2),
-            f"Pagamento (acerto) — {funcionario.nome}",
+            funcionario_id=funcionario_id,
+            data_pagamento=data_pagamento,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim,
+            comissao_base=previa["comissao"],
+            descontos_abatidos=previa["total_vales"],
+            valor_pago=round(valor_pago, 2),
+            observacao=observacao,
+        )
+        adiantamento_repository.marcar_abatidos(
+            session, [v.id for v in previa["vales_pendentes"]], pagamento.id
         )
+        if lancar_no_caixa and valor_pago > 0:
+            caixa_repository.criar_movimento(
+                session,
+                data_pagamento,
+                TIPO_SAIDA,
+                round(valor_pago, 2),
+                f"Pagamento (acerto) — {funcionario.nome}",
+            )
     return pagamento
@@ -0,0 +1,107 @@
+"""Quadro de ocupação da equipe: funcionários x dias x slots da grade, num array NumPy.
+
+Cada célula guarda um código de situação (LIVRE, FORA_DO_EXPEDIENTE, AGENDADO,
+CONCLUIDO, NAO_COMPARECEU). Os agendamentos do intervalo vêm de uma consulta só
+(agendamento_repository.listar_quadro_do_periodo); cada um é expandido nos slots que
+a duração do serviço cobre e gravado de uma vez com np.maximum.at — quando dois se
+sobrepõem, fica o código maior. O expediente de cada funcionário sai das máscaras já
+guardadas em expediente_service.
+"""
+
+from datetime import date, timedelta
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src.config import DURACAO_SLOT_MINUTOS, HORARIO_ABERTURA
+from src.database.models import STATUS_AGENDADO, STATUS_CONCLUIDO, STATUS_NAO_COMPARECEU
+from src.repositories import agendamento_repository, funcionario_repository
+from src.services import disponibilidade, expediente_service
+from src.services.cache import em_cache
+
+LIVRE = 0
+FORA_DO_EXPEDIENTE = 1
+AGENDADO = 2
+CONCLUIDO = 3
+NAO_COMPARECEU = 4
+
+CODIGOS_STATUS = {STATUS_AGENDADO: AGENDADO, STATUS_CONCLUIDO: CONCLUIDO, STATUS_NAO_COMPARECEU: NAO_COMPARECEU}
+ROTULOS = {
+    LIVRE: "Livre",
+    FORA_DO_EXPEDIENTE: "Fora do expediente",
+    AGENDADO: "Agendado",
+    CONCLUIDO: "Concluído",
+    NAO_COMPARECEU: "Não compareceu",
+}
+
+_ABERTURA = disponibilidade.minutos(HORARIO_ABERTURA)
+
+
+class QuadroDaSemana(NamedTuple):
+    """Guardado no cache de leituras e compartilhado: tuplas e matriz somente leitura."""
+
+    funcionarios: tuple[tuple[int, str], ...]  # (id, nome), na ordem das linhas da matriz
+    dias: tuple[date, ...]
+    horarios: tuple[str, ...]
+    matriz: np.ndarray  # uint8, forma (funcionários, dias, slots), somente leitura
+
+
+def _quadro(funcionarios, datas, matriz: np.ndarray) -> QuadroDaSemana:
+    matriz.setflags(write=False)
+    return QuadroDaSemana(tuple(funcionarios), tuple(datas), disponibilidade.GRADE, matriz)
+
+
+def _bits(mascara: int, slots: int) -> np.ndarray:
+    return ((mascara >> np.arange(slots)) & 1).astype(bool)
+
+
+@em_cache
+def quadro_da_semana(session: Session, inicio: date, dias: int = 7) -> QuadroDaSemana:
+    """Situação de cada slot de cada funcionário nos `dias` dias a partir de `inicio`."""
+    funcionarios = [(f.id, f.nome) for f in funcionario_repository.listar(session)]
+    datas = [inicio + timedelta(days=i) for i in range(dias)]
+    slots = len(disponibilidade.GRADE)
+    matriz = np.zeros((len(funcionarios), dias, slots), dtype=np.uint8)
+    if not funcionarios or dias <= 0:
+        return _quadro(funcionarios, datas, matriz)
+    ids = [funcionario_id for funcionario_id, _ in funcionarios]
+
+    for d, dia in enumerate(datas):
+        expedientes = expediente_service.grades_do_dia(session, dia, ids)
+        for posicao, funcionario_id in enumerate(ids):
+            mascara = expedientes[funcionario_id]
+            if mascara != disponibilidade.DIA_CHEIO:
+                matriz[posicao, d, ~_bits(mascara, slots)] = FORA_DO_EXPEDIENTE
+
+    linhas = agendamento_repository.listar_quadro_do_periodo(session, inicio, datas[-1])
+    posicoes = {funcionario_id: posicao for posicao, funcionario_id in enumerate(ids)}
+    linhas = [linha for linha in linhas if linha[0] in posicoes]
+    if not linhas:
+        return _quadro(funcionarios, datas, matriz)
+
+    n = len(linhas)
+    minutos = {hora: disponibilidade.minutos(hora) for hora in {linha[2] for linha in linhas}}
+    pos_funcionario = np.fromiter((posicoes[linha[0]] for linha in linhas), dtype=np.int64, count=n)
+    pos_dia = np.fromiter(((linha[1] - inicio).days for linha in linhas), dtype=np.int64, count=n)
+    minuto = np.fromiter((minutos[linha[2]] for linha in linhas), dtype=np.int64, count=n)
+    duracao = np.fromiter((disponibilidade.duracao_efetiva(linha[3]) for linha in linhas), dtype=np.int64, count=n)
+    codigo = np.fromiter((CODIGOS_STATUS.get(linha[4], AGENDADO) for linha in linhas), dtype=np.uint8, count=n)
+
+    # Slots [primeiro, ultimo) cobertos por cada atendimento, como em mascara_do_atendimento.
+    relativo = minuto - _ABERTURA
+    primeiro = np.clip(relativo // DURACAO_SLOT_MINUTOS, 0, slots)
+    ultimo = np.clip(-(-(relativo + duracao) // DURACAO_SLOT_MINUTOS), 0, slots)
+    cobertos = np.maximum(ultimo - primeiro, 0)
+    # Uma posição por slot coberto: o atendimento i se repete cobertos[i] vezes.
+    repetido = np.repeat(np.arange(n), cobertos)
+    deslocamento = np.arange(len(repetido)) - np.repeat(np.cumsum(cobertos) - cobertos, cobertos)
+    celula = (pos_funcionario[repetido] * dias + pos_dia[repetido]) * slots + primeiro[repetido] + deslocamento
+    np.maximum.at(matriz.reshape(-1), celula, codigo[repetido])
+    return _quadro(funcionarios, datas, matriz)
+
+
+def resumo(quadro: QuadroDaSemana) -> dict[str, int]:
+    """Quantos slots da semana estão em cada situação."""
+    contagem = np.bincount(quadro.matriz.reshape(-1), minlength=len(ROTULOS))
+    return {ROTULOS[codigo]: int(contagem[codigo]) for codigo in ROTULOS}
@@ -1,19 +1,28 @@
 from datetime import date, timedelta
 from typing import Optional
 
+import numpy as np
+import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from src.database.models import (
-    PERCENTUAL_COMISSAO_PADRAO,
     STATUS_AGENDADO,
     STATUS_CANCELADO,
     STATUS_CONCLUIDO,
     STATUS_NAO_COMPARECEU,
     Meta,
+    percentual_da_comissao,
 )
-from src.repositories import agendamento_repository, funcionario_repository
-from src.services.agendamento_service import _gerar_grade_horarios
+from src.database.transacao import confirmar
+from src.repositories import (
+    agendamento_repository,
+    dia_fechado_repository,
+    funcionario_repository,
+)
+from src.services import disponibilidade, expediente_service
+from src.services.cache import em_cache
+from src.ui import formatos
 
 # Metas gerenciais (OKR) com valores iniciais; o gestor ajusta na página de relatórios.
 METAS_PADRAO = {
@@ -31,139 +40,286 @@ METAS_LABELS = {
 }
 
 
-def kpis(session: Session, inicio: date, fim: date) -> dict:
-    """Indicadores do período para o painel gerencial."""
-    linhas = agendamento_repository.listar_detalhado(session, a_partir_de=inicio, ate=fim)
-    percentuais = funcionario_repository.percentuais_por_funcionario(session)
-
-    total = len(linhas)
-    concluidas = [r for r in linhas if r.status == STATUS_CONCLUIDO]
-    cancelados = sum(1 for r in linhas if r.status == STATUS_CANCELADO)
-    no_show = sum(1 for r in linhas if r.status == STATUS_NAO_COMPARECEU)
-
-    receita = sum(r.preco for r in concluidas)
-    comissoes = _comissoes_do_periodo(session, inicio, fim)
-
+def _periodo_anterior(inicio: date, fim: date) -> tuple[date, date]:
+    """Janela imediatamente anterior, de mesma duração."""
     dias = (fim - inicio).days + 1
-    slots_por_dia = len(_gerar_grade_horarios())
-    n_funcionarios = len(percentuais) or 1
-    capacidade = dias * slots_por_dia * n_funcionarios
-    ocupados = sum(1 for r in linhas if r.status in (STATUS_CONCLUIDO, STATUS_AGENDADO))
+    return inicio - timedelta(days=dias), inicio - timedelta(days=1)
+
+
+def _indicadores(inicio: date, fim: date, totais, clientes_unicos: int, capacidade: int) -> dict:
+    """Monta os KPIs de [inicio, fim] a partir dos totais por dia (dia_fechado_repository.totais_por_dia).
+
+    Linhas fora da janela são ignoradas: o retrato passa as duas janelas de uma vez.
+    `capacidade`: slots de trabalho da equipe no período (expediente_service.capacidade).
+    """
+    quantidades: dict[str, int] = {}
+    receita = comissoes = 0.0
+    for t in totais:
+        if inicio <= t.data <= fim:
+            quantidades[t.status] = quantidades.get(t.status, 0) + t.quantidade
+            if t.status == STATUS_CONCLUIDO:
+                receita += t.receita or 0.0
+                comissoes += t.comissao or 0.0
+    total = sum(quantidades.values())
+    concluidas = quantidades.get(STATUS_CONCLUIDO, 0)
+    cancelados = quantidades.get(STATUS_CANCELADO, 0)
+    no_show = quantidades.get(STATUS_NAO_COMPARECEU, 0)
+
+    ocupados = concluidas + quantidades.get(STATUS_AGENDADO, 0)
 
     return {
         "total_agendamentos": total,
-        "atendimentos_concluidos": len(concluidas),
+        "atendimentos_concluidos": concluidas,
         "receita_bruta": round(receita, 2),
         "comissoes": round(comissoes, 2),
         "receita_loja": round(receita - comissoes, 2),
-        "ticket_medio": round(receita / len(concluidas), 2) if concluidas else 0.0,
-        "clientes_unicos": len({r.cliente for r in concluidas}),
+        "ticket_medio": round(receita / concluidas, 2) if concluidas else 0.0,
+        "clientes_unicos": clientes_unicos,
         "taxa_cancelamento": round(cancelados / total * 100, 1) if total else 0.0,
         "taxa_no_show": round(no_show / total * 100, 1) if total else 0.0,
         "taxa_ocupacao": round(ocupados / capacidade * 100, 1) if capacidade else 0.0,
     }
 
 
-def _comissoes_do_periodo(session: Session, inicio: date, fim: date) -> float:
-    from src.services import faturamento_service
+def _receita_por_dia(inicio: date, fim: date, totais) -> list[dict]:
+    por_dia: dict[date, float] = {}
+    for t in totais:
+        if t.status == STATUS_CONCLUIDO and inicio <= t.data <= fim:
+            por_dia[t.data] = por_dia.get(t.data, 0.0) + (t.receita or 0.0)
+    return [{"data": dia, "receita": round(valor, 2)} for dia, valor in sorted(por_dia.items())]
 
-    linhas = faturamento_service.faturamento_por_periodo(session, inicio, fim)
-    percentuais = funcionario_repository.percentuais_por_funcionario(session)
-    return sum(
-        r.preco_servico * percentuais.get(r.funcionario_id, PERCENTUAL_COMISSAO_PADRAO)
-        for r in linhas
-    )
 
+# kpis e receita_por_dia avulsos fazem as mesmas contas do RetratoDoPeriodo sobre os
+# mesmos totais por dia, só que sem carregar os agendamentos do período.
 
-def comparativo(session: Session, inicio: date, fim: date) -> dict:
-    """KPIs do período e do período imediatamente anterior de mesma duração."""
-    dias = (fim - inicio).days + 1
-    inicio_anterior = inicio - timedelta(days=dias)
-    fim_anterior = inicio - timedelta(days=1)
-    return {
-        "atual": kpis(session, inicio, fim),
-        "anterior": kpis(session, inicio_anterior, fim_anterior),
-        "periodo_anterior": (inicio_anterior, fim_anterior),
-    }
+
+@em_cache
+def kpis(session: Session, inicio: date, fim: date) -> dict:
+    """Indicadores do período para o painel gerencial (contagens e somas vêm dos totais congelados
+    dos dias fechados e do rollup receita_diaria para os demais)."""
+    return _indicadores(
+        inicio,
+        fim,
+        dia_fechado_repository.totais_por_dia(session, inicio, fim),
+        agendamento_repository.contar_clientes_atendidos(session, inicio, fim),
+        expediente_service.capacidade(
+            session, inicio, fim, list(funcionario_repository.percentuais_por_funcionario(session))
+        ),
+    )
 
 
+@em_cache
 def receita_por_dia(session: Session, inicio: date, fim: date) -> list[dict]:
-    linhas = agendamento_repository.listar_detalhado(session, a_partir_de=inicio, ate=fim)
-    por_dia: dict[date, float] = {}
-    for r in linhas:
-        if r.status == STATUS_CONCLUIDO:
-            por_dia[r.data] = por_dia.get(r.data, 0.0) + r.preco
-    return [{"data": dia, "receita": round(valor, 2)} for dia, valor in sorted(por_dia.items())]
+    return _receita_por_dia(inicio, fim, dia_fechado_repository.totais_por_dia(session, inicio, fim))
+
 
+def comparativo(session: Session, inicio: date, fim: date) -> dict:
+    """KPIs do período e do período imediatamente anterior de mesma duração (do retrato da página)."""
+    return RetratoDoPeriodo.carregar(session, inicio, fim).comparativo()
+
+
+# Colunas de agendamento_repository.listar_para_relatorio, na ordem do SELECT.
+COLUNAS_RELATORIO = [
+    "funcionario_id",
+    "funcionario",
+    "percentual_atual",
+    "id",
+    "cliente_id",
+    "servico",
+    "data",
+    "hora",
+    "status",
+    "forma_pagamento",
+    "preco",
+    "percentual",
+]
 
 DIAS_SEMANA = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
 
 
-def atendimentos_por_dia_semana(session: Session, inicio: date, fim: date) -> list[dict]:
-    linhas = agendamento_repository.listar_detalhado(session, a_partir_de=inicio, ate=fim)
-    contagem = [0] * 7
-    for r in linhas:
-        if r.status == STATUS_CONCLUIDO:
-            contagem[r.data.weekday()] += 1
-    return [{"dia": DIAS_SEMANA[i], "atendimentos": contagem[i]} for i in range(7)]
+def _colunas_somente_leitura(concluidos: list) -> dict[str, np.ndarray]:
+    """Colunas do desempenho por funcionário em arrays NumPy somente leitura: o retrato
+    sai do cache de leituras e é compartilhado por todas as chamadas."""
+    n = len(concluidos)
+    colunas = {
+        "funcionario_id": np.fromiter((r.funcionario_id for r in concluidos), dtype=np.int64, count=n),
+        "preco": np.fromiter((r.preco or 0.0 for r in concluidos), dtype=float, count=n),
+        "percentual": np.fromiter(
+            (percentual_da_comissao(r.percentual, r.percentual_atual) for r in concluidos), dtype=float, count=n
+        ),
+    }
+    for coluna in colunas.values():
+        coluna.setflags(write=False)
+    return colunas
+
+
+class RetratoDoPeriodo:
+    """Tudo o que a página de relatórios mostra, tirado de duas consultas.
+
+    Carrega de uma vez os agendamentos do período e do período anterior de mesma
+    duração (mais a lista de funcionários, para a capacidade) e os totais por dia
+    das duas janelas (dia_fechado_repository.totais_por_dia: congelados nos dias
+    fechados, do rollup nos demais); KPIs, séries e rankings saem daí em memória,
+    sem nova ida ao banco.
+
+    `capacidades`: slots de trabalho da equipe (período, período anterior) pelos
+    expedientes; sem elas, a grade da barbearia inteira para cada funcionário.
+    `totais`: linhas (data, funcionario_id, status, quantidade, receita, comissao).
+    """
+
+    def __init__(
+        self,
+        inicio: date,
+        fim: date,
+        linhas,
+        com_anterior: bool = True,
+        capacidades: Optional[tuple[int, int]] = None,
+        totais=(),
+    ):
+        self.inicio, self.fim = inicio, fim
+        self.inicio_anterior, self.fim_anterior = _periodo_anterior(inicio, fim)
+        if capacidades is None:
+            n_funcionarios = len({r.funcionario_id for r in linhas}) or 1
+            slots_por_dia = len(disponibilidade.GRADE) * n_funcionarios
+            capacidades = (
+                ((fim - inicio).days + 1) * slots_por_dia,
+                ((self.fim_anterior - self.inicio_anterior).days + 1) * slots_por_dia,
+            )
+        self.capacidade, self.capacidade_anterior = capacidades
+        agendamentos = [r for r in linhas if r.id is not None]
+        # Tuplas: o retrato sai do cache de leituras e é o mesmo para todas as chamadas.
+        self.atual = tuple(r for r in agendamentos if inicio <= r.data <= fim)
+        self.anterior = tuple(r for r in agendamentos if r.data < inicio) if com_anterior else ()
+        self.totais = tuple(totais)
+        self._nomes = {r.funcionario_id: r.funcionario for r in linhas}
+        self._colunas_concluidos = _colunas_somente_leitura(self._concluidos())
+
+    @classmethod
+    @em_cache
+    def carregar(cls, session: Session, inicio: date, fim: date, com_anterior: bool = True) -> "RetratoDoPeriodo":
+        anterior = _periodo_anterior(inicio, fim)
+        desde = anterior[0] if com_anterior else inicio
+        linhas = agendamento_repository.listar_para_relatorio(session, desde, fim)
+        funcionario_ids = {r.funcionario_id for r in linhas}
+        capacidades = (
+            expediente_service.capacidade(session, inicio, fim, funcionario_ids),
+            expediente_service.capacidade(session, *anterior, funcionario_ids),
+        )
+        totais = dia_fechado_repository.totais_por_dia(session, desde, fim)
+        return cls(inicio, fim, linhas, com_anterior, capacidades, totais)
+
+    def _concluidos(self) -> list:
+        return [r for r in self.atual if r.status == STATUS_CONCLUIDO]
+
+    def kpis(self, anterior: bool = False) -> dict:
+        linhas = self.anterior if anterior else self.atual
+        inicio, fim = (self.inicio_anterior, self.fim_anterior) if anterior else (self.inicio, self.fim)
+        return _indicadores(
+            inicio,
+            fim,
+            self.totais,
+            len({r.cliente_id for r in linhas if r.status == STATUS_CONCLUIDO}),
+            self.capacidade_anterior if anterior else self.capacidade,
+        )
 
+    def comparativo(self) -> dict:
+        return {
+            "atual": self.kpis(),
+            "anterior": self.kpis(anterior=True),
+            "periodo_anterior": (self.inicio_anterior, self.fim_anterior),
+        }
 
-def atendimentos_por_horario(session: Session, inicio: date, fim: date) -> list[dict]:
-    linhas = agendamento_repository.listar_detalhado(session, a_partir_de=inicio, ate=fim)
-    contagem: dict[str, int] = {}
-    for r in linhas:
-        if r.status == STATUS_CONCLUIDO:
-            contagem[r.hora] = contagem.get(r.hora, 0) + 1
-    return [{"hora": hora, "atendimentos": qtd} for hora, qtd in sorted(contagem.items())]
+    def receita_por_dia(self) -> list[dict]:
+        return _receita_por_dia(self.inicio, self.fim, self.totais)
 
+    def atendimentos_por_dia_semana(self) -> list[dict]:
+        contagem = [0] * 7
+        for r in self._concluidos():
+            contagem[r.data.weekday()] += 1
+        return [{"dia": DIAS_SEMANA[i], "atendimentos": contagem[i]} for i in range(7)]
 
-def top_servicos(session: Session, inicio: date, fim: date, limite: int = 8) -> list[dict]:
-    linhas = agendamento_repository.listar_detalhado(session, a_partir_de=inicio, ate=fim)
-    por_servico: dict[str, dict] = {}
-    for r in linhas:
-        if r.status == STATUS_CONCLUIDO:
+    def atendimentos_por_horario(self) -> list[dict]:
+        contagem: dict[str, int] = {}
+        for r in self._concluidos():
+            contagem[r.hora] = contagem.get(r.hora, 0) + 1
+        return [{"hora": hora, "atendimentos": qtd} for hora, qtd in sorted(contagem.items())]
+
+    def top_servicos(self, limite: int = 8) -> list[dict]:
+        por_servico: dict[str, dict] = {}
+        for r in self._concluidos():
             item = por_servico.setdefault(r.servico, {"quantidade": 0, "receita": 0.0})
             item["quantidade"] += 1
-            item["receita"] += r.preco
-    ordenado = sorted(por_servico.items(), key=lambda kv: kv[1]["receita"], reverse=True)
-    return [
-        {"servico": nome, "quantidade": v["quantidade"], "receita": round(v["receita"], 2)}
-        for nome, v in ordenado[:limite]
-    ]
-
-
-def desempenho_funcionarios(session: Session, inicio: date, fim: date) -> list[dict]:
-    from src.services import faturamento_service
-
-    linhas = faturamento_service.faturamento_por_periodo(session, inicio, fim)
-    percentuais = funcionario_repository.percentuais_por_funcionario(session)
-    por_funcionario: dict[int, dict] = {}
-    for r in linhas:
-        item = por_funcionario.setdefault(
-            r.funcionario_id, {"funcionario": r.funcionario, "atendimentos": 0, "receita": 0.0}
+            item["receita"] += r.preco or 0.0
+        ordenado = sorted(por_servico.items(), key=lambda kv: kv[1]["receita"], reverse=True)
+        return [
+            {"servico": nome, "quantidade": v["quantidade"], "receita": round(v["receita"], 2)}
+            for nome, v in ordenado[:limite]
+        ]
+
+    def desempenho_funcionarios(self) -> list[dict]:
+        colunas = self._colunas_concluidos
+        if not len(colunas["preco"]):
+            return []
+        # Quadro montado a cada chamada sobre as colunas guardadas (somente leitura).
+        concluidos = pd.DataFrame(colunas)
+        # Ordem de aparição (sort=False) e ordenação estável: empates ficam como antes.
+        por_funcionario = (
+            concluidos.assign(comissao=concluidos["preco"] * concluidos["percentual"])
+            .groupby("funcionario_id", sort=False)
+            .agg(
+                atendimentos=("preco", "size"),
+                receita=("preco", "sum"),
+                comissao=("comissao", "sum"),
+            )
         )
-        item["atendimentos"] += 1
-        item["receita"] += r.preco_servico
-    resultado = []
-    for funcionario_id, item in por_funcionario.items():
-        percentual = percentuais.get(funcionario_id, PERCENTUAL_COMISSAO_PADRAO)
-        comissao = round(item["receita"] * percentual, 2)
-        resultado.append(
+        comissao = por_funcionario["comissao"].round(2)
+        resultado = pd.DataFrame(
             {
-                "funcionario": item["funcionario"],
-                "atendimentos": item["atendimentos"],
-                "receita": round(item["receita"], 2),
+                "funcionario": [self._nomes[funcionario_id] for funcionario_id in por_funcionario.index],
+                "atendimentos": por_funcionario["atendimentos"],
+                "receita": por_funcionario["receita"].round(2),
                 "comissao": comissao,
-                "receita_loja": round(item["receita"] - comissao, 2),
-                "ticket_medio": round(item["receita"] / item["atendimentos"], 2),
+                "receita_loja": (por_funcionario["receita"] - comissao).round(2),
+                "ticket_medio": (por_funcionario["receita"] / por_funcionario["atendimentos"]).round(2),
             }
+        ).sort_values("receita", ascending=False, kind="stable")
+        return resultado.to_dict("records")
+
+    def receita_por_forma_pagamento(self) -> list[dict]:
+        por_forma: dict[Optional[str], list] = {}
+        for r in self._concluidos():
+            item = por_forma.setdefault(r.forma_pagamento, [0.0, 0])
+            item[0] += r.preco or 0.0
+            item[1] += 1
+        return formatos.receita_por_forma(
+            (forma, receita, atendimentos) for forma, (receita, atendimentos) in por_forma.items()
         )
-    return sorted(resultado, key=lambda item: item["receita"], reverse=True)
+
+
+# Atalhos com a assinatura de sempre: cada um carrega um retrato só para si. A página
+# de relatórios carrega um RetratoDoPeriodo e deriva tudo dele.
+
+
+def atendimentos_por_dia_semana(session: Session, inicio: date, fim: date) -> list[dict]:
+    return RetratoDoPeriodo.carregar(session, inicio, fim, com_anterior=False).atendimentos_por_dia_semana()
+
+
+def atendimentos_por_horario(session: Session, inicio: date, fim: date) -> list[dict]:
+    return RetratoDoPeriodo.carregar(session, inicio, fim, com_anterior=False).atendimentos_por_horario()
+
+
+def top_servicos(session: Session, inicio: date, fim: date, limite: int = 8) -> list[dict]:
+    return RetratoDoPeriodo.carregar(session, inicio, fim, com_anterior=False).top_servicos(limite)
+
+
+def desempenho_funcionarios(session: Session, inicio: date, fim: date) -> list[dict]:
+    return RetratoDoPeriodo.carregar(session, inicio, fim, com_anterior=False).desempenho_funcionarios()
 
 
 # --- Metas (OKR) ---
 
 
+@em_cache
 def obter_metas(session: Session) -> dict[str, float]:
     metas = dict(METAS_PADRAO)
     for meta in session.scalars(select(Meta)):
@@ -182,7 +338,7 @@ def salvar_meta(session: Session, chave: str, valor: float) -> None:
         session.add(Meta(chave=chave, valor=valor))
     else:
         meta.valor = valor
-    session.commit()
+    confirmar(session)
 
 
 def progresso_metas(session: Session, indicadores: dict) -> list[dict]:
@@ -0,0 +1,82 @@
+"""Montagem colunar de DataFrames a partir das linhas das consultas.
+
+`pd.DataFrame([{...} for r in linhas])` cria um dict por linha e guarda os nomes
+repetidos (funcionário, serviço, status) como objetos Python. Aqui as linhas são
+lidas em lotes e transpostas direto para colunas; o quadro é montado uma vez, com
+categorias nas colunas de poucos valores e datetime64 nas datas.
+"""
+
+import itertools
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+LOTE_PADRAO = 10_000
+
+# Colunas de agendamento_repository.listar_detalhado / iterar_detalhado.
+COLUNAS_AGENDAMENTOS = ["ID", "Cliente", "Funcionario", "Servico", "Preco", "Data", "Hora", "Status", "FormaPagamento"]
+CATEGORICAS_AGENDAMENTOS = ("Funcionario", "Servico", "Status", "FormaPagamento")
+
+
+def montar_dataframe(
+    linhas: Iterable,
+    colunas: Sequence[str],
+    categoricas: Sequence[str] = (),
+    datas: Sequence[str] = (),
+    lote: int = LOTE_PADRAO,
+) -> pd.DataFrame:
+    """DataFrame com uma coluna por campo das linhas, na ordem de `colunas`.
+
+    `linhas` pode ser um Result do SQLAlchemy — com yield_per, a consulta nunca fica
+    inteira em memória — ou qualquer iterável de tuplas. Colunas em `categoricas`
+    viram códigos inteiros já durante a leitura; `datas` viram datetime64.
+    """
+    partes: dict[str, list] = {nome: [] for nome in colunas}
+    codigos: dict[str, dict] = {nome: {} for nome in (*categoricas, *datas)}
+    iterador = iter(linhas)
+    while bloco := list(itertools.islice(iterador, lote)):
+        for nome, valores in zip(colunas, zip(*bloco)):
+            if nome in codigos:
+                partes[nome].append(_codificar(valores, codigos[nome]))
+            else:
+                partes[nome].append(valores)
+
+    dados = {}
+    for nome in colunas:
+        if nome in codigos:
+            codigos_coluna = np.concatenate(partes[nome]) if partes[nome] else np.array([], dtype=np.int32)
+            valores = list(codigos[nome])
+            if nome in datas:
+                # Poucos dias distintos: converte só os valores únicos e expande pelos códigos.
+                dias = np.array(valores + [None], dtype="datetime64[D]").astype("datetime64[s]")
+                dados[nome] = dias[codigos_coluna]  # -1 cai no None do fim (NaT)
+            else:
+                dados[nome] = _categorica(codigos_coluna, valores)
+        else:
+            dados[nome] = list(itertools.chain.from_iterable(partes[nome]))
+    return pd.DataFrame(dados, columns=list(colunas))
+
+
+def _codificar(valores: tuple, tabela: dict) -> np.ndarray:
+    """Códigos do lote na numeração global `tabela` (valor -> código); None vira -1.
+
+    pd.factorize resolve o lote em C; só os valores distintos passam pelo dict.
+    """
+    locais, unicos = pd.factorize(np.array(valores, dtype=object), use_na_sentinel=True)
+    globais = np.array([tabela.setdefault(v, len(tabela)) for v in unicos] + [-1], dtype=np.int32)
+    return globais[locais]
+
+
+def _categorica(codigos: np.ndarray, categorias: list) -> pd.Categorical:
+    """Códigos na ordem de chegada -> Categorical com as categorias em ordem alfabética."""
+    ordem = sorted(range(len(categorias)), key=lambda i: categorias[i])
+    novo_codigo = np.empty(len(categorias) + 1, dtype=np.int32)
+    novo_codigo[ordem] = np.arange(len(categorias), dtype=np.int32)
+    novo_codigo[-1] = -1
+    return pd.Categorical.from_codes(novo_codigo[codigos], categories=[categorias[i] for i in ordem])
+
+
+def quadro_de_agendamentos(linhas: Iterable) -> pd.DataFrame:
+    """Linhas de listar_detalhado/iterar_detalhado -> DataFrame com COLUNAS_AGENDAMENTOS."""
+    return montar_dataframe(linhas, COLUNAS_AGENDAMENTOS, categoricas=CATEGORICAS_AGENDAMENTOS, datas=("Data",))
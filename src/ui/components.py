@@ -1,8 +1,20 @@
+import time
+from datetime import date
 from typing import Optional
 
+import numpy as np
 import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
 
+from src.config import CAIXA_SITUACAO_TTL_SEGUNDOS
+from src.database.connection import get_session
+from src.services import caixa_service, quadro_service
+from src.ui import theme
+from src.ui.formatos import moeda, percentual  # noqa: F401  (reexportados para as páginas)
+
+_SITUACAO_CAIXA = "situacao_caixa"
+
 _TABLE_STYLES = [
     {
         "selector": "thead th",
@@ -29,17 +41,6 @@ _TABLE_STYLES = [
 ]
 
 
-def moeda(valor: float) -> str:
-    """Formata em reais no padrão brasileiro: 1234.5 -> 'R$ 1.234,50'."""
-    texto = f"{valor:,.2f}".replace(",", "\x00").replace(".", ",").replace("\x00", ".")
-    return f"R$ {texto}"
-
-
-def percentual(valor: float) -> str:
-    """Formata fração como percentual brasileiro: 0.253 -> '25,3%'."""
-    return f"{valor * 100:.1f}".replace(".", ",") + "%"
-
-
 def render_styled_table(df: pd.DataFrame, format_map: Optional[dict] = None) -> None:
     """Renderiza um DataFrame com o estilo padrão do sistema. Substitui o bloco de CSS repetido em cada página."""
     if df.empty:
@@ -49,3 +50,91 @@ def render_styled_table(df: pd.DataFrame, format_map: Optional[dict] = None) ->
     if format_map:
         styler = styler.format(format_map)
     st.table(styler)
+
+
+def situacao_do_caixa(hoje: Optional[date] = None) -> dict:
+    """`caixa_service.situacao` guardada na sessão do usuário.
+
+    A barra lateral do app pede a situação em toda troca de página; ela só volta ao banco
+    quando o dia vira, quando um caixa é aberto ou fechado neste processo
+    (`caixa_service.versao_do_caixa`) ou depois de CAIXA_SITUACAO_TTL_SEGUNDOS — o prazo
+    cobre aberturas/fechamentos feitos por outro processo.
+    """
+    hoje = hoje or date.today()
+    versao = caixa_service.versao_do_caixa()
+    guardado = st.session_state.get(_SITUACAO_CAIXA)
+    if (
+        guardado is not None
+        and guardado["dia"] == hoje
+        and guardado["versao"] == versao
+        and time.monotonic() - guardado["momento"] < CAIXA_SITUACAO_TTL_SEGUNDOS
+    ):
+        return guardado["situacao"]
+    with get_session() as session:
+        situacao = caixa_service.situacao(session, hoje)
+    st.session_state[_SITUACAO_CAIXA] = {
+        "dia": hoje,
+        "versao": versao,
+        "momento": time.monotonic(),
+        "situacao": situacao,
+    }
+    return situacao
+
+
+def render_alertas(alertas: list[dict]) -> None:
+    """Mostra os alertas de `caixa_service.alertas` com a cor do nível de cada um."""
+    for alerta in alertas:
+        if alerta["nivel"] == "erro":
+            st.error(alerta["mensagem"])
+        elif alerta["nivel"] == "aviso":
+            st.warning(alerta["mensagem"])
+        else:
+            st.info(alerta["mensagem"])
+
+
+# Uma cor por código de quadro_service (LIVRE ... NAO_COMPARECEU), na ordem dos códigos.
+_CORES_DO_QUADRO = ["#1f1b15", theme.EIXO, theme.OURO_SERIE, "#5f8f4e", "#a0522d"]
+_SIGLAS_DIAS = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+
+def render_quadro_da_semana(quadro: quadro_service.QuadroDaSemana) -> None:
+    """Mostra o quadro da equipe como um único heatmap: uma linha por funcionário e,
+    nas colunas, os slots de cada dia lado a lado."""
+    if not quadro.funcionarios:
+        st.info("Nenhum funcionário cadastrado.")
+        return
+    n_funcionarios, n_dias, n_slots = quadro.matriz.shape
+    z = quadro.matriz.reshape(n_funcionarios, n_dias * n_slots)
+    rotulos = np.array([quadro_service.ROTULOS[c] for c in sorted(quadro_service.ROTULOS)], dtype=object)
+    colunas = [f"{_SIGLAS_DIAS[dia.weekday()]} {dia:%d/%m} {hora}" for dia in quadro.dias for hora in quadro.horarios]
+    # Escala em degraus: cada código ocupa uma faixa inteira da barra de cores.
+    n_cores = len(_CORES_DO_QUADRO)
+    escala = []
+    for codigo, cor in enumerate(_CORES_DO_QUADRO):
+        escala += [[codigo / n_cores, cor], [(codigo + 1) / n_cores, cor]]
+    fig = go.Figure(
+        go.Heatmap(
+            z=z,
+            x=list(range(n_dias * n_slots)),
+            y=[nome for _, nome in quadro.funcionarios],
+            customdata=np.broadcast_to(np.array(colunas, dtype=object), z.shape),
+            text=rotulos[z],
+            hovertemplate="%{y} — %{customdata}<br>%{text}<extra></extra>",
+            zmin=-0.5,
+            zmax=n_cores - 0.5,
+            colorscale=escala,
+            xgap=1,
+            ygap=2,
+            colorbar=dict(tickvals=list(range(n_cores)), ticktext=list(rotulos), title=""),
+        )
+    )
+    fig.update_layout(
+        height=max(220, 34 * n_funcionarios + 80),
+        xaxis=dict(
+            tickvals=[d * n_slots for d in range(n_dias)],
+            ticktext=[f"{_SIGLAS_DIAS[dia.weekday()]} {dia:%d/%m}" for dia in quadro.dias],
+            showgrid=False,
+        ),
+        yaxis=dict(autorange="reversed", showgrid=False),
+    )
+    st.plotly_chart(fig, use_container_width=True)
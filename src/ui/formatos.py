@@ -0,0 +1,27 @@
+"""Formatação brasileira de valores, sem depender do Streamlit (usada também pelas exportações)."""
+
+from src.database.models import FORMA_NAO_INFORMADA, FORMAS_PAGAMENTO
+
+
+def moeda(valor: float) -> str:
+    """Formata em reais no padrão brasileiro: 1234.5 -> 'R$ 1.234,50'."""
+    texto = f"{valor:,.2f}".replace(",", "\x00").replace(".", ",").replace("\x00", ".")
+    return f"R$ {texto}"
+
+
+def percentual(valor: float) -> str:
+    """Formata fração como percentual brasileiro: 0.253 -> '25,3%'."""
+    return f"{valor * 100:.1f}".replace(".", ",") + "%"
+
+
+def receita_por_forma(linhas) -> list[dict]:
+    """(forma, receita, atendimentos) -> itens com o rótulo da forma, da maior receita para a menor."""
+    resultado = [
+        {
+            "forma": FORMAS_PAGAMENTO.get(forma, FORMA_NAO_INFORMADA),
+            "receita": round(receita, 2),
+            "atendimentos": atendimentos,
+        }
+        for forma, receita, atendimentos in linhas
+    ]
+    return sorted(resultado, key=lambda item: item["receita"], reverse=True)
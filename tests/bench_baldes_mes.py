@@ -0,0 +1,140 @@
+"""Benchmark dos totais por mês/ano: função por linha x colunas ano/mes indexadas x rollup.
+
+Uso: python tests/bench_baldes_mes.py [quantidade_de_agendamentos]
+Não é coletado pelo pytest. Monta um banco temporário com 1M agendamentos (padrão) em
+~3 anos, mede o backfill das colunas ano/mes (migração 6) e compara, para o histórico
+todo, o GROUP BY sobre strftime('%m-%Y', data) (a consulta original), sobre
+extract(year/month), sobre as colunas gravadas (índice ix_agendamentos_status_ano_mes),
+o rollup agrupado por extract e o faturamento_por_mes/por_ano do serviço (rollup pelas
+colunas ano/mes). Mostra o plano de cada consulta.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, select, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import connection, datas  # noqa: E402
+from src.database.models import Agendamento, ReceitaDiaria  # noqa: E402
+from src.repositories import receita_diaria_repository  # noqa: E402
+from src.services import faturamento_service  # noqa: E402
+
+QUANTIDADE = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+REPETICOES = 5
+INICIO = date(2023, 1, 1)
+STATUS = ("concluido", "concluido", "concluido", "cancelado", "nao_compareceu", "agendado")
+FORMAS = ("pix", "dinheiro", "cartao_debito", None)
+
+
+def _hora(k: int) -> str:
+    # A mesma combinação de funcionário e dia se repete a cada 1095 linhas: um minuto por
+    # repetição mantém os agendados fora do índice único de horário (funcionário, data, hora).
+    return f"{(k // 60) % 24:02d}:{k % 60:02d}"
+
+
+engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_baldes.db')}")
+connection.init_db(engine)
+with engine.begin() as conn:
+    conn.execute(text("INSERT INTO clientes (nome, bloqueado) VALUES ('Cliente', 0)"))
+    for i in range(15):
+        conn.execute(text(f"INSERT INTO funcionarios (nome, percentual_comissao) VALUES ('Barbeiro {i}', 0.5)"))
+    for i in range(10):
+        conn.execute(text(f"INSERT INTO servicos (nome, preco, duracao) VALUES ('Serviço {i}', {30 + 5 * i}, 30)"))
+    # Sem ano/mes: quem preenche é o backfill medido abaixo.
+    conn.execute(
+        text(
+            "INSERT INTO agendamentos (cliente_id, funcionario_id, servico_id, data, hora, status, forma_pagamento, "
+            "preco_cobrado, percentual_comissao) VALUES (1, :f, :s, :data, :hora, :status, :forma, :preco, 0.5)"
+        ),
+        [
+            {
+                "f": 1 + i % 15,
+                "s": 1 + (i // 15) % 10,
+                "data": (INICIO + timedelta(days=i % 1095)).isoformat(),
+                "hora": _hora(i // 1095),
+                "status": STATUS[i % len(STATUS)],
+                "forma": FORMAS[i % len(FORMAS)] if STATUS[i % len(STATUS)] == "concluido" else None,
+                "preco": 30 + 5 * ((i // 15) % 10),
+            }
+            for i in range(QUANTIDADE)
+        ],
+    )
+
+inicio = time.perf_counter()
+with engine.begin() as conn:
+    connection._baldes_de_ano_e_mes(conn)
+    conn.execute(text("ANALYZE"))
+print(f"{QUANTIDADE} agendamentos — backfill de ano/mes: {time.perf_counter() - inicio:.2f} s")
+
+session = sessionmaker(bind=engine)()
+receita_diaria_repository.reconstruir(session)
+
+
+def _por_mes(ano, mes):
+    return (
+        select(ano, mes, func.sum(Agendamento.preco_cobrado))
+        .where(Agendamento.status == "concluido")
+        .group_by(ano, mes)
+        .order_by(ano.desc(), mes.desc())
+    )
+
+
+def _por_ano(ano):
+    return (
+        select(ano, func.sum(Agendamento.preco_cobrado))
+        .where(Agendamento.status == "concluido")
+        .group_by(ano)
+        .order_by(ano.desc())
+    )
+
+
+mes_ano_texto = func.strftime("%m-%Y", Agendamento.data)
+consultas = [
+    (
+        "mês: strftime('%m-%Y')",
+        select(mes_ano_texto, func.sum(Agendamento.preco_cobrado))
+        .where(Agendamento.status == "concluido")
+        .group_by(mes_ano_texto)
+        .order_by(mes_ano_texto.desc()),
+    ),
+    ("mês: extract por linha", _por_mes(datas.ano(Agendamento.data), datas.mes(Agendamento.data))),
+    ("mês: colunas ano/mes", _por_mes(Agendamento.ano, Agendamento.mes)),
+    ("ano: extract por linha", _por_ano(datas.ano(Agendamento.data))),
+    ("ano: coluna ano", _por_ano(Agendamento.ano)),
+    (
+        "rollup mês: extract",
+        select(datas.ano(ReceitaDiaria.data), datas.mes(ReceitaDiaria.data), func.sum(ReceitaDiaria.receita))
+        .where(ReceitaDiaria.status == "concluido")
+        .group_by(datas.ano(ReceitaDiaria.data), datas.mes(ReceitaDiaria.data)),
+    ),
+]
+
+
+def medir(funcao) -> float:
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return tempos[len(tempos) // 2]
+
+
+print(f"mediana de {REPETICOES} execuções")
+for nome, stmt in consultas:
+    compilado = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    plano = " | ".join(linha[3] for linha in session.execute(text(f"EXPLAIN QUERY PLAN {compilado}")))
+    print(f"  {nome:<26} {medir(lambda: session.execute(stmt).all()):9.2f} ms   {plano}")
+# __wrapped__: a função sem o cache de leituras, para medir a consulta a cada repetição.
+for nome, funcao in (
+    ("faturamento_por_mes", faturamento_service.faturamento_por_mes.__wrapped__),
+    ("faturamento_por_ano", faturamento_service.faturamento_por_ano.__wrapped__),
+):
+    print(f"  {nome:<26} {medir(lambda: funcao(session)):9.2f} ms   (serviço, rollup pelas colunas ano/mes)")
+session.close()
+connection._engines_atualizados.discard(engine)
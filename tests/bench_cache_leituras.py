@@ -0,0 +1,89 @@
+"""Benchmark do cache de leituras: página de Faturamento fria, repetida e depois de uma escrita.
+
+Uso: python tests/bench_cache_leituras.py [quantidade_de_agendamentos]
+Não é coletado pelo pytest. Monta um banco temporário com 100k agendamentos (padrão)
+e mede as leituras que a página de Faturamento faz a cada rerun do Streamlit: a
+primeira vez (cache vazio), os reruns seguintes e o primeiro rerun após uma escrita.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import connection  # noqa: E402
+from src.repositories import agendamento_repository, receita_diaria_repository  # noqa: E402
+from src.services import cache, faturamento_service  # noqa: E402
+
+QUANTIDADE = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+REPETICOES = 10
+INICIO = date(2024, 1, 1)
+
+engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_cache.db')}")
+connection.init_db(engine)
+with engine.begin() as conn:
+    conn.execute(text("INSERT INTO clientes (nome, bloqueado) VALUES ('Cliente', 0)"))
+    for i in range(4):
+        conn.execute(text(f"INSERT INTO funcionarios (nome, percentual_comissao) VALUES ('Barbeiro {i}', 0.5)"))
+        conn.execute(text(f"INSERT INTO servicos (nome, preco, duracao) VALUES ('Serviço {i}', {30 + 10 * i}, 30)"))
+    conn.execute(
+        text(
+            "INSERT INTO agendamentos (cliente_id, funcionario_id, servico_id, data, hora, status, forma_pagamento, "
+            "preco_cobrado, percentual_comissao) VALUES (1, :f, :s, :data, '10:00', 'concluido', 'pix', :preco, 0.5)"
+        ),
+        [
+            {
+                "f": 1 + i % 4,
+                "s": 1 + (i // 4) % 4,
+                "data": (INICIO + timedelta(days=i % 1000)).isoformat(),
+                "preco": 30 + 10 * ((i // 4) % 4),
+            }
+            for i in range(QUANTIDADE)
+        ],
+    )
+Sessao = sessionmaker(bind=engine, expire_on_commit=False)
+with Sessao() as s:
+    receita_diaria_repository.reconstruir(s)
+
+periodo = (date(2025, 1, 1), date(2025, 12, 31))
+
+
+def pagina_de_faturamento() -> float:
+    """As leituras de um rerun da página, cada uma numa sessão nova como no app."""
+    inicio = time.perf_counter()
+    with Sessao() as s:
+        faturamento_service.resumo_financeiro(s, *periodo)
+        faturamento_service.relatorio_pagamentos(s, *periodo)
+        faturamento_service.receita_por_forma_pagamento(s, *periodo)
+        faturamento_service.faturamento_total(s)
+        faturamento_service.faturamento_por_funcionario(s)
+        faturamento_service.faturamento_por_mes(s)
+        faturamento_service.faturamento_por_ano(s)
+        faturamento_service.faturamento_por_periodo(s, *periodo)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def mediana(valores: list[float]) -> float:
+    return sorted(valores)[len(valores) // 2]
+
+
+cache.limpar()
+fria = pagina_de_faturamento()
+repetida = mediana([pagina_de_faturamento() for _ in range(REPETICOES)])
+apos_escrita = []
+for i in range(REPETICOES):
+    with Sessao() as s:
+        agendamento_repository.criar(s, 1, 1, 1, periodo[0], f"{8 + i:02d}:00", status="concluido")
+    apos_escrita.append(pagina_de_faturamento())
+
+print(f"{QUANTIDADE} agendamentos — mediana de {REPETICOES} execuções")
+print(f"  cache vazio        {fria:9.2f} ms")
+print(f"  rerun sem escrita  {repetida:9.2f} ms")
+print(f"  rerun após escrita {mediana(apos_escrita):9.2f} ms")
+print(f"  {cache.estatisticas()}")
+connection._engines_atualizados.discard(engine)
@@ -0,0 +1,103 @@
+"""Stress de leitura/escrita concorrente no SQLite: engine padrão x perfil de PRAGMAs (SQLITE_PRAGMAS).
+
+Uso: python tests/bench_concorrencia_sqlite.py [segundos_por_perfil] [leitores] [escritores]
+Não é coletado pelo pytest. Simula várias sessões do Streamlit: leitores rodando os
+relatórios do mês enquanto escritores gravam agendamentos (um commit por gravação,
+como a página de Agenda faz). Mede operações por segundo e falhas "database is locked".
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database.connection import configurar_sqlite, init_db  # noqa: E402
+from src.repositories import agendamento_repository  # noqa: E402
+from src.services import faturamento_service  # noqa: E402
+
+SEGUNDOS = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+LEITORES = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+ESCRITORES = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+INICIO = date(2026, 1, 1)
+
+
+def preparar_banco(caminho: str) -> None:
+    engine = create_engine(f"sqlite:///{caminho}")
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO clientes (nome, bloqueado) VALUES ('Cliente', 0)"))
+        conn.execute(text("INSERT INTO funcionarios (nome, percentual_comissao) VALUES ('Barbeiro', 0.5)"))
+        conn.execute(text("INSERT INTO servicos (nome, preco, duracao) VALUES ('Corte', 50.0, 30)"))
+        conn.execute(
+            text(
+                "INSERT INTO agendamentos (cliente_id, funcionario_id, servico_id, data, hora, status, "
+                "preco_cobrado, percentual_comissao) "
+                "VALUES (1, 1, 1, :data, '10:00', 'concluido', 50.0, 0.5)"
+            ),
+            [{"data": (INICIO + timedelta(days=i % 365)).isoformat()} for i in range(50_000)],
+        )
+    engine.dispose()
+
+
+def rodar(caminho: str, com_perfil: bool) -> dict:
+    engine = create_engine(f"sqlite:///{caminho}", connect_args={"check_same_thread": False})
+    if com_perfil:
+        configurar_sqlite(engine)
+    fabrica = sessionmaker(bind=engine, expire_on_commit=False)
+    fim = time.perf_counter() + SEGUNDOS
+    contagem = {"leituras": 0, "escritas": 0, "locked": 0}
+    trava = threading.Lock()
+
+    def leitor():
+        while time.perf_counter() < fim:
+            with fabrica() as session:
+                try:
+                    faturamento_service.faturamento_por_periodo(session, INICIO, INICIO + timedelta(days=30))
+                    chave = "leituras"
+                except OperationalError:
+                    chave = "locked"
+            with trava:
+                contagem[chave] += 1
+
+    def escritor():
+        while time.perf_counter() < fim:
+            with fabrica() as session:
+                try:
+                    agendamento_repository.criar(session, 1, 1, 1, INICIO, "11:00", status="cancelado")
+                    chave = "escritas"
+                except OperationalError:
+                    session.rollback()
+                    chave = "locked"
+            with trava:
+                contagem[chave] += 1
+
+    threads = [threading.Thread(target=leitor) for _ in range(LEITORES)]
+    threads += [threading.Thread(target=escritor) for _ in range(ESCRITORES)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {chave: valor / SEGUNDOS for chave, valor in contagem.items()}
+
+
+tmp_dir = tempfile.mkdtemp()
+resultados = {}
+for nome, com_perfil in (("padrão (journal DELETE, synchronous FULL)", False), ("perfil SQLITE_PRAGMAS", True)):
+    caminho = os.path.join(tmp_dir, f"stress_{int(com_perfil)}.db")
+    preparar_banco(caminho)
+    resultados[nome] = rodar(caminho, com_perfil)
+
+print(f"{LEITORES} leitores + {ESCRITORES} escritores, {SEGUNDOS:.0f}s por perfil")
+for nome, r in resultados.items():
+    print(
+        f"  {nome:<42} leituras/s {r['leituras']:8.1f}   escritas/s {r['escritas']:8.1f}"
+        f"   falhas locked/s {r['locked']:6.1f}"
+    )
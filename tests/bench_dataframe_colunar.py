@@ -0,0 +1,86 @@
+"""Benchmark da montagem de DataFrames: lista de dicts x carregador colunar (src/services/tabela.py).
+
+Uso: python tests/bench_dataframe_colunar.py [quantidade_de_linhas]
+Não é coletado pelo pytest. Gera 1M linhas (padrão) no formato de
+agendamento_repository.listar_detalhado e mede, para cada forma de montar o quadro,
+o tempo de construção, o pico de memória alocada durante a montagem (tracemalloc,
+além das linhas já lidas) e a memória final do DataFrame (memory_usage(deep=True)).
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from src.services import tabela  # noqa: E402
+
+QUANTIDADE = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+Linha = namedtuple("Linha", "id cliente funcionario servico preco data hora status forma_pagamento")
+FUNCIONARIOS = [f"Barbeiro {i}" for i in range(6)]
+SERVICOS = [f"Serviço {i}" for i in range(12)]
+STATUS = ["concluido", "concluido", "concluido", "agendado", "cancelado", "nao_compareceu"]
+FORMAS = ["pix", "dinheiro", "cartao_debito", "cartao_credito", None]
+INICIO = date(2023, 1, 1)
+
+
+def gerar():
+    # Strings novas a cada linha, como o driver do banco devolve.
+    for i in range(QUANTIDADE):
+        yield Linha(
+            i,
+            f"Cliente {i % 5000}",
+            "".join(FUNCIONARIOS[i % 6]),
+            "".join(SERVICOS[i % 12]),
+            30.0 + i % 12 * 5,
+            INICIO + timedelta(days=i % 1200),
+            f"{8 + i % 11:02d}:{'30' if i % 2 else '00'}",
+            "".join(STATUS[i % 6]),
+            FORMAS[i % 5],
+        )
+
+
+def por_dicts(linhas):
+    return pd.DataFrame(
+        [
+            {
+                "ID": r.id,
+                "Cliente": r.cliente,
+                "Funcionario": r.funcionario,
+                "Servico": r.servico,
+                "Preco": r.preco,
+                "Data": r.data,
+                "Hora": r.hora,
+                "Status": r.status,
+                "FormaPagamento": r.forma_pagamento,
+            }
+            for r in linhas
+        ]
+    )
+
+
+def medir(nome, montar):
+    # Tempo e memória em execuções separadas: o tracemalloc deixa cada alocação bem mais lenta.
+    linhas = list(gerar())
+    gc.collect()
+    inicio = time.perf_counter()
+    df = montar(linhas)
+    segundos = time.perf_counter() - inicio
+    final = df.memory_usage(deep=True).sum()
+    del df
+    gc.collect()
+    tracemalloc.start()
+    montar(linhas)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {nome:<22} {segundos:7.2f} s   pico {pico / 2**20:8.1f} MiB   DataFrame {final / 2**20:8.1f} MiB")
+
+
+print(f"{QUANTIDADE} linhas")
+medir("lista de dicts", por_dicts)
+medir("colunar + categorias", tabela.quadro_de_agendamentos)
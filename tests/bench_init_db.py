@@ -0,0 +1,82 @@
+"""Benchmark de inicialização: custo de init_db() por rerun do Streamlit, antes e depois do controle de versão.
+
+Uso: python tests/bench_init_db.py [quantidade_de_agendamentos]
+Não é coletado pelo pytest (não segue o padrão test_*.py). Monta um banco temporário
+com 100k agendamentos (padrão) e compara:
+- antes: o que todo rerun fazia (inspeção do schema, UPDATE em agendamentos, create_all, COUNT em usuarios);
+- depois: a primeira chamada do processo (uma leitura de schema_version) e os reruns seguintes.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from src.database import connection  # noqa: E402
+from src.database.models import Base  # noqa: E402
+
+QUANTIDADE = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+REPETICOES = 20
+
+tmp_dir = tempfile.mkdtemp()
+engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench_init.db')}")
+connection.init_db(engine)
+
+with engine.begin() as conn:
+    conn.execute(text("INSERT INTO clientes (nome, bloqueado) VALUES ('Cliente', 0)"))
+    conn.execute(text("INSERT INTO funcionarios (nome, percentual_comissao) VALUES ('Barbeiro', 0.5)"))
+    conn.execute(text("INSERT INTO servicos (nome, preco, duracao) VALUES ('Corte', 50.0, 30)"))
+    inicio = date(2022, 1, 1)
+    conn.execute(
+        text(
+            "INSERT INTO agendamentos (cliente_id, funcionario_id, servico_id, data, hora, status, "
+            "preco_cobrado, percentual_comissao) "
+            "VALUES (1, 1, 1, :data, :hora, 'concluido', 50.0, 0.5)"
+        ),
+        [
+            {
+                "data": (inicio + timedelta(days=i // 20)).isoformat(),
+                "hora": f"{8 + (i % 20) // 2:02d}:{(i % 2) * 30:02d}",
+            }
+            for i in range(QUANTIDADE)
+        ],
+    )
+
+
+def rerun_antes():
+    with engine.begin() as conn:
+        connection._migrate_legacy_schema(conn)
+        connection._criar_indices_agendamentos(conn)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        connection._seed_admin(conn)
+
+
+def rerun_depois():
+    connection.init_db(engine)
+
+
+def medir(funcao, zerar_processo=False) -> float:
+    tempos = []
+    for _ in range(REPETICOES):
+        if zerar_processo:
+            connection._engines_atualizados.discard(engine)
+        inicio_ms = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio_ms) * 1000)
+    tempos.sort()
+    return tempos[len(tempos) // 2]
+
+
+antes = medir(rerun_antes)
+primeira = medir(rerun_depois, zerar_processo=True)
+seguintes = medir(rerun_depois)
+
+print(f"Banco com {QUANTIDADE} agendamentos — mediana de {REPETICOES} execuções")
+print(f"  antes  (todo rerun)              : {antes:9.3f} ms")
+print(f"  depois (1ª chamada do processo)  : {primeira:9.3f} ms")
+print(f"  depois (reruns seguintes)        : {seguintes:9.3f} ms")
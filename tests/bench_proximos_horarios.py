@@ -0,0 +1,134 @@
+"""Benchmark da busca de próximos horários livres: laço por funcionário e dia x proximos_horarios.
+
+Uso: python tests/bench_proximos_horarios.py [funcionarios] [dias]
+Não é coletado pelo pytest. Monta um banco temporário com 20 funcionários (padrão)
+e 60 dias de agenda ocupados em ~90% com serviços de 30, 60 e 90 min, e procura os
+10 primeiros horários para um serviço de 60 min em toda a janela:
+
+- "por funcionário e dia": o que a página fazia — horarios_disponiveis para cada
+  (funcionário, dia), uma consulta por combinação, até juntar 10 horários;
+- proximos_horarios: uma consulta de ocupação da janela inteira (lida em ordem de
+  data, só até completar os 10) e máscaras de bits.
+
+Mede também o pior caso (só sobram horários no último dia da janela).
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import connection  # noqa: E402
+from src.services import agendamento_service, disponibilidade  # noqa: E402
+
+FUNCIONARIOS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+DIAS = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+LIMITE = 10
+REPETICOES = 5
+AGORA = datetime(2026, 8, 1, 9, 0)
+INICIO = agendamento_service.data_minima_agendamento(AGORA.date())
+DURACOES = (30, 60, 90)
+
+
+def montar_banco(ocupacao_do_ultimo_dia: float):
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_proximos.db')}")
+    connection.init_db(engine)
+    sorteio = random.Random(42)
+    linhas = []
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO clientes (nome, bloqueado) VALUES ('Cliente', 0)"))
+        for i in range(FUNCIONARIOS):
+            conn.execute(text(f"INSERT INTO funcionarios (nome, percentual_comissao) VALUES ('Barbeiro {i:02d}', 0.5)"))
+        for i, duracao in enumerate(DURACOES, start=1):
+            conn.execute(text(f"INSERT INTO servicos (nome, preco, duracao) VALUES ('Serviço {i}', 50, {duracao})"))
+        for d in range(DIAS):
+            dia = INICIO + timedelta(days=d)
+            # Todos os dias lotados, exceto o último, ocupado em `ocupacao_do_ultimo_dia`.
+            taxa = ocupacao_do_ultimo_dia if d == DIAS - 1 else 1.0
+            for f in range(1, FUNCIONARIOS + 1):
+                slot = 0
+                while slot < len(disponibilidade.GRADE):
+                    servico = sorteio.randrange(len(DURACOES))
+                    if sorteio.random() < taxa:
+                        linhas.append(
+                            {"f": f, "s": servico + 1, "data": dia.isoformat(), "hora": disponibilidade.GRADE[slot]}
+                        )
+                    slot += disponibilidade.slots_do_servico(DURACOES[servico])
+        conn.execute(
+            text(
+                "INSERT INTO agendamentos (cliente_id, funcionario_id, servico_id, data, hora, status) "
+                "VALUES (1, :f, :s, :data, :hora, 'agendado')"
+            ),
+            linhas,
+        )
+        conn.execute(text("ANALYZE"))
+    return engine, len(linhas)
+
+
+def por_funcionario_e_dia(session, servico_id):
+    encontrados = []
+    ids = [f for f in range(1, FUNCIONARIOS + 1)]
+    for d in range(DIAS):
+        dia = INICIO + timedelta(days=d)
+        do_dia = []
+        for funcionario_id in ids:
+            for hora in agendamento_service.horarios_disponiveis(
+                session, funcionario_id, dia, agora=AGORA, servico_id=servico_id
+            ):
+                do_dia.append((hora, funcionario_id))
+        encontrados += [(dia, hora, f) for hora, f in sorted(do_dia)]
+        if len(encontrados) >= LIMITE:
+            return encontrados[:LIMITE]
+    return encontrados
+
+
+def medir(funcao) -> tuple[float, int]:
+    tempos, consultas = [], []
+    for _ in range(REPETICOES):
+        contador = []
+        ouvinte = lambda *a: contador.append(1)  # noqa: E731
+        event.listen(engine, "before_cursor_execute", ouvinte)
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        event.remove(engine, "before_cursor_execute", ouvinte)
+        consultas.append(len(contador))
+    tempos.sort()
+    return tempos[len(tempos) // 2], consultas[0]
+
+
+for cenario, ocupacao in (("90% ocupado", 0.9), ("livre só no último dia", 0.3)):
+    engine, total = montar_banco(1.0 if cenario == "90% ocupado" else ocupacao)
+    session = sessionmaker(bind=engine)()
+    if cenario == "90% ocupado":
+        # Libera ~10% da agenda inteira.
+        session.execute(text("DELETE FROM agendamentos WHERE abs(random()) % 10 = 0"))
+        session.commit()
+    servico_id = 2  # 60 min
+
+    esperado = [(p["data"], p["hora"]) for p in agendamento_service.proximos_horarios(
+        session, servico_id, INICIO, dias=DIAS, limite=LIMITE, agora=AGORA
+    )]
+    assert esperado == [(dia, hora) for dia, hora, _ in por_funcionario_e_dia(session, servico_id)]
+
+    print(f"{FUNCIONARIOS} funcionários x {DIAS} dias, {cenario} — mediana de {REPETICOES} execuções")
+    for nome, funcao in (
+        ("por funcionário e dia", lambda: por_funcionario_e_dia(session, servico_id)),
+        (
+            "proximos_horarios",
+            lambda: agendamento_service.proximos_horarios(
+                session, servico_id, INICIO, dias=DIAS, limite=LIMITE, agora=AGORA
+            ),
+        ),
+    ):
+        tempo, consultas = medir(funcao)
+        print(f"  {nome:<24} {tempo:9.2f} ms   {consultas:6d} consultas")
+    session.close()
+    connection._engines_atualizados.discard(engine)
+    engine.dispose()
@@ -0,0 +1,107 @@
+"""Benchmark do quadro da semana da equipe: laço por funcionário e dia x quadro_da_semana.
+
+Uso: python tests/bench_quadro_semanal.py [quantidade_de_agendamentos]
+Não é coletado pelo pytest. Monta um banco temporário com 15 funcionários e 1M
+agendamentos (padrão) com a agenda cheia dia após dia (~8 anos), e monta o quadro
+de 7 dias no meio do histórico:
+
+- "por funcionário e dia": ocupacao_do_dia para cada (funcionário, dia), uma
+  consulta por combinação, só para saber quais slots estão ocupados;
+- quadro_da_semana: uma consulta da semana inteira e a matriz NumPy com a situação
+  de cada slot (sem o cache de leituras: __wrapped__).
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import connection  # noqa: E402
+from src.services import disponibilidade, quadro_service  # noqa: E402
+
+QUANTIDADE = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+FUNCIONARIOS = 15
+REPETICOES = 5
+INICIO = date(2019, 1, 7)
+STATUS = ("concluido", "concluido", "concluido", "cancelado", "nao_compareceu", "agendado")
+SLOTS = len(disponibilidade.GRADE)
+POR_DIA = FUNCIONARIOS * SLOTS
+
+engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_quadro.db')}")
+connection.init_db(engine)
+with engine.begin() as conn:
+    conn.execute(text("INSERT INTO clientes (nome, bloqueado) VALUES ('Cliente', 0)"))
+    for i in range(FUNCIONARIOS):
+        conn.execute(text(f"INSERT INTO funcionarios (nome, percentual_comissao) VALUES ('Barbeiro {i:02d}', 0.5)"))
+    conn.execute(text("INSERT INTO servicos (nome, preco, duracao) VALUES ('Corte', 50, 30)"))
+    # Um agendamento por (funcionário, dia, slot): a agenda inteira ocupada, dia após dia.
+    conn.execute(
+        text(
+            "INSERT INTO agendamentos (cliente_id, funcionario_id, servico_id, data, hora, status) "
+            "VALUES (1, :f, 1, :data, :hora, :status)"
+        ),
+        [
+            {
+                "f": 1 + (i // SLOTS) % FUNCIONARIOS,
+                "data": (INICIO + timedelta(days=i // POR_DIA)).isoformat(),
+                "hora": disponibilidade.GRADE[i % SLOTS],
+                "status": STATUS[i % len(STATUS)],
+            }
+            for i in range(QUANTIDADE)
+        ],
+    )
+    conn.execute(text("ANALYZE"))
+
+session = sessionmaker(bind=engine)()
+dias_de_historico = QUANTIDADE // POR_DIA
+semana = INICIO + timedelta(days=(dias_de_historico // 2) // 7 * 7)
+ids = list(range(1, FUNCIONARIOS + 1))
+
+
+def por_funcionario_e_dia():
+    return [
+        disponibilidade.ocupacao_do_dia(session, semana + timedelta(days=d), [f]).get(f, 0)
+        for f in ids
+        for d in range(7)
+    ]
+
+
+def medir(funcao) -> tuple[float, int]:
+    tempos, consultas = [], []
+    for _ in range(REPETICOES):
+        contador = []
+        ouvinte = lambda *a: contador.append(1)  # noqa: E731
+        event.listen(engine, "before_cursor_execute", ouvinte)
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        event.remove(engine, "before_cursor_execute", ouvinte)
+        consultas.append(len(contador))
+    tempos.sort()
+    return tempos[len(tempos) // 2], consultas[0]
+
+
+quadro = quadro_service.quadro_da_semana.__wrapped__(session, semana)
+ocupados = por_funcionario_e_dia()
+assert [
+    sum(1 << s for s in range(SLOTS) if quadro.matriz[f, d, s] > quadro_service.FORA_DO_EXPEDIENTE)
+    for f in range(FUNCIONARIOS)
+    for d in range(7)
+] == ocupados
+
+print(f"{QUANTIDADE} agendamentos, {FUNCIONARIOS} funcionários, semana de {semana:%d/%m/%Y} — mediana de {REPETICOES}")
+for nome, funcao in (
+    ("por funcionário e dia", por_funcionario_e_dia),
+    ("quadro_da_semana", lambda: quadro_service.quadro_da_semana.__wrapped__(session, semana)),
+):
+    tempo, consultas = medir(funcao)
+    print(f"  {nome:<24} {tempo:9.2f} ms   {consultas:6d} consultas")
+print(f"  situação dos slots: {quadro_service.resumo(quadro)}")
+session.close()
+connection._engines_atualizados.discard(engine)
+engine.dispose()
@@ -0,0 +1,118 @@
+"""Benchmark dos relatórios: agregação sobre agendamentos x rollup receita_diaria.
+
+Uso: python tests/bench_receita_diaria.py [quantidade_de_agendamentos]
+Não é coletado pelo pytest. Monta um banco temporário com 200k agendamentos (padrão)
+em ~3 anos, reconstrói o rollup e compara, para o histórico todo e para um mês:
+totais por mês e os KPIs do período lendo as linhas cruas (como era) e lendo o rollup.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, select, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import connection, datas  # noqa: E402
+from src.database.models import Agendamento  # noqa: E402
+from src.repositories import agendamento_repository, receita_diaria_repository  # noqa: E402
+from src.services import faturamento_service, relatorio_service  # noqa: E402
+
+QUANTIDADE = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+REPETICOES = 10
+INICIO = date(2024, 1, 1)
+STATUS = ("concluido", "concluido", "concluido", "cancelado", "nao_compareceu", "agendado")
+FORMAS = ("pix", "dinheiro", "cartao_debito", None)
+
+
+def _hora(k: int) -> str:
+    # A mesma combinação de funcionário e dia se repete a cada 1000 linhas: um minuto por
+    # repetição mantém os agendados fora do índice único de horário (funcionário, data, hora).
+    return f"{(k // 60) % 24:02d}:{k % 60:02d}"
+
+
+engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_rollup.db')}")
+connection.init_db(engine)
+with engine.begin() as conn:
+    conn.execute(text("INSERT INTO clientes (nome, bloqueado) VALUES ('Cliente', 0)"))
+    for i in range(4):
+        conn.execute(text(f"INSERT INTO funcionarios (nome, percentual_comissao) VALUES ('Barbeiro {i}', 0.5)"))
+        conn.execute(text(f"INSERT INTO servicos (nome, preco, duracao) VALUES ('Serviço {i}', {30 + 10 * i}, 30)"))
+    conn.execute(
+        text(
+            "INSERT INTO agendamentos (cliente_id, funcionario_id, servico_id, data, hora, status, forma_pagamento, "
+            "preco_cobrado, percentual_comissao) VALUES (1, :f, :s, :data, :hora, :status, :forma, :preco, 0.5)"
+        ),
+        [
+            {
+                "f": 1 + i % 4,
+                "s": 1 + (i // 4) % 4,
+                "data": (INICIO + timedelta(days=i % 1000)).isoformat(),
+                "hora": _hora(i // 1000),
+                "status": STATUS[i % len(STATUS)],
+                "forma": FORMAS[i % len(FORMAS)] if STATUS[i % len(STATUS)] == "concluido" else None,
+                "preco": 30 + 10 * ((i // 4) % 4),
+            }
+            for i in range(QUANTIDADE)
+        ],
+    )
+session = sessionmaker(bind=engine)()
+receita_diaria_repository.reconstruir(session)
+
+
+def por_mes_cru():
+    ano, mes = datas.ano(Agendamento.data), datas.mes(Agendamento.data)
+    stmt = (
+        select(ano, mes, func.sum(Agendamento.preco_cobrado))
+        .where(Agendamento.status == "concluido")
+        .group_by(ano, mes)
+    )
+    return session.execute(stmt).all()
+
+
+def kpis_cru(inicio, fim):
+    # O cálculo antigo: todas as linhas do período, contadas e somadas em Python.
+    linhas = agendamento_repository.listar_detalhado(session, a_partir_de=inicio, ate=fim)
+    concluidas = [r for r in linhas if r.status == "concluido"]
+    return len(linhas), sum(r.preco for r in concluidas), len({r.cliente for r in concluidas})
+
+
+def medir(funcao) -> float:
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return tempos[len(tempos) // 2]
+
+
+# __wrapped__: a função sem o cache de leituras, para medir a consulta a cada repetição.
+fim = INICIO + timedelta(days=999)
+mes_inicio, mes_fim = date(2025, 3, 1), date(2025, 3, 31)
+casos = [
+    (
+        "faturamento por mês (histórico)",
+        por_mes_cru,
+        lambda: faturamento_service.faturamento_por_mes.__wrapped__(session),
+    ),
+    (
+        "KPIs do histórico todo",
+        lambda: kpis_cru(INICIO, fim),
+        lambda: relatorio_service.kpis.__wrapped__(session, INICIO, fim),
+    ),
+    (
+        "KPIs de um mês",
+        lambda: kpis_cru(mes_inicio, mes_fim),
+        lambda: relatorio_service.kpis.__wrapped__(session, mes_inicio, mes_fim),
+    ),
+]
+linhas_rollup = session.scalar(text("SELECT COUNT(*) FROM receita_diaria"))
+print(f"{QUANTIDADE} agendamentos, {linhas_rollup} linhas no rollup — mediana de {REPETICOES} execuções")
+for nome, cru, rollup in casos:
+    print(f"  {nome:<34} agendamentos {medir(cru):9.2f} ms   rollup {medir(rollup):8.2f} ms")
+session.close()
+connection._engines_atualizados.discard(engine)
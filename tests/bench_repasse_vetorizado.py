@@ -0,0 +1,111 @@
+"""Benchmark do repasse e das somas por funcionário: laço por linha x versão vetorizada.
+
+Uso: python tests/bench_repasse_vetorizado.py [quantidade_de_linhas]
+Não é coletado pelo pytest. Gera 500k atendimentos (padrão) no formato de
+faturamento_por_periodo / listar_para_relatorio e compara o cálculo antigo (um
+dict por linha, arredondando a cada linha) com as versões colunares: repasse por
+atendimento e o desempenho por funcionário da página de relatórios (as somas de
+relatorio_pagamentos saem do banco; ver dia_fechado_repository). As versões vetorizadas
+recebem o quadro já em colunas — no app o do repasse é montado uma vez por versão
+dos dados (quadro_de_faturamento) e reaproveitado; o custo dessa montagem aparece
+separado. O desempenho lê as colunas que o RetratoDoPeriodo monta ao ser criado.
+"""
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import faturamento_service, relatorio_service  # noqa: E402
+
+QUANTIDADE = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+Periodo = namedtuple("Periodo", faturamento_service.COLUNAS_PERIODO)
+Relatorio = namedtuple("Relatorio", relatorio_service.COLUNAS_RELATORIO)
+INICIO = date(2025, 1, 1)
+PERCENTUAIS = {f: 0.4 + 0.05 * f for f in range(1, 9)}
+
+sorteio = random.Random(42)
+periodo, relatorio = [], []
+for i in range(QUANTIDADE):
+    f = sorteio.randint(1, 8)
+    preco = round(sorteio.uniform(20, 180), 2)
+    percentual = sorteio.choice([None, 0.5, 0.6])
+    dia = INICIO + timedelta(days=i % 365)
+    periodo.append(Periodo(f, f"Barbeiro {f}", "Corte", preco, percentual, dia))
+    relatorio.append(
+        Relatorio(
+            f,
+            f"Barbeiro {f}",
+            PERCENTUAIS[f],
+            i,
+            i % 3000,
+            "Corte",
+            dia,
+            "10:00",
+            "concluido",
+            "pix",
+            preco,
+            percentual,
+        )
+    )
+
+
+def repasse_por_linha():
+    resultado = []
+    for row in periodo:
+        pct = row.percentual if row.percentual is not None else PERCENTUAIS.get(row.funcionario_id, 0.5)
+        resultado.append(
+            {
+                "funcionario_id": row.funcionario_id,
+                "funcionario": row.funcionario,
+                "servico": row.servico,
+                "preco_servico": row.preco_servico,
+                "data": row.data,
+                "percentual": pct,
+                "repasse_funcionario": round(row.preco_servico * pct, 2),
+                "repasse_loja": round(row.preco_servico * (1 - pct), 2),
+            }
+        )
+    return resultado
+
+
+def desempenho_por_linha():
+    por_funcionario: dict[int, dict] = {}
+    for r in relatorio:
+        item = por_funcionario.setdefault(r.funcionario_id, {"atendimentos": 0, "receita": 0.0, "comissao": 0.0})
+        item["atendimentos"] += 1
+        item["receita"] += r.preco
+        item["comissao"] += r.preco * (r.percentual if r.percentual is not None else r.percentual_atual)
+    return por_funcionario
+
+
+inicio = time.perf_counter()
+quadro = faturamento_service.quadro_do_periodo(periodo)
+montagem = (time.perf_counter() - inicio) * 1000
+retrato = relatorio_service.RetratoDoPeriodo(INICIO, INICIO + timedelta(days=364), relatorio, com_anterior=False)
+casos = [
+    (
+        "repasse por atendimento",
+        repasse_por_linha,
+        lambda: faturamento_service.calcular_repasse_vetorizado(quadro, PERCENTUAIS),
+    ),
+    ("desempenho (relatórios)", desempenho_por_linha, retrato.desempenho_funcionarios),
+]
+
+
+def medir(funcao) -> float:
+    tempos = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return sorted(tempos)[1] * 1000
+
+
+print(f"{QUANTIDADE} atendimentos — mediana de 3 execuções")
+print(f"  montagem do quadro (uma vez)       {montagem:9.1f} ms")
+for nome, por_linha, vetorizado in casos:
+    print(f"  {nome:<34} por linha {medir(por_linha):9.1f} ms   vetorizado {medir(vetorizado):9.1f} ms")
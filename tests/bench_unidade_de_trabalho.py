@@ -0,0 +1,129 @@
+"""Benchmark de commits/fsyncs e latência por operação: um commit por escrita x unidade de trabalho.
+
+Uso: python tests/bench_unidade_de_trabalho.py [repeticoes] [full]
+Não é coletado pelo pytest. Em um banco SQLite em arquivo (perfil SQLITE_PRAGMAS), mede
+registrar_pagamento (pagamento + baixa de vales + saída no caixa) e alterar_status
+(status + bloqueio do cliente) com `confirmar` fazendo commit a cada escrita ("antes")
+e dentro de `transacao` ("depois"). Commits são contados pelo evento `commit` do engine;
+em WAL com synchronous NORMAL o commit não faz fsync; passe `full` para medir com
+synchronous=FULL, em que cada commit custa um fsync.
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import connection  # noqa: E402
+from src.repositories import (  # noqa: E402
+    adiantamento_repository,
+    agendamento_repository,
+    cliente_repository,
+    funcionario_repository,
+    servico_repository,
+)
+from src.services import agendamento_service, pagamento_service  # noqa: E402
+
+REPETICOES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+SYNC_FULL = len(sys.argv) > 2 and sys.argv[2] == "full"
+DIA = date(2026, 1, 5)
+
+
+@contextmanager
+def _sem_unidade_de_trabalho(session):
+    """Simula o comportamento anterior: cada escrita de repositório fazia o próprio commit."""
+    yield session
+
+
+def medir(engine, operacao, entradas, sem_uow: bool) -> tuple[float, float]:
+    commits = []
+    ouvinte = lambda conn: commits.append(1)  # noqa: E731
+    event.listen(engine, "commit", ouvinte)
+    originais = (pagamento_service.transacao, agendamento_service.transacao)
+    if sem_uow:
+        pagamento_service.transacao = agendamento_service.transacao = _sem_unidade_de_trabalho
+    tempos = []
+    try:
+        for entrada in entradas:
+            inicio = time.perf_counter()
+            operacao(entrada)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        pagamento_service.transacao, agendamento_service.transacao = originais
+        event.remove(engine, "commit", ouvinte)
+    tempos.sort()
+    return len(commits) / len(entradas), tempos[len(tempos) // 2]
+
+
+def main():
+    caminho = os.path.join(tempfile.mkdtemp(), "bench_uow.db")
+    pragmas = {**connection.SQLITE_PRAGMAS, "synchronous": "FULL"} if SYNC_FULL else None
+    engine = create_engine(f"sqlite:///{caminho}")
+    connection.configurar_sqlite(engine, pragmas)
+    connection.init_db(engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    servico = servico_repository.criar(session, "Corte", 50.0, 30)
+    cliente = cliente_repository.criar(session, "Cliente", "1199", None)
+
+    def preparar_acertos() -> list[int]:
+        """Um funcionário por acerto, com um atendimento concluído e um vale pendente."""
+        ids = []
+        for i in range(REPETICOES):
+            funcionario = funcionario_repository.criar(session, f"Barbeiro {len(ids)}-{i}", "Barbeiro")
+            agendamento_repository.criar(
+                session, cliente.id, funcionario.id, servico.id, DIA, "09:00", status="concluido"
+            )
+            adiantamento_repository.criar(session, funcionario.id, DIA, 5.0)
+            ids.append(funcionario.id)
+        return ids
+
+    def preparar_faltas() -> list[int]:
+        """Um agendamento por cliente que já está a uma falta do bloqueio."""
+        funcionario = funcionario_repository.criar(session, "Barbeiro faltas", "Barbeiro")
+        ids = []
+        for i in range(REPETICOES):
+            faltoso = cliente_repository.criar(session, f"Faltoso {i}", "1199", None)
+            for hora in ("08:00", "08:30")[: agendamento_service.LIMITE_FALTAS_BLACKLIST - 1]:
+                agendamento_repository.criar(
+                    session, faltoso.id, funcionario.id, servico.id, DIA, hora, status="nao_compareceu"
+                )
+            agendamento = agendamento_repository.criar(session, faltoso.id, funcionario.id, servico.id, DIA, "10:00")
+            ids.append(agendamento.id)
+        return ids
+
+    def pagar(funcionario_id):
+        pagamento_service.registrar_pagamento(
+            session, funcionario_id, DIA, DIA, data_pagamento=DIA, lancar_no_caixa=True
+        )
+
+    def faltar(agendamento_id):
+        agendamento_service.alterar_status(
+            session, agendamento_id, "nao_compareceu", agora=datetime(2026, 1, 5, 12, 0)
+        )
+
+    print(
+        f"synchronous={'FULL' if SYNC_FULL else 'NORMAL'}, {REPETICOES} execuções por cenário — "
+        "commits por operação e mediana de latência"
+    )
+    for nome, operacao, preparar in (
+        ("registrar_pagamento", pagar, preparar_acertos),
+        ("alterar_status (com bloqueio)", faltar, preparar_faltas),
+    ):
+        antes = medir(engine, operacao, preparar(), sem_uow=True)
+        depois = medir(engine, operacao, preparar(), sem_uow=False)
+        print(f"  {nome}")
+        print(f"    antes  (commit por escrita)  : {antes[0]:4.1f} commits  {antes[1]:7.3f} ms")
+        print(f"    depois (unidade de trabalho) : {depois[0]:4.1f} commits  {depois[1]:7.3f} ms")
+
+    session.close()
+    connection._engines_atualizados.discard(engine)
+    engine.dispose()
+
+
+main()
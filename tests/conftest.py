@@ -3,6 +3,17 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from src.database.models import Base
+from src.services import cache, expediente_service
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    # Todos os bancos de teste são "sqlite:///:memory:": sem limpar, um teste leria o cache do anterior.
+    cache.limpar()
+    expediente_service.limpar()
+    yield
+    cache.limpar()
+    expediente_service.limpar()
 
 
 @pytest.fixture()
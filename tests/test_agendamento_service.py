@@ -1,10 +1,16 @@
+import threading
 from datetime import date, datetime
 
 import pytest
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
 
+from src.database import connection
+from src.database.models import Agendamento
 from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
-from src.services import agendamento_service
-from src.services.agendamento_service import ConflitoDeHorarioError
+from src.services import agendamento_service, disponibilidade, expediente_service
+from src.services.agendamento_service import ConclusaoAntecipadaError, ConflitoDeHorarioError
 
 
 @pytest.fixture()
@@ -92,6 +98,143 @@ def test_horarios_disponiveis_exclui_horario_ocupado(session, cadastro_basico):
     assert "10:30" in horarios
 
 
+def _servico_de(session, minutos: int) -> int:
+    return servico_repository.criar(session, f"Serviço {minutos} min", 80.0, minutos).id
+
+
+def test_horarios_disponiveis_consideram_a_duracao_dos_servicos(session, cadastro_basico):
+    hora_e_meia = _servico_de(session, 90)
+    agendamento_service.criar_agendamento(
+        session,
+        cadastro_basico["cliente_id"],
+        cadastro_basico["funcionario_a_id"],
+        hora_e_meia,
+        date(2026, 8, 10),
+        "10:00",
+    )
+    agendamento_service.criar_agendamento(
+        session,
+        cadastro_basico["cliente_b_id"],
+        cadastro_basico["funcionario_a_id"],
+        cadastro_basico["servico_id"],
+        date(2026, 8, 10),
+        "12:00",
+    )
+
+    corte = agendamento_service.horarios_disponiveis(
+        session, cadastro_basico["funcionario_a_id"], date(2026, 8, 10), servico_id=cadastro_basico["servico_id"]
+    )
+    uma_hora = agendamento_service.horarios_disponiveis(
+        session, cadastro_basico["funcionario_a_id"], date(2026, 8, 10), servico_id=_servico_de(session, 60)
+    )
+
+    # O de 90 min ocupa 10:00, 10:30 e 11:00; sobra o buraco de 30 min das 11:30.
+    assert {"10:00", "10:30", "11:00", "12:00"}.isdisjoint(corte)
+    assert "11:30" in corte
+    # Uma hora não cabe no buraco das 11:30, nem começando às 18:30 (passaria do fechamento).
+    assert {"09:30", "11:30", "18:30"}.isdisjoint(uma_hora)
+    assert {"09:00", "12:30", "18:00"} <= set(uma_hora)
+
+
+def test_criar_agendamento_recusa_servico_que_nao_cabe_no_intervalo(session, cadastro_basico):
+    agendamento_service.criar_agendamento(
+        session,
+        cadastro_basico["cliente_id"],
+        cadastro_basico["funcionario_a_id"],
+        cadastro_basico["servico_id"],
+        date(2026, 8, 10),
+        "10:30",
+    )
+    with pytest.raises(ConflitoDeHorarioError, match="não cabe"):
+        agendamento_service.criar_agendamento(
+            session,
+            cadastro_basico["cliente_b_id"],
+            cadastro_basico["funcionario_a_id"],
+            _servico_de(session, 60),
+            date(2026, 8, 10),
+            "10:00",
+        )
+
+
+def test_disponibilidade_de_todos_os_funcionarios_numa_consulta(session, cadastro_basico):
+    agendamento_service.criar_agendamento(
+        session,
+        cadastro_basico["cliente_id"],
+        cadastro_basico["funcionario_a_id"],
+        cadastro_basico["servico_id"],
+        date(2026, 8, 10),
+        "10:00",
+    )
+    ids = [cadastro_basico["funcionario_a_id"], cadastro_basico["funcionario_b_id"]]
+    servico_id = cadastro_basico["servico_id"]
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+
+    livres = agendamento_service.horarios_disponiveis_por_funcionario(
+        session, ids, date(2026, 8, 10), servico_id, agora=datetime(2026, 8, 1, 9, 0)
+    )
+
+    assert len([c for c in comandos if "FROM agendamentos" in c]) == 1
+    assert "10:00" not in livres[ids[0]]
+    assert livres[ids[1]] == agendamento_service._gerar_grade_horarios()
+
+
+def test_proximos_horarios_ordena_por_data_hora_e_respeita_antecedencia(session, cadastro_basico):
+    a, b = cadastro_basico["funcionario_a_id"], cadastro_basico["funcionario_b_id"]
+    uma_hora = _servico_de(session, 60)
+    # A tem 08:00-09:00 ocupado em 11/08; B tem 08:30 ocupado (08:00 não comporta uma hora).
+    agendamento_repository.criar(session, cadastro_basico["cliente_id"], a, uma_hora, date(2026, 8, 11), "08:00")
+    agendamento_repository.criar(
+        session, cadastro_basico["cliente_b_id"], b, cadastro_basico["servico_id"], date(2026, 8, 11), "08:30"
+    )
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+
+    proximos = agendamento_service.proximos_horarios(
+        session, uma_hora, date(2026, 8, 9), limite=4, agora=datetime(2026, 8, 10, 15, 0)
+    )
+
+    # 09/08 e 10/08 ficam antes da antecedência mínima.
+    assert [(p["funcionario_id"], p["data"], p["hora"]) for p in proximos] == [
+        (a, date(2026, 8, 11), "09:00"),
+        (b, date(2026, 8, 11), "09:00"),
+        (a, date(2026, 8, 11), "09:30"),
+        (b, date(2026, 8, 11), "09:30"),
+    ]
+    assert len([c for c in comandos if "FROM agendamentos" in c]) == 1
+
+
+def test_proximos_horarios_de_um_funcionario_atravessa_dias(session, cadastro_basico):
+    a = cadastro_basico["funcionario_a_id"]
+    # 11/08 lotado para A (tudo entre 08:00 e 19:00 com um serviço de 11 h).
+    dia_todo = _servico_de(session, 11 * 60)
+    agendamento_repository.criar(session, cadastro_basico["cliente_id"], a, dia_todo, date(2026, 8, 11), "08:00")
+
+    proximos = agendamento_service.proximos_horarios(
+        session,
+        cadastro_basico["servico_id"],
+        date(2026, 8, 11),
+        dias=2,
+        funcionario_id=a,
+        limite=30,
+        agora=datetime(2026, 8, 10, 15, 0),
+    )
+
+    assert {p["data"] for p in proximos} == {date(2026, 8, 12)}
+    assert [p["hora"] for p in proximos] == agendamento_service._gerar_grade_horarios()
+
+
+def test_mascara_cobre_a_duracao_e_encaixes_fora_da_grade():
+    assert disponibilidade.mascara_do_atendimento("08:00", 30) == 0b1
+    assert disponibilidade.mascara_do_atendimento("08:30", 60) == 0b110
+    assert disponibilidade.mascara_do_atendimento("08:10", 30) == 0b11  # 08:10-08:40
+    assert disponibilidade.mascara_do_atendimento("19:00", 30) == 0
+    assert disponibilidade.inicios_livres(0b110, 60) & 0b111 == 0  # 08:00 esbarra em 08:30
+    assert disponibilidade.cabe(0, "18:30", 30)
+    assert not disponibilidade.cabe(0, "18:30", 45)
+    assert not disponibilidade.cabe(0, "18:40", 30)
+
+
 def test_grade_nao_inclui_horario_de_fechamento(session, cadastro_basico):
     horarios = agendamento_service.horarios_disponiveis(
         session, cadastro_basico["funcionario_a_id"], date(2026, 8, 10)
@@ -254,6 +397,115 @@ def test_alterar_status_em_lote(session, cadastro_basico):
     assert all(r.status == "concluido" for r in linhas)
 
 
+def _agendar_dia(session, cadastro, horas, cliente_id=None):
+    ids = []
+    for hora in horas:
+        agendamento = agendamento_repository.criar(
+            session,
+            cliente_id or cadastro["cliente_id"],
+            cadastro["funcionario_a_id"],
+            cadastro["servico_id"],
+            date(2026, 8, 10),
+            hora,
+        )
+        ids.append(agendamento.id)
+    return ids
+
+
+def test_alterar_status_em_lote_usa_poucos_comandos_e_um_commit(session, cadastro_basico):
+    ids = _agendar_dia(session, cadastro_basico, [f"{h:02d}:{m:02d}" for h in range(8, 19) for m in (0, 30)])
+    comandos, commits = [], []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+    event.listen(session, "after_commit", lambda s: commits.append(1))
+
+    alterados = agendamento_service.alterar_status_em_lote(
+        session, ids, "nao_compareceu", agora=datetime(2026, 8, 10, 20, 0)
+    )
+
+    assert alterados == len(ids) == 22
+    # Leitura dos alvos + UPDATE + contagem agrupada + bloqueio, mais os deltas do rollup
+    # (um SELECT agrupado e um upsert por combinação, antes e depois) e a marcação dos dias
+    # fechados como sujos — independe do tamanho do lote.
+    assert len(comandos) <= 11, comandos
+    assert commits == [1]
+    assert cliente_repository.obter_por_id(session, cadastro_basico["cliente_id"]).bloqueado
+    assert {r.status for r in agendamento_repository.listar_detalhado(session)} == {"nao_compareceu"}
+
+
+def test_alterar_status_em_lote_bloqueia_so_quem_passou_do_limite(session, cadastro_basico):
+    ids = _agendar_dia(session, cadastro_basico, ["09:00", "09:30", "10:00"])
+    ids += _agendar_dia(session, cadastro_basico, ["11:00"], cliente_id=cadastro_basico["cliente_b_id"])
+    agendamento_service.alterar_status_em_lote(session, ids, "cancelado")
+    assert cliente_repository.obter_por_id(session, cadastro_basico["cliente_id"]).bloqueado
+    assert not cliente_repository.obter_por_id(session, cadastro_basico["cliente_b_id"]).bloqueado
+
+
+def test_alterar_status_em_lote_e_tudo_ou_nada(session, cadastro_basico):
+    ids = _agendar_dia(session, cadastro_basico, ["09:00", "15:00"])
+    # O segundo ainda não aconteceu: mesma mensagem de alterar_status e nada é gravado.
+    with pytest.raises(ConclusaoAntecipadaError, match="10/08/2026 às 15:00"):
+        agendamento_service.alterar_status_em_lote(
+            session, ids, "concluido", agora=datetime(2026, 8, 10, 12, 0), forma_pagamento="pix"
+        )
+    assert {r.status for r in agendamento_repository.listar_detalhado(session)} == {"agendado"}
+
+
+def test_alterar_status_em_lote_reativar_detecta_conflito_dentro_do_lote(session, cadastro_basico):
+    # Dois agendados no mesmo horário o índice único já recusa: os dois foram cancelados antes.
+    ids = []
+    for _ in range(2):
+        ids += _agendar_dia(session, cadastro_basico, ["09:00"])
+        agendamento_service.alterar_status_em_lote(session, ids[-1:], "cancelado")
+    with pytest.raises(ConflitoDeHorarioError):
+        agendamento_service.alterar_status_em_lote(session, ids, "agendado")
+    # Reativar só um deles continua permitido.
+    assert agendamento_service.alterar_status_em_lote(session, ids[:1], "agendado") == 1
+
+
+def test_alterar_status_em_lote_reativar_considera_a_duracao_do_servico(session, cadastro_basico):
+    longo = servico_repository.criar(session, "Corte e barba", 80.0, 60)
+    cancelado = agendamento_repository.criar(
+        session, cadastro_basico["cliente_id"], cadastro_basico["funcionario_a_id"], longo.id, date(2026, 8, 10),
+        "09:00",
+    )
+    agendamento_service.alterar_status_em_lote(session, [cancelado.id], "cancelado")
+    # Horário de início diferente, mas o serviço de 60 min das 09:00 cobriria as 09:30.
+    (meia_hora,) = _agendar_dia(session, cadastro_basico, ["09:30"], cliente_id=cadastro_basico["cliente_b_id"])
+    with pytest.raises(ConflitoDeHorarioError, match="09:00"):
+        agendamento_service.alterar_status_em_lote(session, [cancelado.id], "agendado")
+
+    # O mesmo dentro do lote: o primeiro reativado ocupa a agenda para o seguinte.
+    agendamento_service.alterar_status_em_lote(session, [meia_hora], "cancelado")
+    with pytest.raises(ConflitoDeHorarioError):
+        agendamento_service.alterar_status_em_lote(session, [cancelado.id, meia_hora], "agendado")
+    assert agendamento_service.alterar_status_em_lote(session, [cancelado.id], "agendado") == 1
+
+
+def test_reativar_falha_fora_do_expediente(session, cadastro_basico):
+    (agendamento_id,) = _agendar_dia(session, cadastro_basico, ["09:00"])
+    agendamento_service.alterar_status(session, agendamento_id, "cancelado")
+    # 10/08/2026 é segunda-feira: o funcionário passou a folgar nesse dia.
+    expediente_service.definir_folga(session, cadastro_basico["funcionario_a_id"], 0)
+    with pytest.raises(ConflitoDeHorarioError, match="fora do expediente"):
+        agendamento_service.alterar_status(session, agendamento_id, "agendado")
+    with pytest.raises(ConflitoDeHorarioError, match="fora do expediente"):
+        agendamento_service.alterar_status_em_lote(session, [agendamento_id], "agendado")
+
+
+def test_conclusao_grava_preco_vigente(session, cadastro_basico):
+    individual, lote = _agendar_dia(session, cadastro_basico, ["09:00", "09:30"])
+    servico_repository.atualizar(session, cadastro_basico["servico_id"], "Corte", 65.0, 30)
+
+    agendamento_service.alterar_status(
+        session, individual, "concluido", agora=datetime(2026, 8, 10, 12, 0), forma_pagamento="pix"
+    )
+    agendamento_service.alterar_status_em_lote(
+        session, [lote], "concluido", agora=datetime(2026, 8, 10, 12, 0), forma_pagamento="pix"
+    )
+
+    assert [r.preco for r in agendamento_repository.listar_detalhado(session)] == [65.0, 65.0]
+
+
 def test_lancar_atendimento_avulso_entra_como_concluido(session, cadastro_basico):
     agora = datetime(2026, 8, 10, 14, 30)
     agendamento = agendamento_service.lancar_atendimento_avulso(
@@ -501,6 +753,27 @@ def test_blacklist_com_nao_compareceu(session, cadastro_basico):
     assert cliente.bloqueado
 
 
+def test_faltas_por_cliente_conta_todos_numa_consulta(session, cadastro_basico):
+    ids = _agendar_dia(session, cadastro_basico, ["09:00", "09:30", "10:00"])
+    ids += _agendar_dia(session, cadastro_basico, ["11:00", "11:30"], cliente_id=cadastro_basico["cliente_b_id"])
+    agendamento_repository.atualizar_status(session, ids[0], "cancelado")
+    agendamento_repository.atualizar_status(session, ids[1], "nao_compareceu")
+    agendamento_repository.atualizar_status(session, ids[3], "cancelado")
+    agendamento_repository.atualizar_status(session, ids[4], "concluido")
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+
+    faltas = agendamento_repository.faltas_por_cliente(session)
+
+    assert len(comandos) == 1
+    assert "GROUP BY" in comandos[0]
+    assert faltas == {cadastro_basico["cliente_id"]: 2, cadastro_basico["cliente_b_id"]: 1}
+    assert agendamento_repository.faltas_por_cliente(session, [cadastro_basico["cliente_b_id"]]) == {
+        cadastro_basico["cliente_b_id"]: 1
+    }
+    assert agendamento_repository.contar_faltas_do_cliente(session, 999) == 0
+
+
 def test_desbloquear_cliente_permite_agendar(session, cadastro_basico):
     _cancelar_n_vezes(session, cadastro_basico, 3)
     cliente_repository.definir_bloqueio(session, cadastro_basico["cliente_id"], False)
@@ -529,3 +802,173 @@ def test_horarios_disponiveis_nao_afeta_outro_funcionario(session, cadastro_basi
         session, cadastro_basico["funcionario_b_id"], date(2026, 8, 10)
     )
     assert "10:00" in horarios_b
+
+
+def test_indice_unico_recusa_dois_agendados_no_mesmo_horario(session, cadastro_basico):
+    _agendar_dia(session, cadastro_basico, ["09:00"])
+    with pytest.raises(IntegrityError):
+        _agendar_dia(session, cadastro_basico, ["09:00"], cliente_id=cadastro_basico["cliente_b_id"])
+    session.rollback()
+    # Concluídos e cancelados são histórico: o mesmo horário não os conflita.
+    concluido = agendamento_repository.criar(
+        session,
+        cadastro_basico["cliente_b_id"],
+        cadastro_basico["funcionario_a_id"],
+        cadastro_basico["servico_id"],
+        date(2026, 8, 10),
+        "09:00",
+        status="concluido",
+    )
+    assert concluido.id is not None
+
+
+def test_criar_agendamento_sem_checagem_cai_no_indice_como_conflito(session, cadastro_basico, monkeypatch):
+    _agendar_dia(session, cadastro_basico, ["10:00"], cliente_id=cadastro_basico["cliente_b_id"])
+    # Simula a corrida: a outra sessão gravou depois das checagens desta.
+    monkeypatch.setattr(disponibilidade, "ocupacao_do_dia", lambda *args, **kwargs: {})
+    with pytest.raises(ConflitoDeHorarioError, match="10:00 já está ocupado"):
+        agendamento_service.criar_agendamento(
+            session,
+            cadastro_basico["cliente_id"],
+            cadastro_basico["funcionario_a_id"],
+            cadastro_basico["servico_id"],
+            date(2026, 8, 10),
+            "10:00",
+        )
+    assert len(agendamento_repository.listar_detalhado(session)) == 1
+
+
+def test_reserva_do_cliente_recusa_segundo_agendamento_sem_checagem(session, cadastro_basico, monkeypatch):
+    agendamento_service.criar_agendamento(
+        session,
+        cadastro_basico["cliente_id"],
+        cadastro_basico["funcionario_a_id"],
+        cadastro_basico["servico_id"],
+        date(2026, 8, 10),
+        "10:00",
+    )
+    monkeypatch.setattr(agendamento_repository, "listar_ativos_do_cliente", lambda *args, **kwargs: [])
+    with pytest.raises(agendamento_service.AgendamentoDuplicadoError):
+        agendamento_service.criar_agendamento(
+            session,
+            cadastro_basico["cliente_id"],
+            cadastro_basico["funcionario_b_id"],
+            cadastro_basico["servico_id"],
+            date(2026, 8, 12),
+            "11:00",
+        )
+
+
+@pytest.mark.parametrize(
+    "mensagem, indice",
+    [
+        ("UNIQUE constraint failed: agendamentos.cliente_id", "uq_agendamentos_reserva_do_cliente"),
+        (
+            "UNIQUE constraint failed: agendamentos.funcionario_id, agendamentos.data, agendamentos.hora",
+            "uq_agendamentos_horario_agendado",
+        ),
+        (
+            'duplicate key value violates unique constraint "uq_agendamentos_horario_agendado"',
+            "uq_agendamentos_horario_agendado",
+        ),
+        ("UNIQUE constraint failed: clientes.cliente_id", None),
+        ("FOREIGN KEY constraint failed", None),
+    ],
+)
+def test_indice_unico_violado_pelo_nome_ou_pelas_colunas(mensagem, indice):
+    erro = IntegrityError("INSERT INTO agendamentos ...", {}, Exception(mensagem))
+    assert agendamento_service._indice_unico_violado(erro) == indice
+
+
+def test_criar_agendamento_repassa_integrity_error_de_outra_restricao(session, cadastro_basico, monkeypatch):
+    def _falhar(*args, **kwargs):
+        raise IntegrityError("INSERT INTO agendamentos ...", {}, Exception("FOREIGN KEY constraint failed"))
+
+    monkeypatch.setattr(agendamento_repository, "criar", _falhar)
+    with pytest.raises(IntegrityError, match="FOREIGN KEY"):
+        agendamento_service.criar_agendamento(
+            session,
+            cadastro_basico["cliente_id"],
+            cadastro_basico["funcionario_a_id"],
+            cadastro_basico["servico_id"],
+            date(2026, 8, 10),
+            "10:00",
+        )
+
+
+def test_reserva_vencida_e_liberada_e_status_desliga_reserva(session, cadastro_basico):
+    antigo = agendamento_service.criar_agendamento(
+        session,
+        cadastro_basico["cliente_id"],
+        cadastro_basico["funcionario_a_id"],
+        cadastro_basico["servico_id"],
+        date(2026, 8, 10),
+        "10:00",
+        hoje=date(2026, 8, 1),
+    )
+    assert antigo.reserva_do_cliente
+    # O dia passou sem ninguém concluir: não impede o próximo agendamento.
+    novo = agendamento_service.criar_agendamento(
+        session,
+        cadastro_basico["cliente_id"],
+        cadastro_basico["funcionario_a_id"],
+        cadastro_basico["servico_id"],
+        date(2026, 8, 20),
+        "10:00",
+        hoje=date(2026, 8, 11),
+    )
+    session.refresh(antigo)
+    assert not antigo.reserva_do_cliente and novo.reserva_do_cliente
+    agendamento_service.alterar_status(session, novo.id, "cancelado")
+    assert not agendamento_repository.obter_por_id(session, novo.id).reserva_do_cliente
+
+
+def test_agendamentos_simultaneos_nunca_ocupam_o_mesmo_horario(tmp_path):
+    engine = connection.criar_engine(f"sqlite:///{tmp_path / 'concorrencia.db'}")
+    connection.init_db(engine)
+    Sessao = sessionmaker(bind=engine, expire_on_commit=False)
+    with Sessao() as session:
+        clientes = [
+            cliente_repository.criar(session, f"Cliente {i}", f"1190000000{i}", f"c{i}@teste.com").id for i in range(4)
+        ]
+        funcionario_id = funcionario_repository.criar(session, "Funcionário", "Barbeiro").id
+        servico_id = servico_repository.criar(session, "Corte e barba", 60.0, 60).id
+
+    # 12 tentativas ao mesmo tempo: 4 clientes, horários que se sobrepõem pela duração (60 min).
+    tentativas = [(clientes[i % 4], ("10:00", "10:30", "11:00")[i % 3]) for i in range(12)]
+    largada = threading.Barrier(len(tentativas))
+    erros, criados = [], []
+
+    def agendar(cliente_id, hora):
+        with Sessao() as session:
+            largada.wait()
+            try:
+                criados.append(
+                    agendamento_service.criar_agendamento(
+                        session, cliente_id, funcionario_id, servico_id, date(2026, 8, 10), hora
+                    ).id
+                )
+            except Exception as erro:  # noqa: BLE001 - o teste confere o tipo de cada falha
+                erros.append(erro)
+
+    threads = [threading.Thread(target=agendar, args=tentativa) for tentativa in tentativas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert criados
+    assert all(
+        isinstance(erro, (ConflitoDeHorarioError, agendamento_service.AgendamentoDuplicadoError)) for erro in erros
+    ), erros
+    with Sessao() as session:
+        agendados = session.scalars(select(Agendamento).where(Agendamento.status == "agendado")).all()
+    assert sorted(a.id for a in agendados) == sorted(criados)
+    assert len({a.cliente_id for a in agendados}) == len(agendados)
+    ocupado = 0
+    for agendamento in agendados:
+        mascara = disponibilidade.mascara_do_atendimento(agendamento.hora, 60)
+        assert not ocupado & mascara
+        ocupado |= mascara
+    connection._engines_atualizados.discard(engine)
+    engine.dispose()
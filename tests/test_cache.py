@@ -0,0 +1,68 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from src.database.transacao import transacao
+from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
+from src.services import cache, faturamento_service, relatorio_service
+
+DIA = date(2026, 8, 10)
+
+
+def _cadastro(session):
+    cliente = cliente_repository.criar(session, "Cliente", "1199", "c@c.com")
+    funcionario = funcionario_repository.criar(session, "Func", "Barbeiro", 0.5)
+    servico = servico_repository.criar(session, "Corte", 40.0, 30)
+    return cliente.id, funcionario.id, servico.id
+
+
+def _contar_consultas(session):
+    consultas = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    return consultas
+
+
+def test_releitura_sem_escrita_nao_vai_ao_banco(session):
+    agendamento_repository.criar(session, *_cadastro(session), DIA, "09:00", status="concluido")
+    primeiro = relatorio_service.kpis(session, DIA, DIA)
+    consultas = _contar_consultas(session)
+
+    assert relatorio_service.kpis(session, DIA, DIA) == primeiro
+    assert faturamento_service.faturamento_total(session) == 40.0
+    assert faturamento_service.faturamento_total(session) == 40.0
+    assert len(consultas) == 1  # só a primeira leitura de faturamento_total
+    assert cache.estatisticas()["acertos"] == 2
+
+
+def test_escrita_de_repositorio_invalida_o_cache(session):
+    ids = _cadastro(session)
+    agendamento_repository.criar(session, *ids, DIA, "09:00", status="concluido")
+    assert faturamento_service.faturamento_total(session) == 40.0
+
+    agendamento = agendamento_repository.criar(session, *ids, DIA, "09:30", status="concluido")
+    assert faturamento_service.faturamento_total(session) == 80.0
+    agendamento_repository.excluir(session, agendamento.id)
+    assert faturamento_service.faturamento_total(session) == 40.0
+
+
+def test_dentro_da_transacao_le_direto_do_banco(session):
+    ids = _cadastro(session)
+    assert faturamento_service.faturamento_total(session) == 0.0
+    with transacao(session):
+        agendamento_repository.criar(session, *ids, DIA, "09:00", status="concluido")
+        assert faturamento_service.faturamento_total(session) == 40.0
+    assert faturamento_service.faturamento_total(session) == 40.0
+    assert cache.estatisticas()["acertos"] == 0
+
+
+def test_lru_respeita_o_limite_de_memoria():
+    lru = cache._CacheLRU(max_bytes=cache._tamanho_aproximado("x" * 100) * 2)
+    lru.guardar("a", "a" * 100)
+    lru.guardar("b", "b" * 100)
+    lru.obter("a")  # "a" passa a ser a mais recente
+    lru.guardar("c", "c" * 100)
+
+    assert lru.obter("b") == (False, None)
+    assert lru.obter("a") == (True, "a" * 100)
+    assert lru.estatisticas()["itens"] == 2
+    assert lru.estatisticas()["bytes"] <= lru.max_bytes
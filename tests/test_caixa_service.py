@@ -1,12 +1,14 @@
 from datetime import date, datetime
 
 import pytest
+from sqlalchemy import event
 
 from src.repositories import (
     adiantamento_repository,
     agendamento_repository,
     caixa_repository,
     cliente_repository,
+    dia_fechado_repository,
     funcionario_repository,
     servico_repository,
 )
@@ -109,3 +111,66 @@ def test_sem_pendencias_com_caixa_fechado(session):
 def test_sem_pendencia_antes_do_expediente(session):
     alertas = caixa_service.pendencias(session, agora=datetime(2026, 8, 10, 7, 0))
     assert alertas == []
+
+
+def test_situacao_do_caixa_em_uma_consulta(session):
+    caixa_service.abrir_caixa(session, date(2026, 8, 1), 0.0)  # fora da janela de 7 dias
+    caixa_service.abrir_caixa(session, date(2026, 8, 7), 0.0)
+    caixa_service.abrir_caixa(session, date(2026, 8, 8), 0.0)
+    caixa_service.fechar_caixa(session, date(2026, 8, 8))
+    caixa_service.abrir_caixa(session, date(2026, 8, 9), 0.0)
+    caixa_service.abrir_caixa(session, DIA, 0.0)
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+
+    situacao = caixa_service.situacao(session, DIA)
+
+    assert situacao == {
+        "dias_pendentes": [date(2026, 8, 7), date(2026, 8, 9)],
+        "status_hoje": caixa_service.STATUS_ABERTO,
+    }
+    assert len(comandos) == 1
+
+
+def test_status_de_hoje_na_situacao(session):
+    assert caixa_service.situacao(session, DIA)["status_hoje"] == caixa_service.STATUS_NAO_ABERTO
+    caixa_service.abrir_caixa(session, DIA, 0.0)
+    caixa_service.fechar_caixa(session, DIA)
+    assert caixa_service.situacao(session, DIA) == {
+        "dias_pendentes": [],
+        "status_hoje": caixa_service.STATUS_FECHADO,
+    }
+
+
+def test_abrir_e_fechar_mudam_a_versao_do_caixa(session):
+    antes = caixa_service.versao_do_caixa()
+    caixa_service.abrir_caixa(session, DIA, 0.0)
+    aberto = caixa_service.versao_do_caixa()
+    with pytest.raises(CaixaError):
+        caixa_service.abrir_caixa(session, DIA, 0.0)
+    assert caixa_service.versao_do_caixa() == aberto != antes
+    caixa_service.fechar_caixa(session, DIA)
+    assert caixa_service.versao_do_caixa() != aberto
+
+
+def test_fechar_caixa_congela_totais_e_correcao_marca_dia_sujo(session, atendimento_concluido):
+    funcionario_id = atendimento_concluido["funcionario_id"]
+    caixa_service.abrir_caixa(session, DIA, 0.0)
+    fechamento = caixa_service.fechar_caixa(session, DIA)
+
+    assert fechamento.totais_congelados
+    assert dia_fechado_repository.dias_sujos(session) == []
+    totais = dia_fechado_repository.totais_do_periodo(session, DIA, DIA)
+    assert totais == {(funcionario_id, "concluido"): {"quantidade": 1, "receita": 50.0, "comissao": 25.0}}
+
+    # Correção num dia já fechado: os totais congelados deixam de valer e o dia é somado das linhas.
+    agendamento_repository.atualizar_status(session, atendimento_concluido["agendamento_id"], "cancelado")
+    assert dia_fechado_repository.dias_sujos(session) == [DIA]
+    assert set(dia_fechado_repository.totais_do_periodo(session, DIA, DIA)) == {(funcionario_id, "cancelado")}
+
+    # O próximo fechamento recongela o dia corrigido.
+    amanha = date(2026, 8, 11)
+    caixa_service.abrir_caixa(session, amanha, 0.0)
+    caixa_service.fechar_caixa(session, amanha)
+    assert dia_fechado_repository.dias_sujos(session) == []
+    assert set(dia_fechado_repository.totais_do_periodo(session, DIA, amanha)) == {(funcionario_id, "cancelado")}
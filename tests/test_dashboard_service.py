@@ -1,5 +1,9 @@
+from datetime import date
+
 import pandas as pd
+from sqlalchemy import event
 
+from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
 from src.services import dashboard_service
 
 _COLUNAS = ["Funcionario", "Servico", "Preco", "Status"]
@@ -48,3 +52,97 @@ def test_calcular_metricas_so_cancelados_nao_divide_por_zero():
     assert m["ticket_medio"] == 0.0
     assert m["taxa_cancelamento"] == 1.0
     assert m["servico_mais_vendido"] is None
+
+
+def test_calcular_metricas_com_linhas_agrupadas():
+    df = pd.DataFrame(
+        [
+            {"Funcionario": "João", "Servico": "Corte", "Preco": 120.0, "Status": "concluido", "Quantidade": 3},
+            {"Funcionario": "Pedro", "Servico": "Barba", "Preco": 60.0, "Status": "concluido", "Quantidade": 2},
+            {"Funcionario": "Pedro", "Servico": "Barba", "Preco": 30.0, "Status": "cancelado", "Quantidade": 1},
+        ]
+    )
+    m = dashboard_service.calcular_metricas(df)
+
+    assert m["total_agendamentos"] == 6
+    assert m["receita"] == 180.0
+    assert m["ticket_medio"] == 36.0
+    assert m["taxa_cancelamento"] == 1 / 6
+    assert m["servico_mais_vendido"] == "Corte"
+
+
+def _popular(session):
+    cliente = cliente_repository.criar(session, "Cliente", "1199", "c@c.com")
+    joao = funcionario_repository.criar(session, "João", "Barbeiro", 0.5)
+    pedro = funcionario_repository.criar(session, "Pedro", "Barbeiro", 0.5)
+    corte = servico_repository.criar(session, "Corte", 40.0, 30)
+    barba = servico_repository.criar(session, "Barba", 30.0, 30)
+    dados = [
+        (joao, corte, date(2026, 8, 3), "09:00", "concluido"),
+        (joao, barba, date(2026, 8, 4), "09:00", "concluido"),
+        (pedro, barba, date(2026, 8, 4), "10:00", "cancelado"),
+        (pedro, corte, date(2026, 8, 10), "09:00", "concluido"),
+        (joao, corte, date(2026, 8, 10), "09:00", "nao_compareceu"),
+        (joao, corte, date(2026, 8, 11), "09:00", "concluido"),
+        (pedro, barba, date(2026, 8, 12), "11:00", "agendado"),
+    ]
+    for funcionario, servico, dia, hora, status in dados:
+        agendamento_repository.criar(session, cliente.id, funcionario.id, servico.id, dia, hora, status=status)
+    return joao.id
+
+
+def _metricas_cruas(session, inicio, fim, funcionario_id=None):
+    linhas = agendamento_repository.listar_detalhado(session, inicio, fim, funcionario_id)
+    return dashboard_service.calcular_metricas(
+        pd.DataFrame(
+            [
+                {"Funcionario": r.funcionario, "Servico": r.servico, "Preco": r.preco, "Status": r.status}
+                for r in linhas
+            ],
+            columns=_COLUNAS,
+        )
+    )
+
+
+def test_carregar_painel_equivale_ao_calculo_linha_a_linha_em_uma_consulta(session):
+    joao_id = _popular(session)
+    inicio, fim = date(2026, 8, 8), date(2026, 8, 14)
+    consultas = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    painel = dashboard_service.carregar_painel(session, inicio, fim)
+
+    assert len(consultas) == 1
+    assert painel["metricas"] == _metricas_cruas(session, inicio, fim)
+    assert painel["periodo_anterior"] == (date(2026, 8, 1), date(2026, 8, 7))
+    assert painel["metricas_anterior"] == _metricas_cruas(session, date(2026, 8, 1), date(2026, 8, 7))
+    assert painel["agregado"]["Quantidade"].sum() == 4
+
+    do_joao = dashboard_service.carregar_painel(session, inicio, fim, joao_id)
+    assert do_joao["metricas"] == _metricas_cruas(session, inicio, fim, joao_id)
+
+    historico = dashboard_service.carregar_painel(session, None, None)
+    assert historico["metricas_anterior"] is None
+    assert historico["metricas"] == _metricas_cruas(session, None, None)
+
+
+def test_pagina_da_agenda_percorre_o_periodo_por_cursor(session):
+    joao_id = _popular(session)
+    inicio, fim = date(2026, 8, 1), date(2026, 8, 31)
+    esperado = [r.id for r in agendamento_repository.listar_detalhado(session, inicio, fim)]
+
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        pagina, cursor = dashboard_service.pagina_da_agenda(session, inicio, fim, apos=cursor, tamanho=3)
+        assert len(pagina) <= 3
+        vistos += pagina["ID"].tolist()
+        paginas += 1
+        if cursor is None:
+            break
+    assert sorted(vistos) == sorted(esperado)
+    assert len(set(vistos)) == len(vistos)
+    assert paginas == 3
+
+    pagina, cursor = dashboard_service.pagina_da_agenda(session, inicio, fim, joao_id, tamanho=10)
+    assert cursor is None
+    assert set(pagina["Funcionario"]) == {"João"}
+    assert len(pagina) == 4
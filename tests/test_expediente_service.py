@@ -0,0 +1,167 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.database.transacao import transacao
+from src.repositories import cliente_repository, expediente_repository, funcionario_repository, servico_repository
+from src.services import agendamento_service, disponibilidade, expediente_service, relatorio_service
+from src.services.agendamento_service import ConflitoDeHorarioError
+
+SEGUNDA = date(2026, 8, 10)
+DOMINGO = date(2026, 8, 16)
+AGORA = datetime(2026, 8, 1, 9, 0)
+
+
+@pytest.fixture()
+def equipe(session):
+    cliente = cliente_repository.criar(session, "Cliente", "11999", "c@c.com")
+    ana = funcionario_repository.criar(session, "Ana", "Barbeira")
+    beto = funcionario_repository.criar(session, "Beto", "Barbeiro")
+    corte = servico_repository.criar(session, "Corte", 50.0, 30)
+    combo = servico_repository.criar(session, "Corte e barba", 80.0, 60)
+    # Ana: segunda das 09:00 às 17:00 com almoço das 12:00 às 13:00, folga no domingo.
+    expediente_service.definir_expediente(session, ana.id, 0, "09:00", "17:00", "12:00", "13:00")
+    expediente_service.definir_folga(session, ana.id, 6)
+    return {"cliente_id": cliente.id, "ana_id": ana.id, "beto_id": beto.id, "corte_id": corte.id, "combo_id": combo.id}
+
+
+def test_mascara_do_expediente_tira_o_intervalo_e_respeita_inicio_e_fim():
+    mascara = disponibilidade.mascara_do_expediente("09:00", "17:00", "12:00", "13:00")
+    horarios = disponibilidade.horarios(mascara)
+    assert horarios[0] == "09:00" and horarios[-1] == "16:30"
+    assert "12:00" not in horarios and "12:30" not in horarios and "11:30" in horarios and "13:00" in horarios
+    # Horários fora dos meios-slots: só entram os slots inteiros dentro do expediente.
+    assert disponibilidade.horarios(disponibilidade.mascara_do_expediente("09:15", "10:45")) == ["09:30", "10:00"]
+
+
+def test_horarios_disponiveis_seguem_o_expediente_de_cada_funcionario(session, equipe):
+    da_ana = agendamento_service.horarios_disponiveis(
+        session, equipe["ana_id"], SEGUNDA, agora=AGORA, servico_id=equipe["combo_id"]
+    )
+    # 60 min: não começa às 11:30 (invadiria o almoço) nem às 16:30 (passaria das 17:00).
+    assert da_ana[0] == "09:00" and da_ana[-1] == "16:00"
+    assert "11:30" not in da_ana and "11:00" in da_ana and "13:00" in da_ana
+    # Sem expediente cadastrado vale a grade da barbearia.
+    do_beto = agendamento_service.horarios_disponiveis(session, equipe["beto_id"], SEGUNDA, agora=AGORA)
+    assert do_beto == agendamento_service._gerar_grade_horarios()
+    assert agendamento_service.horarios_disponiveis(session, equipe["ana_id"], DOMINGO, agora=AGORA) == []
+    por_funcionario = agendamento_service.horarios_disponiveis_por_funcionario(
+        session, [equipe["ana_id"], equipe["beto_id"]], DOMINGO, agora=AGORA
+    )
+    assert por_funcionario[equipe["ana_id"]] == [] and por_funcionario[equipe["beto_id"]] == do_beto
+
+
+@pytest.mark.parametrize(
+    "dia, hora, servico, mensagem",
+    [
+        (DOMINGO, "10:00", "corte_id", "folga"),
+        (SEGUNDA, "08:00", "corte_id", "fora do expediente"),
+        (SEGUNDA, "11:30", "combo_id", "fora do expediente"),
+        (SEGUNDA, "12:10", "corte_id", "fora do expediente"),
+    ],
+)
+def test_criar_agendamento_fora_do_expediente(session, equipe, dia, hora, servico, mensagem):
+    with pytest.raises(ConflitoDeHorarioError, match=mensagem):
+        agendamento_service.criar_agendamento(
+            session, equipe["cliente_id"], equipe["ana_id"], equipe[servico], dia, hora, hoje=AGORA.date()
+        )
+
+
+def test_proximos_horarios_pulam_folga_e_intervalo(session, equipe):
+    proximos = agendamento_service.proximos_horarios(
+        session, equipe["corte_id"], DOMINGO, dias=2, funcionario_id=equipe["ana_id"], limite=8, agora=AGORA
+    )
+    assert {p["data"] for p in proximos} == {date(2026, 8, 17)}  # a segunda seguinte
+    assert proximos[0]["hora"] == "09:00" and "12:00" not in [p["hora"] for p in proximos]
+
+
+def test_grade_guardada_por_versao_sem_nova_consulta(session, equipe):
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+    primeira = expediente_service.grade(session, equipe["ana_id"], 0)
+    for dia_semana in range(7):
+        expediente_service.grade(session, equipe["ana_id"], dia_semana)
+    assert len(comandos) == 1  # a semana inteira sai de uma consulta
+
+    expediente_service.usar_horario_da_barbearia(session, equipe["ana_id"], 0)
+    assert primeira != disponibilidade.DIA_CHEIO
+    assert expediente_service.grade(session, equipe["ana_id"], 0) == disponibilidade.DIA_CHEIO
+
+
+def test_grade_continua_guardada_depois_de_escritas_que_nao_sao_de_expediente(session, equipe):
+    expediente_service.grade(session, equipe["ana_id"], 0)
+    agendamento_service.criar_agendamento(
+        session, equipe["cliente_id"], equipe["ana_id"], equipe["corte_id"], SEGUNDA, "09:00"
+    )
+    cliente_repository.criar(session, "Outro", "11888", "o@o.com")
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+    expediente_service.grade(session, equipe["ana_id"], 0)
+    assert comandos == []
+
+
+def test_grade_enxerga_expediente_gravado_por_outra_sessao(session, equipe):
+    assert expediente_service.grade(session, equipe["beto_id"], 2) == disponibilidade.DIA_CHEIO
+    # Outra sessão (outra aba do app) grava direto pelo repositório: a versão dos dados muda.
+    with Session(session.get_bind()) as outra:
+        expediente_repository.definir(outra, equipe["beto_id"], 2, True)
+    session.commit()  # fecha o retrato que a sessão tinha do banco
+    assert expediente_service.grade(session, equipe["beto_id"], 2) == 0
+
+
+def test_grade_dentro_de_transacao_le_do_banco(session, equipe):
+    expediente_service.grade(session, equipe["ana_id"], 0)
+    with pytest.raises(RuntimeError):
+        with transacao(session):
+            expediente_repository.definir(session, equipe["ana_id"], 0, True)
+            assert expediente_service.grade(session, equipe["ana_id"], 0) == 0
+            raise RuntimeError("desfaz")
+    assert expediente_service.grade(session, equipe["ana_id"], 0) != 0
+
+
+def test_semana_do_funcionario_mostra_cadastrados_e_padrao(session, equipe):
+    semana = expediente_service.semana_do_funcionario(session, equipe["ana_id"])
+    assert [d["padrao"] for d in semana] == [False, True, True, True, True, True, False]
+    assert semana[0]["intervalo_inicio"] == "12:00" and semana[6]["folga"]
+    # Gravar de novo o mesmo dia substitui a linha.
+    expediente_service.definir_expediente(session, equipe["ana_id"], 0, "10:00", "18:00")
+    assert len(expediente_repository.listar(session, [equipe["ana_id"]])) == 2
+    assert expediente_service.semana_do_funcionario(session, equipe["ana_id"])[0]["intervalo_inicio"] is None
+
+
+@pytest.mark.parametrize(
+    "inicio, fim, intervalo_inicio, intervalo_fim",
+    [
+        ("07:00", "12:00", None, None),
+        ("12:00", "09:00", None, None),
+        ("09:00", "20:00", None, None),
+        ("09:00", "17:00", "12:00", None),
+        ("09:00", "17:00", "08:00", "09:30"),
+    ],
+)
+def test_expediente_invalido(session, equipe, inicio, fim, intervalo_inicio, intervalo_fim):
+    with pytest.raises(ValueError):
+        expediente_service.definir_expediente(
+            session, equipe["beto_id"], 2, inicio, fim, intervalo_inicio, intervalo_fim
+        )
+
+
+def test_capacidade_pelos_expedientes(session, equipe):
+    grade = len(disponibilidade.GRADE)
+    # Uma semana (segunda a domingo): Ana 14 slots na segunda, folga no domingo, grade cheia no resto.
+    capacidade = expediente_service.capacidade(session, SEGUNDA, DOMINGO, [equipe["ana_id"], equipe["beto_id"]])
+    assert capacidade == (14 + 5 * grade) + 7 * grade
+    assert expediente_service.capacidade(session, SEGUNDA, DOMINGO, []) == 7 * grade
+
+    agendamento_service.criar_agendamento(
+        session, equipe["cliente_id"], equipe["ana_id"], equipe["corte_id"], SEGUNDA, "09:00", hoje=AGORA.date()
+    )
+    indicadores = relatorio_service.kpis(session, SEGUNDA, DOMINGO)
+    assert indicadores["taxa_ocupacao"] == round(1 / capacidade * 100, 1)
+
+
+def test_excluir_funcionario_leva_os_expedientes(session, equipe):
+    funcionario_repository.excluir(session, equipe["ana_id"])
+    assert expediente_repository.listar(session) == []
@@ -0,0 +1,94 @@
+import csv
+import io
+import re
+import tracemalloc
+import zipfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
+from src.services import exportacao, faturamento_service
+
+COLUNAS = [
+    ("funcionario", "Funcionário", None),
+    ("data", "Data", "data"),
+    ("percentual", "% Comissão", "percentual"),
+    ("preco", "Preço", "moeda"),
+]
+
+
+def _lote(n: int, inicio: int = 0) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "funcionario": [f"Func {i % 7}" for i in range(inicio, inicio + n)],
+            "data": pd.Timestamp("2026-08-01") + pd.to_timedelta(np.arange(n) % 30, unit="D"),
+            "percentual": np.full(n, 0.4),
+            "preco": np.arange(inicio, inicio + n, dtype=float) + 0.5,
+        }
+    )
+
+
+def test_gerar_csv_formata_cada_lote():
+    pedacos = list(exportacao.gerar_csv([_lote(2), _lote(0), _lote(1, inicio=1000)], COLUNAS))
+
+    assert len(pedacos) == 3  # cabeçalho + dois lotes (o vazio não gera pedaço)
+    texto = b"".join(pedacos).decode("utf-8-sig")
+    linhas = list(csv.reader(io.StringIO(texto)))
+    assert linhas[0] == ["Funcionário", "Data", "% Comissão", "Preço"]
+    assert linhas[1] == ["Func 0", "01/08/2026", "40,0%", "R$ 0,50"]
+    assert linhas[3] == ["Func 6", "01/08/2026", "40,0%", "R$ 1.000,50"]
+
+
+def test_gerar_excel_escreve_celulas_numericas_com_formato():
+    conteudo = exportacao.gerar_excel(exportacao.em_lotes(_lote(5), tamanho=2), COLUNAS, "Repasse")
+
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as xlsx:
+        planilha = xlsx.read("xl/worksheets/sheet1.xml").decode()
+        estilos = xlsx.read("xl/styles.xml").decode()
+        pasta = xlsx.read("xl/workbook.xml").decode()
+    assert 'name="Repasse"' in pasta
+    assert len(re.findall(r"<row ", planilha)) == 6  # cabeçalho + 5
+    assert "<v>4.5</v>" in planilha  # preço gravado como número, não como texto
+    assert 'formatCode="&quot;R$&quot; #,##0.00"' in estilos
+    assert 'formatCode="0.0%"' in estilos
+
+
+def _pico_exportacao(total: int) -> int:
+    lotes = (_lote(1_000, inicio) for inicio in range(0, total, 1_000))
+    tracemalloc.start()
+    try:
+        for _ in exportacao.gerar_csv(lotes, COLUNAS):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_memoria_do_csv_nao_cresce_com_o_periodo():
+    pequeno = _pico_exportacao(5_000)
+    grande = _pico_exportacao(40_000)
+    assert grande < pequeno * 1.5
+
+
+def test_lotes_de_repasse_le_o_periodo_em_partes(session):
+    cliente = cliente_repository.criar(session, "Cliente", "1199", "c@c.com")
+    funcionario = funcionario_repository.criar(session, "Func", "Barbeiro", 0.4)
+    servico = servico_repository.criar(session, "Corte", 50.0, 30)
+    for hora in ("09:00", "09:30", "10:00"):
+        agendamento_repository.criar(
+            session, cliente.id, funcionario.id, servico.id, date(2026, 8, 10), hora, status="concluido"
+        )
+
+    lotes = list(
+        faturamento_service.lotes_de_repasse(
+            session, date(2026, 8, 1), date(2026, 8, 31), percentuais={funcionario.id: 0.4}, lote=2
+        )
+    )
+
+    assert [len(lote) for lote in lotes] == [2, 1]
+    assert sum(lote["repasse_funcionario"].sum() for lote in lotes) == 60.0
+    conteudo = exportacao.gerar_excel(iter(lotes), [("repasse_loja", "Repasse Loja", "moeda")])
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as xlsx:
+        assert xlsx.read("xl/worksheets/sheet1.xml").decode().count("<v>30</v>") == 3
@@ -0,0 +1,66 @@
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
+from src.services import exportacao_parquet
+
+
+@pytest.fixture()
+def cadastro(session):
+    cliente = cliente_repository.criar(session, "Cliente", "1199", "c@c.com")
+    funcionario = funcionario_repository.criar(session, "Func", "Barbeiro", 0.4)
+    servico = servico_repository.criar(session, "Corte", 50.0, 30)
+    ids = [
+        agendamento_repository.criar(session, cliente.id, funcionario.id, servico.id, dia, hora, status="concluido").id
+        for dia, hora in ((date(2026, 7, 30), "09:00"), (date(2026, 8, 10), "09:00"), (date(2026, 8, 10), "09:30"))
+    ]
+    return cliente, funcionario, servico, ids
+
+
+def _exportar(session, destino, **opcoes):
+    resultado = exportacao_parquet.exportar_agendamentos(session, destino, lote=1, **opcoes)
+    return resultado["escritos"], resultado["removidos"], resultado["inalterados"]
+
+
+def test_exporta_um_arquivo_por_mes_com_textos_dicionarizados(session, cadastro, tmp_path):
+    assert _exportar(session, tmp_path) == ([(2026, 7), (2026, 8)], [], 0)
+
+    agosto = pq.read_table(exportacao_parquet.caminho_da_particao(tmp_path, 2026, 8))
+    assert agosto.schema == exportacao_parquet.ESQUEMA
+    assert pa.types.is_dictionary(agosto.schema.field("funcionario").type)
+    assert agosto.column("hora").to_pylist() == ["09:00", "09:30"]
+    assert agosto.column("comissao").to_pylist() == [20.0, 20.0]
+
+    conjunto = pq.read_table(tmp_path)  # partições ano=/mes= viram colunas
+    assert conjunto.num_rows == 3
+    assert sorted(set(conjunto.column("mes").to_pylist())) == [7, 8]
+
+
+def test_reexportacao_reescreve_so_os_meses_alterados(session, cadastro, tmp_path):
+    cliente, funcionario, servico, ids = cadastro
+    _exportar(session, tmp_path)
+    assert _exportar(session, tmp_path) == ([], [], 2)
+
+    agendamento_repository.atualizar_status_em_lote(session, [ids[1]], "cancelado")
+    assert _exportar(session, tmp_path) == ([(2026, 8)], [], 1)
+    agosto = pq.read_table(exportacao_parquet.caminho_da_particao(tmp_path, 2026, 8))
+    assert agosto.column("status").to_pylist() == ["cancelado", "concluido"]
+
+    agendamento_repository.criar(session, cliente.id, funcionario.id, servico.id, date(2026, 9, 1), "10:00")
+    agendamento_repository.excluir(session, ids[0])
+    assert _exportar(session, tmp_path) == ([(2026, 9)], [(2026, 7)], 1)
+    assert not (tmp_path / "ano=2026" / "mes=07").exists()
+
+
+def test_renomear_dimensao_reescreve_todos_os_meses(session, cadastro, tmp_path):
+    _, funcionario, _, _ = cadastro
+    _exportar(session, tmp_path)
+
+    funcionario_repository.atualizar(session, funcionario.id, "Func Novo", "Barbeiro", 0.4)
+
+    assert _exportar(session, tmp_path) == ([(2026, 7), (2026, 8)], [], 0)
+    julho = pq.read_table(exportacao_parquet.caminho_da_particao(tmp_path, 2026, 7))
+    assert julho.column("funcionario").to_pylist() == ["Func Novo"]
@@ -1,6 +1,9 @@
-from datetime import date
+import random
+from datetime import date, timedelta
 from types import SimpleNamespace
 
+import pytest
+
 from src.repositories import (
     adiantamento_repository,
     agendamento_repository,
@@ -8,7 +11,7 @@ from src.repositories import (
     funcionario_repository,
     servico_repository,
 )
-from src.services import faturamento_service
+from src.services import caixa_service, faturamento_service
 
 
 def test_calcular_repasse_divide_50_50_por_padrao():
@@ -38,6 +41,97 @@ def test_calcular_repasse_usa_percentual_do_funcionario():
     assert resultado[1]["repasse_funcionario"] == 50.0
 
 
+def _linhas_aleatorias(quantidade: int, semente: int = 7) -> list[tuple]:
+    """Tuplas no formato de faturamento_por_periodo, com e sem % gravada."""
+    sorteio = random.Random(semente)
+    return [
+        (
+            f := sorteio.randint(1, 5),
+            f"Func {f}",
+            sorteio.choice(["Corte", "Barba", "Sobrancelha"]),
+            round(sorteio.uniform(10, 200), 2),
+            sorteio.choice([None, 0.4, 0.45, 0.5, 0.55, 0.6, 0.65]),
+            date(2026, 1, 1) + timedelta(days=sorteio.randint(0, 200)),
+        )
+        for _ in range(quantidade)
+    ]
+
+
+def test_repasse_vetorizado_equivale_ao_calculo_por_linha():
+    linhas = _linhas_aleatorias(2000)
+    percentuais = {1: 0.6, 2: 0.45}
+    df = faturamento_service.calcular_repasse_vetorizado(faturamento_service.quadro_do_periodo(linhas), percentuais)
+
+    assert len(df) == len(linhas)
+    # A NumPy arredonda escalando por 100: no meio centavo pode cair no vizinho do round() do Python.
+    centavo = 0.01 + 1e-9
+    for linha, calculado in zip(linhas, df.itertuples(index=False)):
+        funcionario_id, _, _, preco, gravado, _ = linha
+        percentual = gravado if gravado is not None else percentuais.get(funcionario_id, 0.5)
+        assert calculado.percentual == percentual
+        assert calculado.repasse_funcionario == pytest.approx(round(preco * percentual, 2), abs=centavo)
+        assert calculado.repasse_loja == pytest.approx(round(preco * (1 - percentual), 2), abs=centavo)
+
+
+def test_pagamentos_somam_dias_fechados_e_abertos_como_o_acumulo_por_linha(session):
+    cliente = cliente_repository.criar(session, "Cliente", "119999", "c@c.com")
+    funcionarios = [funcionario_repository.criar(session, f"Func {i}", "Barbeiro", 0.4 + 0.1 * i) for i in range(3)]
+    servico = servico_repository.criar(session, "Corte", 40.0, 30)
+    sorteio = random.Random(11)
+    linhas = []
+    for dia in (date(2026, 8, 3) + timedelta(days=d) for d in range(6)):
+        for h in range(8):
+            funcionario = sorteio.choice(funcionarios)
+            status = sorteio.choice(["concluido", "concluido", "cancelado"])
+            agendamento = agendamento_repository.criar(
+                session, cliente.id, funcionario.id, servico.id, dia, f"{8 + h:02d}:00", status=status
+            )
+            linhas.append(agendamento)
+    # Três dias fechados (congelados); os outros três ficam para a consulta das linhas.
+    for dia in (date(2026, 8, 3), date(2026, 8, 4), date(2026, 8, 6)):
+        caixa_service.abrir_caixa(session, dia, 0.0)
+        caixa_service.fechar_caixa(session, dia)
+    # Correção depois do fechamento: o dia volta a ser somado das linhas até o próximo fechamento.
+    agendamento_repository.atualizar_status(session, linhas[0].id, "cancelado")
+
+    esperado: dict[int, dict] = {}
+    for agendamento in linhas:
+        if agendamento.status != "concluido":
+            continue
+        item = esperado.setdefault(
+            agendamento.funcionario_id, {"atendimentos": 0, "receita_bruta": 0.0, "comissao": 0.0}
+        )
+        item["atendimentos"] += 1
+        item["receita_bruta"] += agendamento.preco_cobrado
+        item["comissao"] += agendamento.preco_cobrado * agendamento.percentual_comissao
+
+    calculado = {
+        r["funcionario_id"]: r
+        for r in faturamento_service.relatorio_pagamentos(session, date(2026, 8, 1), date(2026, 8, 31))
+    }
+
+    assert set(calculado) == set(esperado)
+    for funcionario_id, item in esperado.items():
+        assert calculado[funcionario_id]["atendimentos"] == item["atendimentos"]
+        assert calculado[funcionario_id]["receita_bruta"] == pytest.approx(item["receita_bruta"], abs=0.005)
+        assert calculado[funcionario_id]["comissao"] == pytest.approx(item["comissao"], abs=0.005)
+
+
+def test_quadro_de_faturamento_devolve_uma_copia_a_cada_chamada(session):
+    cliente = cliente_repository.criar(session, "Cliente", "119999", "c@c.com")
+    funcionario = funcionario_repository.criar(session, "Func", "Barbeiro")
+    servico = servico_repository.criar(session, "Corte", 40.0, 30)
+    agendamento_repository.criar(
+        session, cliente.id, funcionario.id, servico.id, date(2026, 8, 3), "09:00", status="concluido"
+    )
+    quadro = faturamento_service.quadro_de_faturamento(session, date(2026, 8, 1), date(2026, 8, 31))
+    quadro["preco_servico"] = 0.0
+    quadro.drop(quadro.index, inplace=True)
+
+    novo = faturamento_service.quadro_de_faturamento(session, date(2026, 8, 1), date(2026, 8, 31))
+    assert novo["preco_servico"].tolist() == [40.0]
+
+
 def test_faturamento_total_soma_apenas_concluidos(session):
     cliente = cliente_repository.criar(session, "Cliente", "119999", "c@c.com")
     funcionario = funcionario_repository.criar(session, "Func", "Barbeiro")
@@ -153,3 +247,39 @@ def test_faturamento_total_ignora_cancelados_e_no_show(session):
     agendamento_repository.atualizar_status(session, falta.id, "nao_compareceu")
 
     assert faturamento_service.faturamento_total(session) == 40.0
+
+
+def test_faturamento_por_mes_e_ano_em_ordem_cronologica(session):
+    cliente = cliente_repository.criar(session, "Cliente", "119999", "c@c.com")
+    funcionario = funcionario_repository.criar(session, "Func", "Barbeiro")
+    servico = servico_repository.criar(session, "Corte", 40.0, 30)
+    for dia in (date(2025, 12, 5), date(2026, 1, 7), date(2026, 1, 8), date(2026, 11, 3)):
+        agendamento_repository.criar(
+            session, cliente.id, funcionario.id, servico.id, dia, "09:00", status="concluido"
+        )
+
+    por_mes = [(r.ano, r.mes, r.faturamento) for r in faturamento_service.faturamento_por_mes(session)]
+    por_ano = [(r.ano, r.faturamento) for r in faturamento_service.faturamento_por_ano(session)]
+
+    # Com "%m-%Y" a ordenação textual colocava 12-2025 antes de 11-2026.
+    assert por_mes == [(2026, 11, 40.0), (2026, 1, 80.0), (2025, 12, 40.0)]
+    assert por_ano == [(2026, 120.0), (2025, 40.0)]
+
+
+def test_editar_cadastro_nao_reescreve_receita_historica(session):
+    cliente = cliente_repository.criar(session, "Cliente", "1199", "c@c.com")
+    funcionario = funcionario_repository.criar(session, "Func", "Barbeiro", 0.6)
+    servico = servico_repository.criar(session, "Corte", 40.0, 30)
+    agendamento_repository.criar(
+        session, cliente.id, funcionario.id, servico.id, date(2026, 8, 10), "09:00", status="concluido"
+    )
+
+    servico_repository.atualizar(session, servico.id, "Corte", 55.0, 30)
+    funcionario_repository.atualizar(session, funcionario.id, "Func", "Barbeiro", percentual_comissao=0.4)
+    agendamento_repository.criar(
+        session, cliente.id, funcionario.id, servico.id, date(2026, 8, 11), "09:00", status="concluido"
+    )
+
+    assert faturamento_service.faturamento_total(session) == 95.0
+    relatorio = faturamento_service.relatorio_pagamentos(session, date(2026, 8, 1), date(2026, 8, 31))
+    assert relatorio[0]["comissao"] == round(40.0 * 0.6 + 55.0 * 0.4, 2)
@@ -1,6 +1,7 @@
 from datetime import date
 
 import pytest
+from sqlalchemy import event
 
 from src.repositories import (
     adiantamento_repository,
@@ -116,3 +117,30 @@ def test_historico_de_pagamentos(session, base):
     assert len(historico) == 1
     assert historico[0].funcionario == "João"
     assert historico[0].valor_pago == 120.0
+
+
+def test_registrar_pagamento_faz_um_unico_commit(session, base):
+    adiantamento_repository.criar(session, base["funcionario_id"], date(2026, 8, 11), 40.0)
+    commits = []
+    event.listen(session, "after_commit", lambda s: commits.append(1))
+    pagamento_service.registrar_pagamento(
+        session, base["funcionario_id"], INICIO, FIM, data_pagamento=date(2026, 8, 31), lancar_no_caixa=True
+    )
+    assert commits == [1]
+
+
+def test_registrar_pagamento_e_atomico(session, base, monkeypatch):
+    vale = adiantamento_repository.criar(session, base["funcionario_id"], date(2026, 8, 11), 40.0)
+
+    def _falhar(*args, **kwargs):
+        raise RuntimeError("queda no meio do acerto")
+
+    monkeypatch.setattr(caixa_repository, "criar_movimento", _falhar)
+    with pytest.raises(RuntimeError):
+        pagamento_service.registrar_pagamento(
+            session, base["funcionario_id"], INICIO, FIM, data_pagamento=date(2026, 8, 31), lancar_no_caixa=True
+        )
+    # Nem o pagamento nem a baixa do vale sobrevivem à falha do último passo.
+    session.refresh(vale)
+    assert vale.pagamento_id is None
+    assert pagamento_repository.listar_por_periodo(session, INICIO, FIM) == []
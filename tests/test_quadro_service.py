@@ -0,0 +1,90 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+
+from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
+from src.services import disponibilidade, expediente_service, quadro_service
+from src.services.quadro_service import AGENDADO, CONCLUIDO, FORA_DO_EXPEDIENTE, LIVRE, NAO_COMPARECEU
+
+SEGUNDA = date(2026, 8, 10)
+
+
+def _slot(hora):
+    return disponibilidade.GRADE.index(hora)
+
+
+@pytest.fixture()
+def equipe(session):
+    cliente = cliente_repository.criar(session, "Cliente", "11999", "c@c.com")
+    # listar() ordena por nome: Ana é a linha 0 da matriz, Beto a 1.
+    beto = funcionario_repository.criar(session, "Beto", "Barbeiro")
+    ana = funcionario_repository.criar(session, "Ana", "Barbeira")
+    corte = servico_repository.criar(session, "Corte", 50.0, 30)
+    combo = servico_repository.criar(session, "Corte e barba", 80.0, 60)
+    return {"cliente_id": cliente.id, "ana_id": ana.id, "beto_id": beto.id, "corte_id": corte.id, "combo_id": combo.id}
+
+
+def _agendar(session, equipe, funcionario, servico, dia, hora, status="agendado"):
+    agendamento_repository.criar(
+        session, equipe["cliente_id"], equipe[funcionario], equipe[servico], dia, hora, status=status
+    )
+
+
+def test_quadro_marca_status_duracao_e_expediente(session, equipe):
+    _agendar(session, equipe, "ana_id", "combo_id", SEGUNDA, "09:00")
+    _agendar(session, equipe, "ana_id", "corte_id", SEGUNDA, "10:00", status="concluido")
+    _agendar(session, equipe, "beto_id", "corte_id", date(2026, 8, 12), "18:30", status="nao_compareceu")
+    # Cancelado libera o horário; fora do intervalo pedido não aparece.
+    _agendar(session, equipe, "beto_id", "corte_id", SEGUNDA, "09:00", status="cancelado")
+    _agendar(session, equipe, "ana_id", "corte_id", date(2026, 8, 17), "09:00")
+    expediente_service.definir_folga(session, equipe["beto_id"], 6)
+    expediente_service.definir_expediente(session, equipe["ana_id"], 1, "09:00", "17:00", "12:00", "13:00")
+
+    quadro = quadro_service.quadro_da_semana(session, SEGUNDA)
+
+    assert [nome for _, nome in quadro.funcionarios] == ["Ana", "Beto"]
+    assert quadro.dias[0] == SEGUNDA and len(quadro.dias) == 7
+    assert quadro.matriz.shape == (2, 7, len(disponibilidade.GRADE)) and quadro.matriz.dtype == np.uint8
+    ana, beto = quadro.matriz
+    # 60 min às 09:00 ocupa 09:00 e 09:30.
+    assert ana[0, _slot("09:00")] == ana[0, _slot("09:30")] == AGENDADO
+    assert ana[0, _slot("10:00")] == CONCLUIDO and ana[0, _slot("10:30")] == LIVRE
+    assert beto[2, _slot("18:30")] == NAO_COMPARECEU
+    assert beto[0, _slot("09:00")] == LIVRE
+    assert (beto[6] == FORA_DO_EXPEDIENTE).all()
+    assert ana[1, _slot("08:30")] == ana[1, _slot("12:30")] == ana[1, _slot("17:00")] == FORA_DO_EXPEDIENTE
+    assert ana[1, _slot("09:00")] == LIVRE
+    assert quadro_service.resumo(quadro)["Agendado"] == 2
+
+
+def test_quadro_com_encaixe_fora_da_grade_e_sobreposicao(session, equipe):
+    # Encaixe concluído às 12:10 (30 min) cobre 12:00 e 12:30; sobrepõe um agendado das 12:30.
+    _agendar(session, equipe, "ana_id", "corte_id", SEGUNDA, "12:30")
+    _agendar(session, equipe, "ana_id", "corte_id", SEGUNDA, "12:10", status="concluido")
+    ana = quadro_service.quadro_da_semana(session, SEGUNDA, dias=1).matriz[0, 0]
+    assert ana[_slot("12:00")] == ana[_slot("12:30")] == CONCLUIDO
+    assert ana[_slot("13:00")] == LIVRE
+
+
+def test_quadro_sai_de_uma_consulta_de_agendamentos(session, equipe):
+    _agendar(session, equipe, "ana_id", "corte_id", SEGUNDA, "09:00")
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+    quadro_service.quadro_da_semana(session, SEGUNDA)
+    # Funcionários, expedientes (uma vez por versão) e os agendamentos da semana.
+    assert len(comandos) == 3
+    assert sum("FROM agendamentos" in comando for comando in comandos) == 1
+
+
+def test_quadro_sem_funcionarios(session):
+    quadro = quadro_service.quadro_da_semana(session, SEGUNDA)
+    assert quadro.funcionarios == () and quadro.matriz.shape == (0, 7, len(disponibilidade.GRADE))
+
+
+def test_quadro_guardado_no_cache_e_somente_leitura(session, equipe):
+    quadro = quadro_service.quadro_da_semana(session, SEGUNDA)
+    with pytest.raises(ValueError):
+        quadro.matriz[0, 0, 0] = CONCLUIDO
+    assert quadro_service.quadro_da_semana(session, SEGUNDA).matriz[0, 0, 0] == LIVRE
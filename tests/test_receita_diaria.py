@@ -0,0 +1,90 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.database import connection
+from src.database.transacao import transacao
+from src.repositories import (
+    agendamento_repository,
+    cliente_repository,
+    funcionario_repository,
+    receita_diaria_repository,
+    servico_repository,
+)
+from src.services import agendamento_service, faturamento_service, relatorio_service
+
+DIA = date(2026, 8, 10)
+
+
+@pytest.fixture()
+def cadastro(session):
+    cliente = cliente_repository.criar(session, "Cliente", "1199", "c@c.com")
+    funcionario = funcionario_repository.criar(session, "Func", "Barbeiro", 0.6)
+    servico = servico_repository.criar(session, "Corte", 40.0, 30)
+    return cliente.id, funcionario.id, servico.id
+
+
+def test_rollup_acompanha_todas_as_escritas(session, cadastro):
+    ids = [agendamento_repository.criar(session, *cadastro, DIA, hora).id for hora in ("09:00", "09:30", "10:00")]
+    agendamento_service.alterar_status(session, ids[0], "concluido", agora=datetime(2026, 8, 10, 12, 0))
+    agendamento_service.alterar_status_em_lote(
+        session, ids[1:], "concluido", agora=datetime(2026, 8, 10, 12, 0), forma_pagamento="pix"
+    )
+    agendamento_repository.atualizar(session, ids[1], date(2026, 8, 11), "09:30", "cancelado")
+    agendamento_service.alterar_status(session, ids[2], "agendado")
+    agendamento_repository.excluir(session, ids[2])
+
+    assert receita_diaria_repository.verificar(session) == []
+    assert faturamento_service.faturamento_total(session) == 40.0
+    indicadores = relatorio_service.kpis(session, DIA, date(2026, 8, 11))
+    assert indicadores["atendimentos_concluidos"] == 1
+    assert indicadores["total_agendamentos"] == 2
+    assert indicadores["comissoes"] == 24.0
+
+
+def test_verificar_aponta_divergencia_e_reconstruir_corrige(session, cadastro):
+    agendamento_repository.criar(session, *cadastro, DIA, "09:00", status="concluido")
+    session.execute(text("UPDATE receita_diaria SET receita = receita + 10"))
+
+    divergencias = receita_diaria_repository.verificar(session)
+    assert len(divergencias) == 1
+    assert divergencias[0]["esperado"]["receita"] == 40.0
+    assert divergencias[0]["atual"]["receita"] == 50.0
+
+    receita_diaria_repository.reconstruir(session)
+    assert receita_diaria_repository.verificar(session) == []
+
+
+def test_rollback_desfaz_agendamento_e_rollup_juntos(session, cadastro):
+    with pytest.raises(RuntimeError):
+        with transacao(session):
+            agendamento_repository.criar(session, *cadastro, DIA, "09:00", status="concluido")
+            raise RuntimeError("falha depois da escrita")
+    assert faturamento_service.faturamento_total(session) == 0.0
+    assert receita_diaria_repository.verificar(session) == []
+
+
+def test_migracao_popula_rollup_de_banco_existente(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text("CREATE TABLE servicos (id INTEGER PRIMARY KEY, nome TEXT, preco FLOAT, duracao INTEGER)")
+            )
+            conn.execute(
+                text(
+                    "CREATE TABLE agendamentos (id INTEGER PRIMARY KEY, cliente_id INTEGER, funcionario_id INTEGER, "
+                    "servico_id INTEGER, data TEXT, hora TEXT, status TEXT)"
+                )
+            )
+            conn.execute(text("INSERT INTO servicos VALUES (1, 'Corte', 30.0, 30)"))
+            conn.execute(
+                text("INSERT INTO agendamentos VALUES (1, 1, 1, 1, '2026-08-10', '09:00', 'concluido')")
+            )
+        connection.init_db(engine)
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT quantidade, receita FROM receita_diaria")).one() == (1, 30.0)
+    finally:
+        connection._engines_atualizados.discard(engine)
+        engine.dispose()
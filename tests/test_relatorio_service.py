@@ -1,12 +1,29 @@
-from datetime import date
+import random
+from collections import namedtuple
+from datetime import date, timedelta
 
 import pytest
+from sqlalchemy import event, update
 
-from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
-from src.services import relatorio_service
+from src.database.models import Agendamento
+from src.repositories import (
+    agendamento_repository,
+    cliente_repository,
+    funcionario_repository,
+    receita_diaria_repository,
+    servico_repository,
+)
+from src.services import (
+    caixa_service,
+    faturamento_service,
+    pagamento_service,
+    relatorio_service,
+)
 
 INICIO = date(2026, 8, 1)
 FIM = date(2026, 8, 31)
+# Mesmo formato das linhas de agendamento_repository.listar_para_relatorio.
+LinhaRelatorio = namedtuple("LinhaRelatorio", relatorio_service.COLUNAS_RELATORIO)
 
 
 @pytest.fixture()
@@ -56,6 +73,49 @@ def test_comparativo_com_periodo_anterior(session, cenario):
     assert (FIM - INICIO) == (fim_anterior - inicio_anterior)
 
 
+def test_comparativo_com_dia_fechado_igual_aos_kpis(session, cenario):
+    caixa_service.abrir_caixa(session, date(2026, 8, 10), 0.0)
+    caixa_service.fechar_caixa(session, date(2026, 8, 10))
+
+    dados = relatorio_service.comparativo(session, INICIO, FIM)
+
+    assert dados["atual"] == relatorio_service.kpis(session, INICIO, FIM)
+    assert dados["atual"]["receita_bruta"] == 250.0
+    assert dados["atual"]["taxa_cancelamento"] == 20.0
+
+
+def test_comparativo_usa_os_totais_congelados_dos_dias_fechados(session, cenario):
+    caixa_service.abrir_caixa(session, date(2026, 8, 10), 0.0)
+    caixa_service.fechar_caixa(session, date(2026, 8, 10))
+    # Linhas do dia fechado alteradas por fora (sem passar pelo rollup nem marcar o dia como sujo).
+    session.execute(update(Agendamento).where(Agendamento.data == date(2026, 8, 10)).values(preco_cobrado=999.0))
+    session.commit()
+
+    # 10/08 fica na janela atual de agosto e na anterior de setembro: nas duas, vale o congelado.
+    agosto = relatorio_service.comparativo(session, INICIO, FIM)
+    setembro = relatorio_service.comparativo(session, date(2026, 9, 1), date(2026, 9, 30))
+
+    assert agosto["atual"]["receita_bruta"] == 250.0
+    assert setembro["anterior"]["receita_bruta"] == 250.0
+    assert setembro["anterior"]["comissoes"] == 150.0
+    assert agosto["atual"] == relatorio_service.kpis(session, INICIO, FIM)
+
+
+def test_comissao_sem_percentual_gravado_segue_a_mesma_regra_em_todos_os_totais(session, cenario):
+    # Linhas sem % gravada (histórico importado) usam a % atual do funcionário em todo lugar.
+    session.execute(update(Agendamento).values(percentual_comissao=None))
+    funcionario_repository.atualizar(session, cenario["joao_id"], "João", "Barbeiro", percentual_comissao=0.4)
+    receita_diaria_repository.reconstruir(session)
+    caixa_service.abrir_caixa(session, date(2026, 8, 10), 0.0)
+    caixa_service.fechar_caixa(session, date(2026, 8, 10))
+
+    assert relatorio_service.kpis(session, INICIO, FIM)["comissoes"] == 100.0  # 40% de 250
+    assert relatorio_service.comparativo(session, INICIO, FIM)["atual"]["comissoes"] == 100.0
+    (linha,) = faturamento_service.relatorio_pagamentos(session, INICIO, FIM)
+    assert linha["comissao"] == 100.0
+    assert pagamento_service.comissao_do_periodo(session, cenario["joao_id"], INICIO, FIM) == 100.0
+
+
 def test_receita_por_dia(session, cenario):
     serie = relatorio_service.receita_por_dia(session, INICIO, FIM)
     assert serie == [
@@ -90,6 +150,62 @@ def test_desempenho_funcionarios(session, cenario):
     assert item["receita_loja"] == 100.0
 
 
+def test_desempenho_vetorizado_equivale_ao_acumulo_por_linha():
+    sorteio = random.Random(3)
+    linhas = [
+        LinhaRelatorio(
+            funcionario_id=(f := sorteio.randint(1, 4)),
+            funcionario=f"Func {f}",
+            percentual_atual=0.5,
+            id=i,
+            cliente_id=sorteio.randint(1, 30),
+            servico="Corte",
+            data=INICIO + timedelta(days=sorteio.randint(0, 30)),
+            hora="09:00",
+            status=sorteio.choice(["concluido", "concluido", "cancelado"]),
+            forma_pagamento=None,
+            preco=round(sorteio.uniform(20, 150), 2),
+            percentual=sorteio.choice([None, 0.4, 0.6]),
+        )
+        for i in range(1, 1500)
+    ]
+    retrato = relatorio_service.RetratoDoPeriodo(INICIO, FIM, linhas, com_anterior=False)
+
+    esperado: dict[int, dict] = {}
+    for r in retrato.atual:
+        if r.status != "concluido":
+            continue
+        item = esperado.setdefault(
+            r.funcionario_id, {"funcionario": r.funcionario, "n": 0, "receita": 0.0, "comissao": 0.0}
+        )
+        item["n"] += 1
+        item["receita"] += r.preco
+        item["comissao"] += r.preco * (r.percentual if r.percentual is not None else r.percentual_atual)
+
+    resultado = retrato.desempenho_funcionarios()
+
+    assert [item["receita"] for item in resultado] == sorted((item["receita"] for item in resultado), reverse=True)
+    por_nome = {item["funcionario"]: item for item in resultado}
+    assert set(por_nome) == {item["funcionario"] for item in esperado.values()}
+    for item in esperado.values():
+        calculado = por_nome[item["funcionario"]]
+        assert calculado["atendimentos"] == item["n"]
+        assert calculado["receita"] == pytest.approx(round(item["receita"], 2), abs=0.01)
+        assert calculado["comissao"] == pytest.approx(round(item["comissao"], 2), abs=0.01)
+        assert calculado["ticket_medio"] == pytest.approx(round(item["receita"] / item["n"], 2), abs=0.01)
+
+
+def test_retrato_guardado_no_cache_nao_pode_ser_alterado(session, cenario):
+    retrato = relatorio_service.RetratoDoPeriodo.carregar(session, INICIO, FIM)
+    assert isinstance(retrato.atual, tuple) and isinstance(retrato.totais, tuple)
+    with pytest.raises(ValueError):
+        retrato._colunas_concluidos["preco"][0] = 0.0
+    desempenho = retrato.desempenho_funcionarios()
+    desempenho[0]["receita"] = 0.0
+    de_novo = relatorio_service.RetratoDoPeriodo.carregar(session, INICIO, FIM)
+    assert de_novo.desempenho_funcionarios()[0]["receita"] == 250.0
+
+
 def test_metas_padrao_e_salvar(session):
     metas = relatorio_service.obter_metas(session)
     assert metas == relatorio_service.METAS_PADRAO
@@ -115,3 +231,48 @@ def test_progresso_metas(session, cenario):
     assert not progresso["receita_mensal"]["atingida"]
     # No-show de 20% acima do teto de 10% => meta não atingida.
     assert not progresso["taxa_no_show_max"]["atingida"]
+
+
+def test_retrato_do_periodo_igual_as_funcoes_avulsas(session, cenario):
+    # Um atendimento no período anterior para o comparativo ter os dois lados.
+    agendamento_repository.criar(session, 1, cenario["joao_id"], 1, date(2026, 7, 20), "09:00", status="concluido")
+    retrato = relatorio_service.RetratoDoPeriodo.carregar(session, INICIO, FIM)
+
+    assert retrato.kpis() == relatorio_service.kpis(session, INICIO, FIM)
+    assert retrato.kpis(anterior=True) == relatorio_service.kpis(session, date(2026, 7, 1), date(2026, 7, 31))
+    assert retrato.comparativo() == relatorio_service.comparativo(session, INICIO, FIM)
+    assert retrato.receita_por_dia() == relatorio_service.receita_por_dia(session, INICIO, FIM)
+    assert retrato.receita_por_forma_pagamento() == faturamento_service.receita_por_forma_pagamento(
+        session, INICIO, FIM
+    )
+
+
+def _abrir_pagina_de_relatorios(session):
+    """Mesma sequência de pages/11_Relatorios.py."""
+    retrato = relatorio_service.RetratoDoPeriodo.carregar(session, INICIO, FIM)
+    dados = retrato.comparativo()
+    relatorio_service.progresso_metas(session, dados["atual"])
+    retrato.receita_por_dia()
+    retrato.atendimentos_por_dia_semana()
+    retrato.atendimentos_por_horario()
+    retrato.top_servicos()
+    retrato.desempenho_funcionarios()
+    retrato.receita_por_forma_pagamento()
+    return dados
+
+
+def test_pagina_de_relatorios_faz_no_maximo_quatro_consultas(session, cenario):
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: comandos.append(a[2]))
+
+    dados = _abrir_pagina_de_relatorios(session)
+    # Agendamentos das duas janelas, totais por dia das duas janelas, expedientes e metas.
+    assert len(comandos) <= 4, comandos
+    assert dados["atual"]["receita_bruta"] == 250.0
+
+    # Depois de um novo agendamento (escrita que não é de expediente) as grades continuam guardadas.
+    agendamento_repository.criar(session, 1, cenario["joao_id"], 1, date(2026, 8, 20), "09:00")
+    comandos.clear()
+    _abrir_pagina_de_relatorios(session)
+    assert len(comandos) <= 3, comandos
+    assert not [c for c in comandos if "expedientes_funcionarios" in c]
@@ -0,0 +1,55 @@
+from datetime import date
+
+import pandas as pd
+
+from src.repositories import agendamento_repository, cliente_repository, funcionario_repository, servico_repository
+from src.services import dashboard_service, tabela
+
+
+def test_montar_dataframe_tipa_as_colunas_e_preserva_os_valores():
+    linhas = [
+        (1, "Pedro", date(2026, 8, 3), 40.0, None),
+        (2, "João", date(2026, 8, 4), 30.0, "pix"),
+        (3, "Pedro", None, 40.0, "pix"),
+    ]
+    df = tabela.montar_dataframe(
+        linhas,
+        ["ID", "Funcionario", "Data", "Preco", "Forma"],
+        categoricas=("Funcionario", "Forma"),
+        datas=("Data",),
+        lote=2,
+    )
+
+    assert isinstance(df["Funcionario"].dtype, pd.CategoricalDtype)
+    assert df["Funcionario"].cat.categories.tolist() == ["João", "Pedro"]
+    assert df["Funcionario"].tolist() == ["Pedro", "João", "Pedro"]
+    assert df["Forma"].isna().tolist() == [True, False, False]
+    assert str(df["Data"].dtype).startswith("datetime64")
+    assert df["Data"].iloc[0] == pd.Timestamp(2026, 8, 3)
+    assert pd.isna(df["Data"].iloc[2])
+    assert df["Preco"].tolist() == [40.0, 30.0, 40.0]
+
+
+def test_montar_dataframe_sem_linhas_mantem_as_colunas():
+    df = tabela.quadro_de_agendamentos([])
+    assert df.empty
+    assert df.columns.tolist() == tabela.COLUNAS_AGENDAMENTOS
+
+
+def test_lotes_da_agenda_le_o_cursor_em_lotes(session):
+    cliente = cliente_repository.criar(session, "Cliente", "1199", "c@c.com")
+    funcionario = funcionario_repository.criar(session, "João", "Barbeiro", 0.5)
+    servico = servico_repository.criar(session, "Corte", 40.0, 30)
+    for hora in ("09:00", "09:30", "10:00"):
+        agendamento_repository.criar(session, cliente.id, funcionario.id, servico.id, date(2026, 8, 3), hora)
+
+    lotes = list(dashboard_service.lotes_da_agenda(session, date(2026, 8, 1), date(2026, 8, 31), lote=2))
+    assert [len(lote) for lote in lotes] == [2, 1]
+    df = pd.concat(lotes, ignore_index=True)
+    esperado = agendamento_repository.listar_detalhado(session, date(2026, 8, 1), date(2026, 8, 31))
+
+    assert df["ID"].tolist() == [r.id for r in esperado]
+    assert df["Hora"].tolist() == ["09:00", "09:30", "10:00"]
+    assert set(df["Status"]) == {"agendado"}
+    # Categorias, não um objeto str por linha.
+    assert df["Servico"].cat.codes.tolist() == [0, 0, 0]